@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.__main__
+~~~~~~~~~~~~~~~~~~~
+
+Minimal runner for the asv-style suites, for when asv is not installed.
+
+    $ python -m benchmarks [name-filter]
+"""
+
+import sys
+import inspect
+import itertools
+from timeit import default_timer
+
+from . import bench_signal, bench_xdf
+
+
+def _cases(module):
+    for _, cls in inspect.getmembers(module, inspect.isclass):
+        if cls.__module__ != module.__name__:
+            continue
+        params = getattr(cls, "params", [])
+        if params and not isinstance(params[0], list):
+            params = [params]
+        for args in itertools.product(*params):
+            for name, method in inspect.getmembers(cls, inspect.isfunction):
+                if name.startswith(("time_", "track_")):
+                    yield cls, name, args
+
+
+def main(pattern="", repeat=3):
+    for module in [bench_xdf, bench_signal]:
+        for cls, name, args in _cases(module):
+            label = f"{cls.__name__}.{name}({', '.join(map(str, args))})"
+            if pattern not in label:
+                continue
+
+            if name.startswith("track_"):
+                bench = cls()
+                if hasattr(bench, "setup"):
+                    bench.setup(*args)
+                value = getattr(bench, name)(*args)
+                unit = getattr(getattr(cls, name), "unit", "")
+                print(f"{label:<60} {value:10.2f} {unit}")
+                continue
+
+            timings = []
+            for _ in range(repeat):
+                bench = cls()
+                if hasattr(bench, "setup"):
+                    bench.setup(*args)
+                start = default_timer()
+                getattr(bench, name)(*args)
+                timings.append(default_timer() - start)
+                if hasattr(bench, "teardown"):
+                    bench.teardown(*args)
+
+            print(f"{label:<60} {min(timings) * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
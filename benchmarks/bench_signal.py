@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.bench_signal
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Raw signal decoding benchmarks for openxdf.Signal.
+"""
+
+import os
+
+import openxdf
+
+from .common import study, archived_study
+
+
+class SignalReadFile(object):
+    params = ["one", "several", "all"]
+    param_names = ["channels"]
+    timeout = 600
+
+    def setup(self, channels):
+        xdf_path, data_path = study()
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+
+        all_channels = self.signal.list_channels
+        self.channels = {
+            "one": all_channels[:1],
+            "several": all_channels[:4],
+            "all": all_channels,
+        }[channels]
+
+    def time_read_file(self, channels):
+        self.signal.read_file(self.channels)
+
+    def peakmem_read_file(self, channels):
+        self.signal.read_file(self.channels)
+
+
+class SignalReadFileCached(object):
+    timeout = 600
+
+    def setup(self):
+        from openxdf import cache
+
+        xdf_path, data_path = study()
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+        self.channels = self.signal.list_channels[:4]
+        cache.enable(max_bytes=2**31)
+        self.signal.read_file(self.channels)
+
+    def teardown(self):
+        from openxdf import cache
+
+        cache.disable()
+
+    def time_read_file_cached(self):
+        self.signal.read_file(self.channels)
+
+
+class SignalArchiveRead(object):
+    params = ["raw", "zlib", "lzma"]
+    param_names = ["storage"]
+    timeout = 600
+
+    def setup(self, storage):
+        if storage == "raw":
+            xdf_path, data_path = study()
+        else:
+            xdf_path, data_path = archived_study(storage)
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+        self.sources = [i["SourceName"] for i in xdf.sources[:4]]
+
+    def time_read_epochs(self, storage):
+        # Ten epochs from the middle of the night
+        self.signal._read_sources(self.sources, 4 * 3600, 300)
+
+    def time_read_night(self, storage):
+        self.signal._read_sources(self.sources)
+
+
+class SignalArchiveEEG(object):
+    """Archive size and range reads on smooth, EEG-like signals
+
+    `SignalArchiveRead` uses noisy sines, which barely compress; this suite
+    measures the archive against raw files on a more realistic spectrum.
+    """
+
+    params = ["raw", "zlib", "lzma"]
+    param_names = ["storage"]
+    timeout = 900
+
+    def setup(self, storage):
+        xdf_path, self.raw_path = study(waveform="eeg")
+        self.path = self.raw_path
+        if storage != "raw":
+            _, self.path = archived_study(storage, waveform="eeg")
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, self.path)
+        self.sources = [i["SourceName"] for i in xdf.sources[:4]]
+
+    def track_compression_ratio(self, storage):
+        return os.path.getsize(self.raw_path) / os.path.getsize(self.path)
+
+    track_compression_ratio.unit = "raw bytes / stored bytes"
+
+    def time_read_epochs(self, storage):
+        # Ten epochs from the middle of the night
+        self.signal._read_sources(self.sources, 4 * 3600, 300)
+
+
+class SignalQualityReport(object):
+    timeout = 600
+
+    def setup(self):
+        xdf_path, data_path = study()
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+
+    def time_quality_report(self):
+        self.signal.quality_report(self.signal.list_channels)
+
+
+class SignalReadMatrix(object):
+    params = [200, 128]
+    param_names = ["fs"]
+    timeout = 600
+
+    def setup(self, fs):
+        xdf_path, data_path = study()
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+
+    def time_read_matrix(self, fs):
+        self.signal.read_matrix(self.signal.list_channels[:4], fs=fs, epochs=True)
+
+
+class SignalEventWindows(object):
+    timeout = 600
+
+    def setup(self):
+        xdf_path, data_path = study()
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+        self.events = xdf.events["Scorer1"]["Apneas"]
+
+    def time_event_windows(self):
+        self.signal.event_windows(self.signal.list_channels[:4], self.events, 10, 30)
+
+
+class RSWAScore(object):
+    timeout = 600
+
+    def setup(self):
+        xdf_path, data_path = study()
+        xdf = openxdf.OpenXDF(xdf_path)
+        self.signal = openxdf.Signal(xdf, data_path)
+
+    def time_score(self):
+        from openxdf import rswa
+
+        rswa.score(self.signal, channel="S3")
+
+
+class ParallelFilter(object):
+    """Time-split filtering of one long channel (8 h at 256 Hz)"""
+
+    params = [1, 2, 4]
+    param_names = ["workers"]
+    timeout = 600
+
+    def setup(self, workers):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        self.data = rng.standard_normal(8 * 3600 * 256)
+        self.b, self.a = openxdf.helpers.butter_bandpass(10, 100, 256)
+        self.sos = openxdf.helpers.butter_bandpass(0.3, 35, 256, output="sos")
+
+    def time_parallel_lfilter(self, workers):
+        openxdf.helpers.parallel_lfilter(self.b, self.a, self.data, workers=workers)
+
+    def time_parallel_sosfilt(self, workers):
+        openxdf.helpers.parallel_sosfilt(self.sos, self.data, workers=workers)
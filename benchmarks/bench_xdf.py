@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.bench_xdf
+~~~~~~~~~~~~~~~~~~~~
+
+Header parsing and property benchmarks for openxdf.OpenXDF.
+"""
+
+import openxdf
+
+from .common import study
+
+
+class XDFParse(object):
+    params = [3600, 8 * 3600]
+    param_names = ["duration"]
+
+    def setup(self, duration):
+        self.xdf_path, _ = study(duration=duration)
+
+    def time_parse(self, duration):
+        openxdf.OpenXDF(self.xdf_path)
+
+
+class XDFProperties(object):
+    params = [
+        "id",
+        "start_time",
+        "header",
+        "sources",
+        "montages",
+        "epochs",
+        "scoring",
+        "custom_event_list",
+        "events",
+    ]
+    param_names = ["property"]
+
+    def setup(self, prop):
+        xdf_path, _ = study()
+        self.xdf = openxdf.OpenXDF(xdf_path)
+
+    def time_property(self, prop):
+        getattr(self.xdf, prop)
+
+
+class XDFDataFrame(object):
+    def setup(self):
+        xdf_path, _ = study()
+        self.xdf = openxdf.OpenXDF(xdf_path)
+
+    def time_dataframe(self):
+        self.xdf.dataframe()
+
+    def time_dataframe_scoring_only(self):
+        self.xdf.dataframe(epochs=False, events=False)
+
+
+class XDFEventMatrix(object):
+    def setup(self):
+        xdf_path, _ = study()
+        self.xdf = openxdf.OpenXDF(xdf_path)
+
+    def time_event_matrix(self):
+        self.xdf.event_matrix()
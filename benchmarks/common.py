@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.common
+~~~~~~~~~~~~~~~~~
+
+Synthetic studies shared by the benchmark suites.
+"""
+
+import tempfile
+from functools import lru_cache
+
+from openxdf.testing import write_study
+
+# One night of PSG at typical montage sizes
+STUDY_PARAMS = {
+    "duration": 8 * 3600,
+    "sources": 16,
+    "sample_rates": 200,
+    "sample_widths": 2,
+    "scorers": 3,
+    "event_density": 0.2,
+}
+
+
+@lru_cache(maxsize=None)
+def study(**overrides):
+    """Writes (once per process) and returns a synthetic study
+
+    Returns:
+        tuple: (xdf_path, data_path)
+    """
+    params = dict(STUDY_PARAMS)
+    params.update(overrides)
+    return write_study(tempfile.mkdtemp(prefix="openxdf-bench-"), **params)
+
+
+@lru_cache(maxsize=None)
+def archived_study(codec="zlib", **overrides):
+    """Archives (once per process) a study, the default one unless overridden
+
+    Returns:
+        tuple: (xdf_path, archive_path)
+    """
+    import openxdf
+    from openxdf import archive
+
+    xdf_path, data_path = study(**overrides)
+    signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+    output_dir = tempfile.mkdtemp(prefix="openxdf-bench-")
+    return xdf_path, archive.write(signal, output_dir, codec=codec)[0]
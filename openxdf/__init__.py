@@ -30,9 +30,47 @@ from .__version__ import __title__, __description__, __url__, __version__
 from .__version__ import __author__, __author_email__, __license__
 from .__version__ import __copyright__
 
-
-from openxdf.xdf import OpenXDF
-from openxdf.signal import Signal
+import importlib
 
 
 __all__ = ["OpenXDF", "Signal"]
+
+# Heavy dependencies (numpy, pandas, scipy, xmltodict) are only imported once
+# the class or submodule that needs them is first accessed.
+_lazy_attributes = {"OpenXDF": "xdf", "Signal": "signal"}
+_lazy_modules = [
+    "archive",
+    "cache",
+    "catalog",
+    "constants",
+    "dataset",
+    "exceptions",
+    "helpers",
+    "instrument",
+    "parsing",
+    "pretty",
+    "rswa",
+    "serve",
+    "shm",
+    "signal",
+    "testing",
+    "writer",
+    "xdf",
+]
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        module = importlib.import_module(f".{_lazy_attributes[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _lazy_modules:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy_attributes) + _lazy_modules)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.archive
+~~~~~~~~~~~~~~~
+
+Compressed archival format for raw signal files.
+
+Each source is stored as chunks of `chunk_frames` frames. Within a chunk,
+samples are delta-encoded (modulo the sample width, so decoding is exact),
+split into byte planes and compressed with zlib or lzma. A JSON chunk index
+at the end of the file lets range reads decompress only the chunks they
+need.
+
+An archive keeps the name of the data file it replaces, so a `Signal`
+opened on it reads it transparently:
+
+   >>> from openxdf import archive
+   >>> archive.write(signal, "/path/to/archive/")
+   ["/path/to/archive/example.data"]
+   >>> signal = openxdf.Signal(xdf, "/path/to/archive/example.data")
+   >>> signal.read_file(["C3-A2"])
+
+Layout:
+
+    MAGIC | chunk | chunk | ... | index (JSON) | index offset | length | MAGIC
+
+Limitations: the coding is lossless, so amplifier noise bounds the gain. On
+the smooth, EEG-like benchmark study (`SignalArchiveEEG` in
+benchmarks/bench_signal.py, 16 sources at 200 Hz, ~25 uV RMS with one bit of
+noise) archives are only about 1.8x smaller (zlib 1.76x, lzma 1.86x), and a
+ten-epoch range read of four sources takes about 11 ms (zlib) or 38 ms (lzma)
+on one core, against about 2 ms from a page-cached raw file. Archives save
+storage and bytes read from cold disks; they do not make cached reads faster.
+"""
+
+import os
+import json
+import lzma
+import zlib
+import struct
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from .instrument import timer, count
+from .parsing import is_true
+
+MAGIC = b"OXDFARC\x01"
+_TRAILER = struct.Struct("<QQ8s")
+
+CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+
+
+def is_archive(path: str) -> bool:
+    """True if `path` is an archive written by this module"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def storage_dtype(sample_width, signed) -> np.dtype:
+    """Smallest little-endian integer type holding samples of `sample_width`"""
+    width = next(i for i in [1, 2, 4, 8] if i >= sample_width)
+    return np.dtype(f"<{'i' if signed else 'u'}{width}")
+
+
+def encode_chunk(values, dtype, codec="zlib", level=6) -> bytes:
+    """Delta-encodes, byte-shuffles and compresses one chunk of samples
+
+    Args:
+        values (np.ndarray): Integer samples.
+        dtype (np.dtype): Storage type (see `storage_dtype`).
+        codec (str, optional): Defaults to "zlib". "zlib" or "lzma".
+        level (int, optional): Defaults to 6. Compression level.
+
+    Returns:
+        bytes: Compressed chunk.
+    """
+    dtype = np.dtype(dtype)
+    unsigned = np.ascontiguousarray(values, dtype=dtype).ravel()
+    unsigned = unsigned.view(f"<u{dtype.itemsize}")
+    deltas = np.empty_like(unsigned)
+    deltas[:1] = unsigned[:1]
+    np.subtract(unsigned[1:], unsigned[:-1], out=deltas[1:])
+    planes = deltas.view(np.uint8).reshape(-1, dtype.itemsize).T
+    return CODECS[codec][0](planes.tobytes(), level)
+
+
+def decode_chunk(data, dtype, codec="zlib") -> np.ndarray:
+    """Inverse of `encode_chunk`
+
+    Returns:
+        np.ndarray: 1-D array of `dtype` samples.
+    """
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(CODECS[codec][1](data), dtype=np.uint8)
+    deltas = np.ascontiguousarray(planes.reshape(dtype.itemsize, -1).T)
+    unsigned = deltas.view(f"<u{dtype.itemsize}").ravel()
+    return np.cumsum(unsigned, dtype=unsigned.dtype).view(dtype)
+
+
+class ArchiveReader(object):
+    """Random-access reader for one archive file.
+
+    Args:
+        path (str): Archive path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            offset, length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an openxdf archive.")
+            f.seek(offset)
+            self.index = json.loads(f.read(length).decode("utf-8"))
+
+    def __repr__(self):
+        return f"<ArchiveReader [{self.path}]>"
+
+    @property
+    def num_frames(self) -> int:
+        return self.index["num_frames"]
+
+    @property
+    def sources(self) -> list:
+        return list(self.index["sources"])
+
+    def read(self, names, start_frame=0, num_frames=None) -> dict:
+        """Decodes sources over a range of frames
+
+        Only the chunks overlapping the range are read and decompressed.
+
+        Args:
+            names (list): Source names.
+            start_frame (int, optional): Defaults to 0. First frame to read.
+            num_frames (int, optional): Defaults to None (to the last frame).
+
+        Returns:
+            dict: {source: int64 np.array of shape (frames, samples per frame)}
+        """
+        total = self.num_frames
+        if num_frames is None:
+            num_frames = total - start_frame
+        num_frames = max(0, min(num_frames, total - start_frame))
+        chunk_frames = self.index["chunk_frames"]
+        first = start_frame // chunk_frames
+        last = -(-(start_frame + num_frames) // chunk_frames)
+        skip = start_frame - first * chunk_frames
+
+        codec = self.index["codec"]
+        jobs = []
+        with timer("signal.read", archive=self.path):
+            with open(self.path, "rb") as f:
+                for name in names:
+                    chunks = self.index["sources"][name]["chunks"][first:last]
+                    for k, (offset, length) in enumerate(chunks):
+                        f.seek(offset)
+                        jobs.append((name, k, f.read(length)))
+        count("signal.bytes_read", sum(len(i[2]) for i in jobs), archive=self.path)
+
+        span = (last - first) * chunk_frames
+        output = {}
+        for name in names:
+            spf = self.index["sources"][name]["samples_per_frame"]
+            output[name] = np.empty((span, spf), dtype=np.int64)
+
+        def _decode(job):
+            name, k, data = job
+            samples = decode_chunk(data, self.index["sources"][name]["dtype"], codec)
+            samples = samples.reshape(-1, output[name].shape[1])
+            output[name][k * chunk_frames : k * chunk_frames + len(samples)] = samples
+
+        # zlib and lzma release the GIL, so chunks decompress in parallel
+        with timer("signal.decode", archive=self.path):
+            if len(jobs) > 1:
+                workers = min(len(jobs), os.cpu_count() or 1)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_decode, jobs))
+            else:
+                for job in jobs:
+                    _decode(job)
+        return {name: output[name][skip : skip + num_frames] for name in names}
+
+
+def write_file(signal, path, output_path, codec="zlib", level=6, chunk_frames=None):
+    """Archives a single data file of `signal`
+
+    Args:
+        signal (Signal): Signal whose segments include `path`.
+        path (str): Data file to archive (raw or already archived).
+        output_path (str): Archive path.
+        codec (str, optional): Defaults to "zlib". "zlib" or "lzma".
+        level (int, optional): Defaults to 6. Compression level.
+        chunk_frames (int, optional): Defaults to None (four epochs).
+
+    Returns:
+        dict: The archive's chunk index.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    segment = next(i for i in signal._segments if i["path"] == path)
+    layout = segment["layout"]
+    if chunk_frames is None:
+        header = signal._xdf.header
+        chunk_frames = 4 * max(1, header["EpochLength"] // header["FrameLength"])
+
+    num_frames = signal._file_frames(path, layout)
+    sources = {}
+    for name, channel in layout["Channels"].items():
+        sources[name] = {
+            "dtype": storage_dtype(
+                channel["SampleWidth"], is_true(channel["Signed"])
+            ).str,
+            "samples_per_frame": channel["ChannelWidth"] // channel["SampleWidth"],
+            "chunks": [],
+        }
+
+    with open(output_path, "wb") as f:
+        f.write(MAGIC)
+        for first in range(0, num_frames, chunk_frames):
+            n = min(chunk_frames, num_frames - first)
+            decoded = signal._decode_segment(segment, list(sources), first, n)
+            for name, source in sources.items():
+                data = encode_chunk(decoded[name], source["dtype"], codec, level)
+                source["chunks"].append([f.tell(), len(data)])
+                f.write(data)
+
+        index = {
+            "version": 1,
+            "codec": codec,
+            "chunk_frames": chunk_frames,
+            "num_frames": num_frames,
+            "frame_width": layout["FrameWidth"],
+            "sources": sources,
+        }
+        offset = f.tell()
+        data = json.dumps(index).encode("utf-8")
+        f.write(data)
+        f.write(_TRAILER.pack(offset, len(data), MAGIC))
+    return index
+
+
+def write(signal, output_dir, codec="zlib", level=6, chunk_frames=None) -> list:
+    """Archives every data file of `signal` into `output_dir`
+
+    Archives keep the data file names from the XDF document, so the XDF can
+    be pointed at `output_dir` unchanged.
+
+    Args:
+        signal (Signal): Signal to archive.
+        output_dir (str): Output folder (created if needed).
+        codec (str, optional): Defaults to "zlib". "zlib" (faster) or "lzma"
+            (smaller).
+        level (int, optional): Defaults to 6. Compression level.
+        chunk_frames (int, optional): Defaults to None (four epochs). Frames
+            per chunk; smaller chunks make short range reads cheaper.
+
+    Returns:
+        list: Archive paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for segment in signal._segments:
+        if segment["path"] in paths:
+            continue
+        paths.append(segment["path"])
+
+    outputs = []
+    for path in paths:
+        output_path = os.path.join(output_dir, os.path.basename(path))
+        if os.path.abspath(output_path) == os.path.abspath(path):
+            raise ValueError("Archives cannot overwrite their source data files.")
+        write_file(signal, path, output_path, codec, level, chunk_frames)
+        outputs.append(output_path)
+    return outputs
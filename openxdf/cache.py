@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.cache
+~~~~~~~~~~~~~
+
+Opt-in, process-wide LRU cache of decoded sources and filtered channels.
+
+Decoded sources are shared by every montage channel built from them and by
+every `Signal` opened on the same file; `Signal.read_file` results are cached
+per channel and filter. Entries are keyed by the file's path, size and
+modification time, so a file that changes on disk is never served stale.
+
+   >>> from openxdf import cache
+   >>> cache.enable(max_bytes=2 * 2**30)
+   >>> signal.read_file(["C3-A2", "C4-A1"])  # decoded from disk
+   >>> signal.read_file(["C3-A2"])           # served from memory
+   >>> cache.stats()
+   {"hits": 1, "misses": 5, "evictions": 0, "entries": 5, "bytes": ...,
+    "max_bytes": 2147483648}
+
+Cached arrays are read-only; copy them before modifying in place.
+"""
+
+import os
+from threading import Lock
+from collections import OrderedDict
+
+
+class DecodedCache(object):
+    """Thread-safe LRU mapping with a byte budget.
+
+    Args:
+        max_bytes (int): Total `nbytes` of the arrays kept before the least
+            recently used entries are evicted.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return f"<DecodedCache [{self.nbytes}/{self.max_bytes} bytes]>"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the cached array for `key`, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores `value` (made read-only) and evicts down to the budget
+
+        Arrays larger than the whole budget are not stored, but are still made
+        read-only so callers see the same flags either way.
+        """
+        value.flags.writeable = False
+        if value.nbytes > self.max_bytes:
+            return value
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = value
+            self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache = None
+
+
+def enable(max_bytes: int = 2**30) -> DecodedCache:
+    """Turns on the process-wide cache, replacing any existing one
+
+    Args:
+        max_bytes (int, optional): Defaults to 1 GiB. Byte budget.
+
+    Returns:
+        DecodedCache: The active cache.
+    """
+    global _cache
+    _cache = DecodedCache(max_bytes)
+    return _cache
+
+
+def disable():
+    """Turns off and drops the process-wide cache"""
+    global _cache
+    _cache = None
+
+
+def get_cache():
+    """Returns the active `DecodedCache`, or None when caching is off"""
+    return _cache
+
+
+def stats() -> dict:
+    """Hit/miss statistics of the active cache (empty when caching is off)"""
+    return {} if _cache is None else _cache.stats()
+
+
+def file_key(path: str) -> tuple:
+    """Identity of a file's current contents: (path, size, mtime)"""
+    status = os.stat(path)
+    return os.path.abspath(path), status.st_size, status.st_mtime_ns
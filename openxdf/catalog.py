@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.catalog
+~~~~~~~~~~~~~~~
+
+This module maintains a local SQLite index of XDF study metadata so cohorts
+can be selected without re-opening every header document.
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from .xdf import OpenXDF
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    id TEXT,
+    start_time TEXT,
+    data_path TEXT,
+    header TEXT,
+    sources TEXT,
+    montages TEXT,
+    scorers TEXT,
+    epoch_count INTEGER,
+    error TEXT,
+    segments TEXT
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    sample_frequency REAL,
+    sample_width INTEGER
+);
+CREATE TABLE IF NOT EXISTS channels (
+    path TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scorers (
+    path TEXT NOT NULL,
+    name TEXT,
+    epoch_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS studies_id ON studies (id);
+CREATE INDEX IF NOT EXISTS studies_start_time ON studies (start_time);
+CREATE INDEX IF NOT EXISTS sources_path ON sources (path);
+CREATE INDEX IF NOT EXISTS sources_name ON sources (name);
+CREATE INDEX IF NOT EXISTS sources_rate ON sources (sample_frequency);
+CREATE INDEX IF NOT EXISTS channels_path ON channels (path);
+CREATE INDEX IF NOT EXISTS channels_label ON channels (label);
+CREATE INDEX IF NOT EXISTS scorers_path ON scorers (path);
+CREATE INDEX IF NOT EXISTS scorers_name ON scorers (name);
+"""
+
+
+def read_metadata(fpath: str) -> dict:
+    """Parses a single XDF header into a catalog record
+
+    Args:
+        fpath (str): Filepath to `.xdf` file.
+
+    Returns:
+        dict: {"path": _, "id": _, "start_time": _, "data_path": _,
+               "segments": [...], "header": {...}, "sources": [...],
+               "montages": [...], "scorers": [...], "epoch_count": _,
+               "error": None}
+        "data_path" is a list with one path per data file when the recording
+        is split over several files, as `Signal` expects.
+    """
+    record = {"path": fpath, "error": None}
+    try:
+        xdf = OpenXDF(fpath)
+        header = xdf.header
+
+        record["id"] = xdf.id
+        record["start_time"] = xdf.start_time.isoformat()
+        record["header"] = header
+        folder = os.path.dirname(fpath)
+        record["segments"] = [
+            {
+                "File": segment["File"],
+                "data_path": os.path.join(folder, segment["File"]),
+                "StartTime": segment["StartTime"].isoformat(),
+                "EndTime": segment["EndTime"] and segment["EndTime"].isoformat(),
+                "Session": segment["Session"],
+            }
+            for segment in xdf.segments
+        ]
+        record["data_path"] = _data_path(record["segments"])
+        record["sources"] = [
+            {
+                "SourceName": source["SourceName"],
+                "SampleFrequency": source["SampleFrequency"],
+                "SampleWidth": source["SampleWidth"],
+            }
+            for source in xdf.sources
+        ]
+        record["montages"] = list(xdf.montages.keys())
+
+        record["scorers"] = []
+        if "xdf:ScoringResults" in xdf._data.keys():
+            for scorer in xdf.scoring:
+                names = [scorer["header"]["first_name"], scorer["header"]["last_name"]]
+                name = " ".join(i for i in names if i)
+                record["scorers"].append(
+                    {"name": name, "epoch_count": len(scorer["staging"])}
+                )
+        epochs = xdf.epochs
+        record["epoch_count"] = len(epochs) if epochs else None
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    return record
+
+
+def _find_files(roots, extension):
+    if type(roots) is str:
+        roots = [roots]
+
+    for root in roots:
+        if os.path.isfile(root):
+            yield os.path.abspath(root)
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.lower().endswith(extension):
+                    yield os.path.abspath(os.path.join(dirpath, filename))
+
+
+def _data_path(segments):
+    """The data file path, or one path per data file as `Signal` expects"""
+    paths = list(dict.fromkeys(i["data_path"] for i in segments))
+    return paths if len(paths) > 1 else paths[0]
+
+
+def _as_timestamp(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class Catalog(object):
+    """Incrementally updated index of XDF study metadata.
+
+    Description:
+        A Catalog wraps a single SQLite database. `scan` walks directory trees,
+        re-parses only the headers whose size or modification time changed
+        since the previous scan, and `query` selects studies by ID, start time,
+        channel set, source set, sample rate, or scorer.
+
+    Use:
+        >>> from openxdf.catalog import Catalog
+        >>> catalog = Catalog("/path/to/index.sqlite")
+        >>> catalog.scan("/path/to/archive/")
+        {"added": 1204, "updated": 0, "removed": 0, "unchanged": 0, "errors": 2}
+        >>> catalog.query(channels=["C3-A2", "Chin"], sample_rate=200)
+        [{"path": "/path/to/archive/.../example.xdf", "id": "Example",
+          "start_time": "2016-04-22T22:14:57.792999", ...},
+         ...]
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.executescript(SCHEMA)
+        columns = [i[1] for i in self._conn.execute("PRAGMA table_info(studies)")]
+        if "segments" not in columns:
+            self._conn.execute("ALTER TABLE studies ADD COLUMN segments TEXT")
+
+    def __repr__(self):
+        return f"<Catalog [{self._db_path}]>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM studies WHERE error IS NULL"
+        ).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def _delete(self, paths):
+        rows = [(p,) for p in paths]
+        for table in ["studies", "sources", "channels", "scorers"]:
+            self._conn.executemany(f"DELETE FROM {table} WHERE path = ?", rows)
+
+    def _insert(self, record, size, mtime):
+        path = record["path"]
+        self._delete([path])
+
+        if record["error"] is not None:
+            self._conn.execute(
+                "INSERT INTO studies (path, size, mtime, error) VALUES (?, ?, ?, ?)",
+                (path, size, mtime, record["error"]),
+            )
+            return
+
+        self._conn.execute(
+            "INSERT INTO studies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+            (
+                path,
+                size,
+                mtime,
+                record["id"],
+                record["start_time"],
+                record["segments"][0]["data_path"],
+                json.dumps(record["header"]),
+                json.dumps(record["sources"]),
+                json.dumps(record["montages"]),
+                json.dumps(record["scorers"]),
+                record["epoch_count"],
+                json.dumps(record["segments"]),
+            ),
+        )
+        self._conn.executemany(
+            "INSERT INTO sources VALUES (?, ?, ?, ?)",
+            [
+                (path, s["SourceName"], s["SampleFrequency"], s["SampleWidth"])
+                for s in record["sources"]
+            ],
+        )
+        self._conn.executemany(
+            "INSERT INTO channels VALUES (?, ?)",
+            [(path, label) for label in record["montages"]],
+        )
+        self._conn.executemany(
+            "INSERT INTO scorers VALUES (?, ?, ?)",
+            [(path, s["name"], s["epoch_count"]) for s in record["scorers"]],
+        )
+
+    def scan(self, roots, extension=".xdf", workers=None, prune=True) -> dict:
+        """Walk directory trees and update the index
+
+        Only files that are new, or whose size or mtime changed, are parsed.
+        Parsing is spread over a process pool.
+
+        Args:
+            roots (str or list): Directories (or individual files) to scan.
+            extension (str, optional): Defaults to ".xdf". Header extension.
+            workers (int, optional): Defaults to None (one per CPU). Number of
+                parser processes; 1 parses in the calling process.
+            prune (bool, optional): Defaults to True. Remove indexed studies
+                under `roots` that no longer exist on disk.
+
+        Returns:
+            dict: Counts of added, updated, removed, unchanged and errored files.
+        """
+        if type(roots) is str:
+            roots = [roots]
+
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in self._conn.execute(
+                "SELECT path, size, mtime FROM studies"
+            )
+        }
+
+        summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "errors": 0}
+        found = set()
+        stale = {}
+        for fpath in _find_files(roots, extension.lower()):
+            found.add(fpath)
+            stat = os.stat(fpath)
+            if known.get(fpath) == (stat.st_size, stat.st_mtime):
+                summary["unchanged"] += 1
+                continue
+            stale[fpath] = (stat.st_size, stat.st_mtime)
+
+        if stale:
+            paths = sorted(stale.keys())
+            if workers == 1 or len(paths) == 1:
+                records = map(read_metadata, paths)
+                self._store(records, stale, known, summary)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    records = executor.map(read_metadata, paths, chunksize=8)
+                    self._store(records, stale, known, summary)
+
+        if prune:
+            prefixes = [os.path.abspath(r) for r in roots]
+            removed = [
+                p
+                for p in known.keys()
+                if p not in found
+                and any(
+                    p == r or p.startswith(r.rstrip(os.sep) + os.sep) for r in prefixes
+                )
+            ]
+            self._delete(removed)
+            summary["removed"] = len(removed)
+
+        self._conn.commit()
+        return summary
+
+    def _store(self, records, stale, known, summary):
+        for record in records:
+            size, mtime = stale[record["path"]]
+            self._insert(record, size, mtime)
+            summary["updated" if record["path"] in known else "added"] += 1
+            if record["error"] is not None:
+                summary["errors"] += 1
+
+    def query(
+        self,
+        id=None,
+        start_after=None,
+        start_before=None,
+        channels=None,
+        sources=None,
+        sample_rate=None,
+        scorer=None,
+    ) -> list:
+        """Select indexed studies matching all given criteria
+
+        Args:
+            id (str, optional): Study/patient ID. SQL `LIKE` wildcards allowed.
+            start_after (datetime or str, optional): Earliest start time.
+            start_before (datetime or str, optional): Latest start time.
+            channels (list, optional): Montage labels that must all be present.
+            sources (list, optional): Source names that must all be present.
+            sample_rate (float, optional): At least one source at this rate.
+            scorer (str, optional): Name of a scorer who staged the study.
+
+        Returns:
+            list: One dict per study, ordered by start time.
+        """
+        clauses = ["error IS NULL"]
+        params = []
+
+        if id is not None:
+            clauses.append("id LIKE ?")
+            params.append(id)
+        if start_after is not None:
+            clauses.append("start_time >= ?")
+            params.append(_as_timestamp(start_after))
+        if start_before is not None:
+            clauses.append("start_time <= ?")
+            params.append(_as_timestamp(start_before))
+
+        for table, column, values in [
+            ["channels", "label", channels],
+            ["sources", "name", sources],
+        ]:
+            if values is None:
+                continue
+            if type(values) is str:
+                values = [values]
+            values = list(set(values))
+            marks = ", ".join("?" for _ in values)
+            clauses.append(
+                f"path IN (SELECT path FROM {table} WHERE {column} IN ({marks}) "
+                f"GROUP BY path HAVING COUNT(DISTINCT {column}) = ?)"
+            )
+            params.extend(values + [len(values)])
+
+        if sample_rate is not None:
+            clauses.append(
+                "path IN (SELECT path FROM sources WHERE sample_frequency = ?)"
+            )
+            params.append(sample_rate)
+        if scorer is not None:
+            clauses.append("path IN (SELECT path FROM scorers WHERE name LIKE ?)")
+            params.append(scorer)
+
+        sql = (
+            "SELECT path, id, start_time, data_path, header, sources, montages, "
+            "scorers, epoch_count, segments FROM studies WHERE "
+            + " AND ".join(clauses)
+            + " ORDER BY start_time, path"
+        )
+
+        output = []
+        for row in self._conn.execute(sql, params):
+            # Indexes written before segments were recorded hold one path
+            segments = json.loads(row[9]) if row[9] else None
+            output.append(
+                {
+                    "path": row[0],
+                    "id": row[1],
+                    "start_time": row[2],
+                    "data_path": _data_path(segments) if segments else row[3],
+                    "segments": segments,
+                    "header": json.loads(row[4]),
+                    "sources": json.loads(row[5]),
+                    "montages": json.loads(row[6]),
+                    "scorers": json.loads(row[7]),
+                    "epoch_count": row[8],
+                }
+            )
+        return output
+
+    @property
+    def errors(self) -> dict:
+        """Files that could not be parsed, with their error messages
+
+        Returns:
+            dict: {"/path/to/broken.xdf": "KeyError: 'xdf:DataFiles'", ...}
+        """
+        return dict(
+            self._conn.execute(
+                "SELECT path, error FROM studies WHERE error IS NOT NULL"
+            )
+        )
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.constants
+~~~~~~~~~~~~~~~~~
+
+Scoring tables shared by the readers, writers and synthetic studies. Kept free
+of imports so any module can use them.
+"""
+
+import re
+
+# Scorer event sections in document order (without the "xdf:" prefix)
+EVENT_SECTIONS = [
+    "Apneas",
+    "Hypopneas",
+    "Desaturations",
+    "Microarousals",
+    "Snores",
+    "LegMovements1",
+    "LegMovements2",
+]
+
+# Element name of a single event within each section, e.g. "Apnea"
+EVENT_ELEMENTS = {i: re.sub("s[0-9]?$", "", i) for i in EVENT_SECTIONS}
+
+# Sleep stage labels, as scorers write them, to integer codes
+STAGE_CODES = {
+    "W": 0,
+    "0": 0,
+    "N1": 1,
+    "1": 1,
+    "N2": 2,
+    "2": 2,
+    "N3": 3,
+    "3": 3,
+    "N4": 3,
+    "4": 3,
+    "R": 4,
+    "REM": 4,
+}
+UNSCORED = -1
+
+# Canonical labels for the integer codes of `STAGE_CODES`
+STAGE_LABELS = {0: "W", 1: "N1", 2: "N2", 3: "N3", 4: "R"}
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.dataset
+~~~~~~~~~~~~~~~
+
+This module exports studies into fixed-shape epoch tensors on disk and loads
+them back by index, without decoding the original signal files again.
+
+On disk, a dataset is a folder with a `manifest.json` and one set of shard
+files per `shard_epochs` epochs:
+
+    shard-00000.data         raw (epochs x channels x samples) array
+    shard-00000.labels.npy   sleep stage code per epoch (see STAGE_CODES)
+    shard-00000.study.npy    index into the manifest's study list per epoch
+    shard-00000.epoch.npy    1-indexed epoch number within its study
+"""
+
+import os
+import json
+import numpy as np
+
+from .xdf import OpenXDF
+from .signal import Signal
+from .constants import STAGE_CODES, UNSCORED
+
+
+def stage_labels(xdf, num_epochs, scorer=None) -> np.ndarray:
+    """Returns one stage code per epoch for a single scorer
+
+    Args:
+        xdf (OpenXDF): Study header.
+        num_epochs (int): Number of epochs to label.
+        scorer (str, optional): Defaults to None (first scorer). Scorer first
+            name.
+
+    Returns:
+        np.ndarray: int8 array of STAGE_CODES values; UNSCORED where missing.
+    """
+    labels = np.full(num_epochs, UNSCORED, dtype=np.int8)
+    scoring = xdf.scoring
+    if scorer is not None:
+        scoring = [i for i in scoring if i["header"]["first_name"] == scorer]
+    if not scoring:
+        return labels
+
+    for epoch in scoring[0]["staging"]:
+        index = epoch["EpochNumber"] - 1
+        if 0 <= index < num_epochs:
+            labels[index] = STAGE_CODES.get(str(epoch["Stage"]).upper(), UNSCORED)
+    return labels
+
+
+def _study_paths(study):
+    if isinstance(study, dict):
+        return study["path"], study["data_path"]
+    return study
+
+
+class _ShardWriter(object):
+    def __init__(self, output_dir, shard_epochs):
+        self.output_dir = output_dir
+        self.shard_epochs = shard_epochs
+        self.shards = []
+        self._open()
+
+    def _open(self):
+        self.name = f"shard-{len(self.shards):05d}"
+        self._data = open(os.path.join(self.output_dir, f"{self.name}.data"), "wb")
+        self._labels, self._study, self._epoch = [], [], []
+        self._size = 0
+
+    def _close(self):
+        self._data.close()
+        base = os.path.join(self.output_dir, self.name)
+        np.save(f"{base}.labels.npy", np.concatenate(self._labels))
+        np.save(f"{base}.study.npy", np.concatenate(self._study))
+        np.save(f"{base}.epoch.npy", np.concatenate(self._epoch))
+        self.shards.append({"name": self.name, "epochs": self._size})
+
+    def write(self, data, labels, study, epochs):
+        start = 0
+        while start < len(data):
+            n = min(len(data) - start, self.shard_epochs - self._size)
+            rows = slice(start, start + n)
+            self._data.write(np.ascontiguousarray(data[rows]).tobytes())
+            self._labels.append(labels[rows])
+            self._study.append(np.full(n, study, dtype=np.int32))
+            self._epoch.append(epochs[rows])
+            self._size += n
+            start += n
+            if self._size == self.shard_epochs:
+                self._close()
+                self._open()
+
+    def close(self):
+        if self._size:
+            self._close()
+        else:
+            self._data.close()
+            os.remove(os.path.join(self.output_dir, f"{self.name}.data"))
+
+
+def export(
+    studies,
+    output_dir: str,
+    channels: list,
+    fs: float,
+    scorer=None,
+    shard_epochs: int = 10000,
+    dtype="float32",
+) -> dict:
+    """Export studies into memory-mappable epoch tensor shards
+
+    Studies are decoded one at a time with `Signal.read_matrix`, so memory use
+    is bounded by the largest single study.
+
+    Args:
+        studies (list): (xdf_path, data_path) pairs, or records returned by
+            `openxdf.catalog.Catalog.query`.
+        output_dir (str): Dataset folder (created if needed).
+        channels (list): Channels to export, in order.
+        fs (float): Common sampling frequency (Hz).
+        scorer (str, optional): Defaults to None (first scorer). Scorer whose
+            staging is used for labels.
+        shard_epochs (int, optional): Defaults to 10000. Epochs per shard.
+        dtype (str, optional): Defaults to "float32".
+
+    Returns:
+        dict: The dataset manifest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    writer = _ShardWriter(output_dir, shard_epochs)
+    study_ids = []
+    sample_shape = None
+
+    for xdf_path, data_path in map(_study_paths, studies):
+        xdf = OpenXDF(xdf_path)
+        signal = Signal(xdf, data_path)
+        data = signal.read_matrix(channels, fs, epochs=True, dtype=dtype)
+        sample_shape = list(data.shape[1:])
+
+        labels = stage_labels(xdf, len(data), scorer)
+        epochs = np.arange(1, len(data) + 1, dtype=np.int32)
+        writer.write(data, labels, len(study_ids), epochs)
+        study_ids.append(xdf.id)
+        del data
+    writer.close()
+
+    manifest = {
+        "channels": list(channels),
+        "fs": fs,
+        "dtype": np.dtype(dtype).str,
+        "sample_shape": sample_shape,
+        "studies": study_ids,
+        "stage_codes": STAGE_CODES,
+        "shards": writer.shards,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class EpochDataset(object):
+    """Random-access loader for datasets written by `export`.
+
+    Description:
+        Shards are memory-mapped, so indexing only reads the requested epochs.
+        Batches are gathered shard by shard in sorted order to keep reads
+        sequential, then returned in the requested order.
+
+    Use:
+        >>> from openxdf.dataset import export, EpochDataset
+        >>> export(studies, "/path/to/dataset", ["C3-A2", "Chin"], fs=100)
+        >>> dataset = EpochDataset("/path/to/dataset")
+        >>> x, y = dataset[[10, 4, 99]]
+        >>> x.shape, y
+        ((3, 2, 3000), array([2, 0, 4], dtype=int8))
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+
+        dtype = np.dtype(self.manifest["dtype"])
+        shape = tuple(self.manifest["sample_shape"] or [])
+        self._data = []
+        for shard in self.manifest["shards"]:
+            self._data.append(
+                np.memmap(
+                    os.path.join(path, f"{shard['name']}.data"),
+                    dtype=dtype,
+                    mode="r",
+                    shape=(shard["epochs"],) + shape,
+                )
+            )
+        self._offsets = np.cumsum([0] + [s["epochs"] for s in self.manifest["shards"]])
+
+        self.labels = self._concat("labels", np.int8)
+        self.study_index = self._concat("study", np.int32)
+        self.epoch_numbers = self._concat("epoch", np.int32)
+
+    def _concat(self, kind, dtype):
+        arrays = [
+            np.load(os.path.join(self._path, f"{shard['name']}.{kind}.npy"))
+            for shard in self.manifest["shards"]
+        ]
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+    def __repr__(self):
+        return f"<EpochDataset [{self._path}]>"
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def study_ids(self) -> np.ndarray:
+        """Study ID for every epoch"""
+        return np.asarray(self.manifest["studies"])[self.study_index]
+
+    def batch(self, indices) -> np.ndarray:
+        """Gather epochs by global index
+
+        Args:
+            indices (array-like): Epoch indices.
+
+        Returns:
+            np.ndarray: (len(indices) x channels x samples) array.
+        """
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        indices = np.where(indices < 0, indices + len(self), indices)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError("Epoch index out of range.")
+
+        shape = (len(indices),) + tuple(self.manifest["sample_shape"] or [])
+        output = np.empty(shape, dtype=np.dtype(self.manifest["dtype"]))
+
+        order = np.argsort(indices, kind="stable")
+        shards = np.searchsorted(self._offsets, indices[order], side="right") - 1
+        for shard in np.unique(shards):
+            positions = order[shards == shard]
+            local = indices[positions] - self._offsets[shard]
+            output[positions] = self._data[shard][local]
+        return output
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            index = np.arange(len(self))[index]
+        if np.ndim(index) == 0:
+            index = int(index)
+            return self.batch([index])[0], self.labels[index]
+        return self.batch(index), self.labels[np.asarray(index)]
@@ -8,24 +8,13 @@ Helper functions
 """
 
 import os
-import re
-from struct import iter_unpack
-from itertools import chain
+from fractions import Fraction
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy.signal import butter, lfilter
-from time import time
 
-
-def clean_title(title: str) -> str:
-    """Remove 'nti:' and 'xdf:' motifs from a str
-
-    Args:
-        title (str): Single string with motif
-
-    Returns:
-        str: Cleaned string
-    """
-    return re.sub("nti:|xdf:", "", title)
+from .instrument import timed
+from .parsing import clean_title, parse_time, as_list, is_true  # noqa: F401
 
 
 def _bytestring_to_num(bytestring, sample_width, byteorder, signed) -> list:
@@ -33,47 +22,27 @@ def _bytestring_to_num(bytestring, sample_width, byteorder, signed) -> list:
 
     Args:
         bytestring (bytes): Bytes object to be converted.
-        sample_width (int): Sample size in bytes.
-        byteorder (str): Endian-ness for multibyte samples.
+        sample_width (int): Sample size in bytes (1-4 or 8).
+        byteorder (str): "little" or "big".
         signed (bool): True indicates a signed sample (e.g. can be +/-).
 
     Returns:
-        list: Bytestring converted to numeric values.
+        list: Bytestring converted to numeric values, as a (1 x samples) array.
     """
-
-    fmt = "@"
-    if byteorder.lower() == "little":
-        fmt = "<"
-    elif byteorder.lower() == "big":
-        fmt = ">"
-
-    ctype = {"1": "b", "2": "h", "4": "l", "8": "q"}
-    c = ctype[str(sample_width)]
-
-    if signed:
-        fmtc = fmt + c
-    else:
-        fmtc = fmt + c.upper()
-
-    conversion = iter_unpack(fmtc, bytestring)
-    return np.array([list(chain(*conversion))])
+    raw = np.frombuffer(bytestring, dtype=np.uint8)
+    return decode_samples(raw, sample_width, byteorder, signed)[np.newaxis]
 
 
 def timeit(method):
     """Deorator function to help with timing
-    
+
+    Calls are reported to the active `openxdf.instrument` sink under the
+    method's qualified name.
+
     Args:
         method (function): Function to time
     """
-
-    def timed(*args, **kw):
-        ts = time()
-        result = method(*args, **kw)
-        te = time()
-        print("%r  %2.2f ms" % (method.__name__, (te - ts) * 1000))
-        return result
-
-    return timed
+    return timed(method.__qualname__)(method)
 
 
 def read_channel_from_file(fpath, start_location, channel_width, frame_width):
@@ -100,7 +69,140 @@ def read_channel_from_file(fpath, start_location, channel_width, frame_width):
     return output
 
 
-def butter_bandpass(lowcut, highcut, fs, order=5):
+def merge_ranges(starts, stops, gap=0) -> tuple:
+    """Merges overlapping half-open [start, stop) ranges
+
+    Args:
+        starts (array-like): Range starts.
+        stops (array-like): Range stops.
+        gap (int, optional): Defaults to 0. Also merge ranges separated by at
+            most this many units.
+
+    Returns:
+        tuple: (starts, stops) np.arrays of the merged, sorted ranges.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    if not len(starts):
+        return starts, stops
+
+    order = np.argsort(starts, kind="stable")
+    starts, stops = starts[order], stops[order]
+    reach = np.maximum.accumulate(stops)
+    new_run = np.ones(len(starts), dtype=bool)
+    new_run[1:] = starts[1:] > reach[:-1] + gap
+    run_ids = np.cumsum(new_run) - 1
+    merged_stops = np.zeros(run_ids[-1] + 1, dtype=np.int64)
+    np.maximum.at(merged_stops, run_ids, stops)
+    return starts[new_run], merged_stops
+
+
+def _byte_order(byteorder) -> str:
+    """NumPy byte order character for an XDF "Endian" value"""
+    order = {"little": "<", "big": ">"}.get(str(byteorder).lower())
+    if order is None:
+        raise ValueError(f"Unsupported byte order: {byteorder}")
+    return order
+
+
+def sample_dtype(sample_width, byteorder, signed) -> np.dtype:
+    """Returns the NumPy dtype of a single stored sample.
+
+    Args:
+        sample_width (int): Sample size in bytes (1, 2, 4, or 8).
+        byteorder (str): "little" or "big".
+        signed (bool): True indicates a signed sample.
+
+    Returns:
+        np.dtype: e.g. dtype('<i2')
+    """
+    if sample_width not in [1, 2, 4, 8]:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    kind = "i" if signed else "u"
+    return np.dtype(f"{_byte_order(byteorder)}{kind}{sample_width}")
+
+
+def decode_samples(data, sample_width, byteorder, signed) -> np.ndarray:
+    """Decodes packed fixed-width samples along the last axis of a byte array
+
+    Widths 1, 2, 4 and 8 are reinterpreted in place; packed 24-bit samples
+    are widened to 4 bytes through a reshaped byte view and sign-extended,
+    so whole blocks decode without per-sample unpacking.
+
+    Args:
+        data (np.ndarray): uint8 array; the last axis holds whole samples.
+        sample_width (int): Sample size in bytes (1-4 or 8).
+        byteorder (str): "little" or "big".
+        signed (bool): True indicates a signed sample.
+
+    Returns:
+        np.ndarray: int64 array with the last axis in samples.
+    """
+    data = np.ascontiguousarray(data, dtype=np.uint8)
+    if data.shape[-1] % sample_width:
+        raise ValueError(f"Data is not a whole number of {sample_width}-byte samples.")
+    if sample_width != 3:
+        return data.view(sample_dtype(sample_width, byteorder, signed)).astype(np.int64)
+
+    order = _byte_order(byteorder)
+    triples = data.reshape(data.shape[:-1] + (-1, 3))
+    wide = np.zeros(triples.shape[:-1] + (4,), dtype=np.uint8)
+    if order == "<":
+        wide[..., :3] = triples
+    else:
+        wide[..., 1:] = triples
+    values = wide.view(f"{order}u4")[..., 0].astype(np.int64)
+    if signed:
+        values -= (values & 0x800000) << 1
+    return values
+
+
+def read_frames(fpath, frame_width, start_frame=0, num_frames=None) -> np.ndarray:
+    """Reads a contiguous run of whole frames from an interleaved binary file
+
+    Args:
+        fpath (str): Filepath.
+        frame_width (int): Width of all channels in a single period.
+        start_frame (int, optional): Defaults to 0. First frame to read.
+        num_frames (int, optional): Defaults to None. Number of frames to read;
+            None reads to the last complete frame.
+
+    Returns:
+        np.ndarray: uint8 array of shape (frames, frame_width).
+    """
+    total_frames = os.path.getsize(fpath) // frame_width
+    if num_frames is None:
+        num_frames = total_frames - start_frame
+    num_frames = max(0, min(num_frames, total_frames - start_frame))
+
+    with open(fpath, "rb") as f:
+        f.seek(start_frame * frame_width, 0)
+        raw = np.fromfile(f, dtype=np.uint8, count=num_frames * frame_width)
+    return raw.reshape(-1, frame_width)
+
+
+def decode_frames(
+    frames, start_location, channel_width, sample_width, byteorder, signed
+) -> np.ndarray:
+    """Extracts and decodes one source from a block of raw frames
+
+    Args:
+        frames (np.ndarray): uint8 array of shape (frames, frame_width).
+        start_location (int): Number of bytes from start of frame.
+        channel_width (int): Number of bytes the channel takes per frame.
+        sample_width (int): Sample size in bytes (1-4 or 8).
+        byteorder (str): "little" or "big".
+        signed (bool): True indicates a signed sample.
+
+    Returns:
+        np.ndarray: int64 array of shape (frames, samples per frame).
+    """
+    stop = start_location + channel_width
+    block = frames[:, start_location:stop]
+    return decode_samples(block, sample_width, byteorder, signed)
+
+
+def butter_bandpass(lowcut, highcut, fs, order=5, output="ba"):
     """[summary]
     
     Args:
@@ -108,10 +210,15 @@ def butter_bandpass(lowcut, highcut, fs, order=5):
         highcut ([type]): [description]
         fs ([type]): [description]
         order (int, optional): Defaults to 5. [description]
+        output (str, optional): Defaults to "ba". "ba" for (b, a), or "sos"
+            for second-order sections, which stay stable for low cut-offs at
+            high sampling rates (e.g. 0.3 Hz at 512 Hz) where (b, a) is not.
     
     Returns:
         [type]: [description]
     """
+    from scipy.signal import butter
+
     def _switch(x):
         if x == 0:
             return 0.00001
@@ -123,23 +230,185 @@ def butter_bandpass(lowcut, highcut, fs, order=5):
     nyq = 0.5 * fs
     low = _switch(lowcut / nyq)
     high = _switch(highcut / nyq)
-    b, a = butter(order, [low, high], btype="band")
-    return b, a
+    return butter(order, [low, high], btype="band", output=output)
 
 
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=5):
-    """[summary]
-    
+def butter_bandpass_filter(
+    data, lowcut, highcut, fs, order=5, workers=1, output="sos"
+):
+    """Butterworth band-pass filter `data` along its last axis
+
+    The filter runs as second-order sections (`scipy.signal.sosfilt`) by
+    default. Releases up to 0.5.1 ran the single (b, a) transfer function
+    through `lfilter`, which is badly conditioned for low cut-offs: for the
+    usual 0.3-35 Hz montage filter at 200 Hz the two differ by about 1e-5 of
+    the signal level, and at 512 Hz the (b, a) form is unstable. Pass
+    output="ba" to reproduce the old results.
+
     Args:
-        data ([type]): [description]
-        lowcut ([type]): [description]
-        highcut ([type]): [description]
-        fs ([type]): [description]
-        order (int, optional): Defaults to 5. [description]
-    
+        data (np.ndarray): Samples.
+        lowcut (float): Low cut-off (Hz).
+        highcut (float): High cut-off (Hz).
+        fs (float): Sampling frequency (Hz).
+        order (int, optional): Defaults to 5. Butterworth order.
+        workers (int, optional): Defaults to 1. See `parallel_sosfilt`.
+        output (str, optional): Defaults to "sos". "sos" or "ba" (see above).
+
     Returns:
-        [type]: [description]
+        np.ndarray: Filtered samples with the shape of `data`.
     """
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    y = lfilter(b, a, data)
+    if output == "ba":
+        b, a = butter_bandpass(lowcut, highcut, fs, order=order)
+        return parallel_lfilter(b, a, data, workers=workers)
+    if output != "sos":
+        raise ValueError(f"Unsupported filter output: {output}")
+    sos = butter_bandpass(lowcut, highcut, fs, order=order, output="sos")
+    y = parallel_sosfilt(sos, data, workers=workers)
     return y
+
+
+def sos_poles(sos) -> np.ndarray:
+    """Poles of a filter given as second-order sections"""
+    return np.concatenate([np.roots(i[3:]) for i in np.atleast_2d(sos)])
+
+
+def filter_overlap(poles, rtol=1e-9):
+    """Samples for a filter's zero-state start-up transient to decay below `rtol`
+
+    The transient decays like r**n for the largest pole radius r.
+
+    Args:
+        poles (np.ndarray): Filter poles.
+        rtol (float, optional): Defaults to 1e-9. Transient level relative to
+            the filter state.
+
+    Returns:
+        int: Warm-up length in samples, or None if the filter is not stable.
+    """
+    poles = np.asarray(poles)
+    radius = float(np.abs(poles).max()) if poles.size else 0.0
+    if radius >= 1:
+        return None
+    if radius == 0:
+        return poles.size
+    return int(np.ceil(np.log(rtol) / np.log(radius))) + poles.size
+
+
+def _split_filter(apply, overlap, data, dtype, workers, block_size):
+    """Runs `apply` over blocks of the last axis of `data` in parallel
+
+    Every block after the first starts filtering `overlap` samples early from
+    a zero state; the warm-up samples are discarded when stitching.
+    """
+    data = np.asarray(data)
+    n = data.shape[-1]
+    workers = workers or os.cpu_count() or 1
+    if block_size is None:
+        block_size = -(-n // workers)
+    if overlap is not None:
+        # Keep the warm-up overhead at or below a quarter of each block
+        block_size = max(block_size, 4 * overlap)
+    if workers == 1 or overlap is None or n <= block_size:
+        return apply(data)
+
+    output = np.empty(data.shape, dtype=dtype)
+
+    def _block(start):
+        stop = min(start + block_size, n)
+        lead = min(start, overlap)
+        output[..., start:stop] = apply(data[..., start - lead : stop])[..., lead:]
+
+    # lfilter and sosfilt release the GIL, so blocks filter in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_block, range(0, n, block_size)))
+    return output
+
+
+def parallel_lfilter(b, a, data, workers=None, block_size=None, rtol=1e-9):
+    """`scipy.signal.lfilter` split over time blocks filtered in parallel
+
+    Matches serial `lfilter(b, a, data)` (zero initial state) to within `rtol`
+    of the signal level, plus the round-off of the (b, a) form itself. Filters
+    that are not numerically stable in (b, a) form are filtered serially.
+
+    Args:
+        b (np.ndarray): Numerator coefficients.
+        a (np.ndarray): Denominator coefficients.
+        data (np.ndarray): Samples; filtered along the last axis.
+        workers (int, optional): Defaults to None (one per CPU). Threads;
+            1 filters serially.
+        block_size (int, optional): Defaults to None (one block per worker).
+            Samples per block; raised to at least four warm-up lengths.
+        rtol (float, optional): Defaults to 1e-9. See `filter_overlap`.
+
+    Returns:
+        np.ndarray: Filtered samples with the shape of `data`.
+    """
+    from scipy.signal import lfilter
+
+    a = np.atleast_1d(a)
+    overlap = filter_overlap(np.roots(a) if a.size > 1 else [], rtol)
+    dtype = np.result_type(b, a, data, np.float64)
+    return _split_filter(
+        lambda x: lfilter(b, a, x), overlap, data, dtype, workers, block_size
+    )
+
+
+def parallel_sosfilt(sos, data, workers=None, block_size=None, rtol=1e-9):
+    """`scipy.signal.sosfilt` split over time blocks filtered in parallel
+
+    Args:
+        sos (np.ndarray): Second-order sections, (sections x 6).
+        data (np.ndarray): Samples; filtered along the last axis.
+        workers, block_size, rtol: As in `parallel_lfilter`.
+
+    Returns:
+        np.ndarray: Filtered samples with the shape of `data`.
+    """
+    from scipy.signal import sosfilt
+
+    sos = np.atleast_2d(sos)
+    dtype = np.result_type(sos, data, np.float64)
+    return _split_filter(
+        lambda x: sosfilt(sos, x),
+        filter_overlap(sos_poles(sos), rtol),
+        data,
+        dtype,
+        workers,
+        block_size,
+    )
+
+
+@lru_cache(maxsize=None)
+def resample_ratio(from_fs, to_fs) -> tuple:
+    """Smallest integer (up, down) pair with up / down == to_fs / from_fs
+
+    Args:
+        from_fs (float): Source sampling frequency (Hz).
+        to_fs (float): Target sampling frequency (Hz).
+
+    Returns:
+        tuple: (up, down)
+    """
+    ratio = Fraction(to_fs).limit_denominator(1000) / Fraction(
+        from_fs
+    ).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache(maxsize=64)
+def resample_taps(up, down) -> np.ndarray:
+    """Anti-aliasing FIR filter for polyphase resampling by up / down
+
+    Matches the filter `scipy.signal.resample_poly` designs by default, but is
+    only designed once per rate pair.
+
+    Returns:
+        np.ndarray: Read-only filter taps; pass as `window=` to resample_poly.
+    """
+    from scipy.signal import firwin
+
+    max_rate = max(up, down)
+    taps = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps.setflags(write=False)
+    return taps
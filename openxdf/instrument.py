@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.instrument
+~~~~~~~~~~~~~~~~~~
+
+Structured timings and counters for the parsing and decoding pipeline.
+
+Every instrumented stage reports to the active sink. The default sink
+discards everything, so instrumentation costs next to nothing unless a sink
+is installed:
+
+   >>> from openxdf import instrument
+   >>> with instrument.collect() as sink:
+   ...     xdf = openxdf.OpenXDF("/path/to/file/.../example.xdf")
+   ...     signal = openxdf.Signal(xdf, "/path/to/file/.../example.data")
+   ...     signal.read_file(["C3-A2"])
+   >>> sink.summary()
+   {"timings": {"xdf.parse": {"count": 1, "total": 0.131, "max": 0.131},
+                "signal.read": {...}, "signal.decode": {...}, ...},
+    "counters": {"signal.bytes_read": 11520000, "signal.frames_decoded": 57600}}
+"""
+
+import logging
+from time import perf_counter
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class NullSink(object):
+    """Discards all measurements. This is the default sink."""
+
+    def timing(self, stage: str, seconds: float, tags: dict):
+        pass
+
+    def count(self, name: str, value: float, tags: dict):
+        pass
+
+
+class MemorySink(object):
+    """Keeps every measurement in memory.
+
+    Attributes:
+        records (list): One dict per measurement, in arrival order:
+            {"kind": "timing" | "count", "name": _, "value": _, "tags": {...}}
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def timing(self, stage, seconds, tags):
+        self.records.append(
+            {"kind": "timing", "name": stage, "value": seconds, "tags": tags}
+        )
+
+    def count(self, name, value, tags):
+        self.records.append(
+            {"kind": "count", "name": name, "value": value, "tags": tags}
+        )
+
+    def clear(self):
+        self.records = []
+
+    def summary(self) -> dict:
+        """Aggregate the collected records by stage/counter name
+
+        Returns:
+            dict: {"timings": {stage: {"count": _, "total": _, "max": _}},
+                   "counters": {name: total}}
+        """
+        timings = {}
+        counters = {}
+        for record in self.records:
+            if record["kind"] == "timing":
+                stats = timings.setdefault(
+                    record["name"], {"count": 0, "total": 0.0, "max": 0.0}
+                )
+                stats["count"] += 1
+                stats["total"] += record["value"]
+                stats["max"] = max(stats["max"], record["value"])
+            else:
+                counters[record["name"]] = (
+                    counters.get(record["name"], 0) + record["value"]
+                )
+        return {"timings": timings, "counters": counters}
+
+
+class LoggingSink(object):
+    """Forwards measurements to a `logging.Logger`.
+
+    Args:
+        logger (logging.Logger, optional): Defaults to the "openxdf" logger.
+        level (int, optional): Defaults to logging.DEBUG.
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger if logger is not None else logging.getLogger("openxdf")
+        self.level = level
+
+    def timing(self, stage, seconds, tags):
+        self.logger.log(
+            self.level,
+            "%s took %.2f ms",
+            stage,
+            seconds * 1000,
+            extra={"openxdf_stage": stage, "openxdf_tags": tags},
+        )
+
+    def count(self, name, value, tags):
+        self.logger.log(
+            self.level,
+            "%s += %s",
+            name,
+            value,
+            extra={"openxdf_counter": name, "openxdf_tags": tags},
+        )
+
+
+class CallbackSink(object):
+    """Calls `callback(kind, name, value, tags)` for every measurement.
+
+    Useful for forwarding to an external metrics client (statsd, Prometheus,
+    OpenTelemetry, ...).
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def timing(self, stage, seconds, tags):
+        self.callback("timing", stage, seconds, tags)
+
+    def count(self, name, value, tags):
+        self.callback("count", name, value, tags)
+
+
+_NULL_SINK = NullSink()
+_default_sink = _NULL_SINK
+_active_sink = ContextVar("openxdf_sink", default=None)
+
+
+def get_sink():
+    """Returns the sink measurements are currently sent to"""
+    sink = _active_sink.get()
+    return _default_sink if sink is None else sink
+
+
+def set_sink(sink):
+    """Installs a process-wide default sink. `None` restores the no-op sink."""
+    global _default_sink
+    _default_sink = _NULL_SINK if sink is None else sink
+
+
+@contextmanager
+def use_sink(sink):
+    """Sends measurements to `sink` for the duration of the block
+
+    The sink is stored in a context variable, so concurrent threads and
+    asyncio tasks can each collect into their own sink.
+    """
+    token = _active_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _active_sink.reset(token)
+
+
+@contextmanager
+def collect():
+    """Collects measurements into a fresh `MemorySink` for the block"""
+    with use_sink(MemorySink()) as sink:
+        yield sink
+
+
+@contextmanager
+def timer(stage: str, **tags):
+    """Times the enclosed block as `stage`"""
+    sink = get_sink()
+    if sink is _NULL_SINK:
+        yield
+        return
+
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        sink.timing(stage, perf_counter() - start, tags)
+
+
+def count(name: str, value=1, **tags):
+    """Adds `value` to the counter `name`"""
+    sink = get_sink()
+    if sink is not _NULL_SINK:
+        sink.count(name, value, tags)
+
+
+def timed(stage: str):
+    """Decorator that times every call of the wrapped function as `stage`"""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kw):
+            with timer(stage):
+                return method(*args, **kw)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.parsing
+~~~~~~~~~~~~~~~
+
+Helpers for reading values out of parsed XDF documents. Kept free of NumPy so
+header-only use of `OpenXDF` stays cheap to import.
+"""
+
+import re
+from datetime import datetime
+
+
+def clean_title(title: str) -> str:
+    """Remove 'nti:' and 'xdf:' motifs from a str
+
+    Args:
+        title (str): Single string with motif
+
+    Returns:
+        str: Cleaned string
+    """
+    return re.sub("nti:|xdf:", "", title)
+
+
+def parse_time(timestamp: str) -> datetime:
+    """Parses an XDF timestamp (e.g. "2016-04-22T22:16:42.632001000000002")
+
+    Args:
+        timestamp (str): XDF timestamp with 15 fractional digits.
+
+    Returns:
+        datetime: Timestamp truncated to microseconds.
+    """
+    return datetime.strptime(timestamp[:-9], "%Y-%m-%dT%H:%M:%S.%f")
+
+
+def as_list(value) -> list:
+    """Normalizes an xmltodict child that may be missing, single, or repeated
+
+    Args:
+        value (None, dict or list): Parsed element(s).
+
+    Returns:
+        list: [] for None, [value] for a single element, else value.
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def is_true(value) -> bool:
+    """Interprets XDF boolean fields (e.g. "true"/"false") as a bool"""
+    return str(value).strip().lower() in ["true", "1", "yes"]
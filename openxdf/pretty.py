@@ -4,39 +4,167 @@
 openxdf.pretty
 ~~~~~~~~~~~~~~
 
-Pretty printing for OpenXDF files.
+Streaming de-identification for OpenXDF files.
 """
 
-import json
-import xmltodict
+import os
 import argparse
+from xml.sax import make_parser
+from xml.sax.saxutils import XMLGenerator
+from concurrent.futures import ProcessPoolExecutor
 
+PATIENT_FIELDS = ["xdf:FirstName", "xdf:LastName", "xdf:DOB", "xdf:Comments"]
+SCORER_FIELDS = ["xdf:FirstName", "xdf:LastName"]
 
-## Command Line Argument parsing
-parser = argparse.ArgumentParser(
-    description="Print decrypted OpenXDF files in a pretty, human-readable way"
-)
-required_args = parser.add_argument_group("required arguments")
-required_args.add_argument("-i", "--input", help="Input file path", required=True)
-required_args.add_argument(
-    "-o", "--output", help="Output file parent folder", required=True
-)
-args = parser.parse_args()
-
-
-def main(ipath: str, opath: str):
-    with open(ipath, "r") as f:
-        xdf_odict = xmltodict.parse(f.read())
-    
-    xdf = json.loads(json.dumps(xdf_odict))
-    
-    terms = ["xdf:FirstName", "xdf:LastName", "xdf:DOB", "xdf:Comments"]
-    for term in terms:
-        xdf["xdf:OpenXDF"]["xdf:PatientInformation"][term] = None
-    
-    with open(opath, "w") as o:
-       o.write(json.dumps(xdf, indent=4))
+
+class DeidentifyHandler(XMLGenerator):
+    """SAX handler that echoes a document while redacting identifiers.
+
+    Patient `FirstName`, `LastName`, `DOB` and `Comments` are written as empty
+    elements. Scorer first names are replaced by a pseudonym ("Scorer1",
+    "Scorer2", ...) so scorers stay distinguishable, and last names are
+    emptied. Nothing else in the document is touched.
+    """
+
+    def __init__(self, out, encoding="utf-8"):
+        super().__init__(out, encoding, short_empty_elements=True)
+        self._stack = []
+        self._redacting = 0
+        self._num_scorers = 0
+
+    def _redact(self, name):
+        if len(self._stack) < 2:
+            return None
+        parent = self._stack[-2]
+        if parent == "xdf:PatientInformation" and name in PATIENT_FIELDS:
+            return ""
+        if parent == "xdf:Scorer" and name in SCORER_FIELDS:
+            if name == "xdf:FirstName":
+                return f"Scorer{self._num_scorers}"
+            return ""
+        return None
+
+    def startElement(self, name, attrs):
+        self._stack.append(name)
+        if name == "xdf:Scorer":
+            self._num_scorers += 1
+
+        super().startElement(name, attrs)
+        if self._redacting:
+            self._redacting += 1
+            return
+
+        replacement = self._redact(name)
+        if replacement is not None:
+            self._redacting = 1
+            if replacement:
+                super().characters(replacement)
+
+    def endElement(self, name):
+        if self._redacting:
+            self._redacting -= 1
+        self._stack.pop()
+        super().endElement(name)
+
+    def characters(self, content):
+        if not self._redacting:
+            super().characters(content)
+
+    def ignorableWhitespace(self, content):
+        if not self._redacting:
+            super().ignorableWhitespace(content)
+
+
+def deidentify(ipath: str, opath: str) -> str:
+    """Stream a single XDF document to `opath` with identifiers removed
+
+    Args:
+        ipath (str): Input `.xdf` file path.
+        opath (str): Output file path.
+
+    Returns:
+        str: Output file path.
+    """
+    parser = make_parser()
+    with open(opath, "w", encoding="utf-8") as o:
+        parser.setContentHandler(DeidentifyHandler(o))
+        with open(ipath, "rb") as f:
+            parser.parse(f)
+    return opath
+
+
+def _deidentify_job(paths):
+    ipath, opath = paths
+    os.makedirs(os.path.dirname(opath) or ".", exist_ok=True)
+    return deidentify(ipath, opath)
+
+
+def deidentify_tree(
+    input_dir: str, output_dir: str, workers=None, extension=".xdf"
+) -> list:
+    """De-identify every XDF document below a directory
+
+    The directory layout under `input_dir` is mirrored in `output_dir`.
+
+    Args:
+        input_dir (str): Folder to search recursively.
+        output_dir (str): Output parent folder.
+        workers (int, optional): Defaults to None (one per CPU). Number of
+            worker processes; 1 runs in the calling process.
+        extension (str, optional): Defaults to ".xdf".
+
+    Returns:
+        list: Output file paths.
+    """
+    jobs = []
+    for dirpath, _, filenames in os.walk(input_dir):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(extension):
+                continue
+            ipath = os.path.join(dirpath, filename)
+            opath = os.path.join(output_dir, os.path.relpath(ipath, input_dir))
+            jobs.append((ipath, opath))
+
+    if workers == 1 or len(jobs) <= 1:
+        return [_deidentify_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_deidentify_job, jobs))
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write de-identified copies of OpenXDF files"
+    )
+    required_args = parser.add_argument_group("required arguments")
+    required_args.add_argument(
+        "-i", "--input", help="Input file or folder path", required=True
+    )
+    required_args.add_argument(
+        "-o", "--output", help="Output file or parent folder", required=True
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes in batch mode (default: one per CPU)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    if os.path.isdir(args.input):
+        deidentify_tree(args.input, args.output, workers=args.jobs)
+        return
+
+    opath = args.output
+    if os.path.isdir(opath):
+        opath = os.path.join(opath, os.path.basename(args.input))
+    deidentify(args.input, opath)
 
 
 if __name__ == "__main__":
-    main(args.input, args.output)
+    main()
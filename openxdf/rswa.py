@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.rswa
+~~~~~~~~~~~~
+
+REM sleep without atonia (RSWA) quantification from chin EMG.
+
+Only the REM epochs of one scorer's staging are decoded. The filtered EMG is
+turned into a rolling RMS envelope, and every 3-s mini-epoch is scored for
+tonic activity (envelope above `tonic_factor` x baseline for at least half
+the mini-epoch) and phasic activity (bursts above `phasic_factor` x baseline
+lasting `phasic_duration` seconds). The baseline is a low percentile of the
+mini-epoch median envelope over all REM, i.e. the study's own atonia level.
+
+   >>> from openxdf import rswa
+   >>> result = rswa.score(signal, channel="Chin", scorer="Dennis")
+   >>> result["summary"]
+   {"rem_epochs": 212, "tonic_percent": 3.3, "phasic_percent": 11.6,
+    "any_percent": 13.1}
+   >>> rswa.cohort(studies, channel="Chin")  # one result per study
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .xdf import OpenXDF
+from .signal import Signal
+from .dataset import stage_labels
+from .constants import STAGE_CODES
+
+
+def rolling_rms(data, window: int) -> np.ndarray:
+    """Centered moving RMS along the last axis
+
+    Uses cumulative sums of squares and of missing samples, so the cost does
+    not depend on `window` and a NaN (e.g. a recording gap) only blanks the
+    windows that contain it. Windows are truncated at the edges.
+
+    Args:
+        data (np.ndarray): Signal, (..., samples).
+        window (int): Window length in samples.
+
+    Returns:
+        np.ndarray: RMS envelope with the shape of `data`; NaN for windows
+        that contain a NaN.
+    """
+    n = data.shape[-1]
+    squares = np.zeros(data.shape[:-1] + (n + 1,))
+    missing = np.zeros(data.shape[:-1] + (n + 1,), dtype=np.int64)
+    np.cumsum(np.isnan(data), axis=-1, out=missing[..., 1:])
+    values = np.square(np.nan_to_num(data), dtype=np.float64)
+    np.cumsum(values, axis=-1, out=squares[..., 1:])
+    index = np.arange(n) - window // 2
+    lo = np.clip(index, 0, n)
+    hi = np.clip(index + window, 0, n)
+    power = (squares[..., hi] - squares[..., lo]) / (hi - lo)
+    envelope = np.sqrt(np.maximum(power, 0))
+    envelope[missing[..., hi] > missing[..., lo]] = np.nan
+    return envelope
+
+
+def _runs(mask) -> tuple:
+    """Row, start and stop of every run of True along the rows of a 2-D mask"""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, stops = np.nonzero(edges == -1)
+    return rows, starts, stops
+
+
+def rem_epochs(xdf, num_epochs, scorer=None) -> np.ndarray:
+    """1-indexed numbers of the epochs a scorer staged as REM"""
+    labels = stage_labels(xdf, num_epochs, scorer)
+    return np.flatnonzero(labels == STAGE_CODES["R"]) + 1
+
+
+def read_epochs(signal, channel, epochs, settle=None) -> np.ndarray:
+    """Filtered samples of `channel` for a set of epochs
+
+    Consecutive epochs are read and filtered as one run, with `settle`
+    seconds of data before each run to let the filter settle (see
+    `Signal.read_epochs`; None derives it from the montage filter).
+
+    Returns:
+        np.ndarray: (epochs x samples per epoch) array.
+    """
+    return signal.read_epochs([channel], epochs, settle)[channel]
+
+
+def score(
+    signal,
+    channel="Chin",
+    scorer=None,
+    mini_epoch=3.0,
+    window=0.1,
+    tonic_factor=2.0,
+    phasic_factor=4.0,
+    phasic_duration=(0.1, 5.0),
+    baseline_percentile=5.0,
+    settle=None,
+) -> dict:
+    """Scores tonic and phasic chin EMG activity over a study's REM sleep
+
+    Args:
+        signal (Signal): Study signal.
+        channel (str, optional): Defaults to "Chin". EMG channel.
+        scorer (str, optional): Defaults to None (first scorer). Scorer whose
+            staging selects the REM epochs.
+        mini_epoch (float, optional): Defaults to 3.0. Mini-epoch seconds.
+        window (float, optional): Defaults to 0.1. RMS window in seconds.
+        tonic_factor (float, optional): Defaults to 2.0. Tonic threshold as a
+            multiple of the atonia baseline.
+        phasic_factor (float, optional): Defaults to 4.0. Phasic threshold as
+            a multiple of the atonia baseline.
+        phasic_duration (tuple, optional): Defaults to (0.1, 5.0). Shortest and
+            longest phasic burst in seconds.
+        baseline_percentile (float, optional): Defaults to 5.0. Percentile of
+            REM mini-epoch median envelopes taken as the atonia baseline.
+        settle (float, optional): Defaults to None (derived from the
+            montage filter, see `Signal.read_epochs`). Filter warm-up seconds.
+
+    Returns:
+        dict: {"epochs": REM epoch numbers,
+               "baseline": atonia envelope level,
+               "tonic": fraction above tonic threshold (epochs x mini-epochs),
+               "phasic": fraction in phasic bursts (epochs x mini-epochs),
+               "tonic_epochs": bool per epoch (tonic in >= half its
+                   mini-epochs),
+               "summary": {"rem_epochs": _, "tonic_percent": _,
+                           "phasic_percent": _, "any_percent": _}}
+    """
+    header = signal._xdf.header
+    epoch_frames = header["EpochLength"] // header["FrameLength"]
+    num_epochs = signal._num_frames // epoch_frames
+    epochs = rem_epochs(signal._xdf, num_epochs, scorer)
+
+    data = read_epochs(signal, channel, epochs, settle)
+    fs = data.shape[1] / header["EpochLength"]
+    mini = int(round(mini_epoch * fs))
+    num_mini = data.shape[1] // mini
+    envelope = rolling_rms(data, max(1, int(round(window * fs))))
+    envelope = envelope[:, : num_mini * mini]
+
+    # Strided view: (epochs, mini-epochs, samples per mini-epoch)
+    minis = envelope.reshape(len(epochs), num_mini, mini)
+    medians = np.median(minis, axis=2)
+    valid = np.isfinite(medians)
+    baseline = (
+        float(np.percentile(medians[valid], baseline_percentile))
+        if valid.any()
+        else np.nan
+    )
+
+    tonic = (minis > tonic_factor * baseline).mean(axis=2)
+
+    rows, starts, stops = _runs(envelope > phasic_factor * baseline)
+    shortest, longest = (int(round(i * fs)) for i in phasic_duration)
+    keep = ((stops - starts) >= shortest) & ((stops - starts) <= longest)
+    # Mark burst samples with a +1/-1 difference array and a cumulative sum
+    marks = np.zeros((envelope.shape[0], envelope.shape[1] + 1), dtype=np.int32)
+    np.add.at(marks, (rows[keep], starts[keep]), 1)
+    np.add.at(marks, (rows[keep], stops[keep]), -1)
+    bursts = np.cumsum(marks, axis=1)[:, :-1] > 0
+    phasic = bursts.reshape(len(epochs), num_mini, mini).mean(axis=2)
+
+    tonic_minis = tonic >= 0.5
+    tonic_epochs = tonic_minis.mean(axis=1) >= 0.5
+    phasic_minis = phasic > 0
+
+    def _percent(mask):
+        return float(100.0 * mask.sum() / mask.size) if mask.size else np.nan
+
+    return {
+        "epochs": epochs,
+        "baseline": baseline,
+        "tonic": tonic,
+        "phasic": phasic,
+        "tonic_epochs": tonic_epochs,
+        "summary": {
+            "rem_epochs": int(len(epochs)),
+            "tonic_percent": _percent(tonic_epochs),
+            "phasic_percent": _percent(phasic_minis),
+            "any_percent": _percent(tonic_minis | phasic_minis),
+        },
+    }
+
+
+def _score_study(args):
+    (xdf_path, data_path), kwargs = args
+    xdf = OpenXDF(xdf_path)
+    result = score(Signal(xdf, data_path), **kwargs)
+    result["id"] = xdf.id
+    return result
+
+
+def cohort(studies, workers=None, **kwargs) -> list:
+    """Scores many studies, one worker process per study
+
+    Args:
+        studies (list): (xdf_path, data_path) pairs, or records returned by
+            `openxdf.catalog.Catalog.query`.
+        workers (int, optional): Defaults to None (one per CPU). Number of
+            worker processes; 1 scores in this process.
+        **kwargs: Passed to `score`.
+
+    Returns:
+        list: One `score` result per study, in order, with an added "id".
+    """
+    jobs = []
+    for study in studies:
+        if isinstance(study, dict):
+            study = (study["path"], study["data_path"])
+        jobs.append((tuple(study), kwargs))
+
+    if workers == 1 or len(jobs) <= 1:
+        return list(map(_score_study, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_score_study, jobs))
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.serve
+~~~~~~~~~~~~~
+
+Local HTTP tile server for browser-based viewers, built on asyncio streams
+from the standard library.
+
+   $ python -m openxdf.serve --catalog studies.sqlite --port 8000
+
+Endpoints (all GET):
+
+    /studies                              JSON list of study IDs
+    /studies/{id}                         JSON study summary and channel rates
+    /studies/{id}/channels/{ch}?t0=&t1=   float32 samples between t0 and t1
+    /studies/{id}/channels/{ch}?t0=&t1=&px=
+                                          float32 (min, max) pairs, one per pixel
+    /studies/{id}/events?scorer=&t0=&t1=  JSON events with onsets in seconds
+    /studies/{id}/staging?scorer=         JSON sleep stages per epoch
+
+Times are seconds since the study start; tiles stop at the end of the
+recording. Binary responses are little-endian float32 with NaN in recording
+gaps; the "X-Sample-Rate", "X-Start" and "X-Layout" ("samples" or "minmax")
+headers describe them.
+"""
+
+import json
+import math
+import asyncio
+import logging
+import argparse
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import numpy as np
+
+from .xdf import OpenXDF
+from .signal import Signal
+
+# Largest tile, in samples, that a single request may ask for
+MAX_SAMPLES = 2**27
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Study(object):
+    """An opened study with everything a request needs precomputed"""
+
+    def __init__(self, study_id, xdf_path, data_path):
+        self.id = study_id
+        self.xdf = OpenXDF(xdf_path)
+        self.signal = Signal(self.xdf, data_path)
+        self.frame_length = self.xdf.header["FrameLength"]
+        self.epoch_length = self.xdf.header["EpochLength"]
+        self.rates = {
+            channel: self.signal._samples_per_frame(self.signal._leads(channel)[0])
+            / self.frame_length
+            for channel in self.signal.list_channels
+        }
+        # Seconds decoded before a tile so the bandpass filter has settled,
+        # derived from each channel's montage filter on first use
+        self._settle = {}
+        self._events = None
+        self._tiles = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def duration(self) -> float:
+        return self.signal._num_frames * self.frame_length
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "start_time": self.xdf.start_time.isoformat(),
+            "duration": self.duration,
+            "epoch_length": self.epoch_length,
+            "channels": self.rates,
+            "scorers": [i["header"]["first_name"] for i in self.xdf.scoring],
+        }
+
+    def samples(self, channel, t0, t1) -> np.ndarray:
+        """Filtered samples of `channel` in [t0, t1), NaN outside the recording"""
+        fs = self.rates[channel]
+        first, last = int(round(t0 * fs)), int(round(t1 * fs))
+        output = np.full(max(last - first, 0), np.nan, dtype=np.float32)
+
+        if channel not in self._settle:
+            self._settle[channel] = self.signal._warm_up([channel])
+        start = max(0.0, t0 - self._settle[channel])
+        start_frame = int(start // self.frame_length)
+        data = self.signal.read_file([channel], start=start, stop=t1)[channel]
+        data = data.ravel()
+        offset = int(round(start_frame * self.frame_length * fs))
+        lo, hi = max(first, offset), min(last, offset + len(data))
+        if hi > lo:
+            output[lo - first : hi - first] = data[lo - offset : hi - offset]
+        return output
+
+    def tile(self, channel, t0, t1, px=None, max_tiles=256) -> tuple:
+        """Samples, or a (min, max) envelope when there are more than 2 per px
+
+        Envelopes are kept in a small per-study LRU, since overview tiles are
+        requested repeatedly while scrolling.
+
+        Returns:
+            tuple: ("samples" | "minmax", float32 np.array)
+        """
+        key = (channel, t0, t1, px)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        samples = self.samples(channel, t0, t1)
+        if not px or len(samples) <= 2 * px:
+            return "samples", samples
+
+        edges = np.linspace(0, len(samples), px + 1).astype(np.int64)[:-1]
+        envelope = np.empty((px, 2), dtype=np.float32)
+        envelope[:, 0] = np.minimum.reduceat(samples, edges)
+        envelope[:, 1] = np.maximum.reduceat(samples, edges)
+        result = ("minmax", envelope.ravel())
+        with self._lock:
+            self._tiles[key] = result
+            while len(self._tiles) > max_tiles:
+                self._tiles.popitem(last=False)
+        return result
+
+    def events(self, scorer=None, t0=None, t1=None) -> list:
+        if self._events is None:
+            events = []
+            for name, sections in self.xdf.events.items():
+                for section, entries in sections.items():
+                    onsets = self.signal._event_offsets(entries)
+                    for entry, onset in zip(entries, onsets):
+                        event = dict(entry, scorer=name, section=section)
+                        event["onset"] = float(onset)
+                        events.append(event)
+            self._events = sorted(events, key=lambda i: i["onset"])
+
+        return [
+            i
+            for i in self._events
+            if (scorer is None or i["scorer"] == scorer)
+            and (t0 is None or i["onset"] >= t0)
+            and (t1 is None or i["onset"] < t1)
+        ]
+
+    def staging(self, scorer=None) -> dict:
+        scoring = self.xdf.scoring
+        if scorer is not None:
+            scoring = [i for i in scoring if i["header"]["first_name"] == scorer]
+        if not scoring:
+            raise HTTPError(404, f"No staging for scorer {scorer}.")
+        return {
+            "scorer": scoring[0]["header"]["first_name"],
+            "epoch_length": self.epoch_length,
+            "stages": scoring[0]["staging"],
+        }
+
+
+class StudyPool(object):
+    """Opens studies on demand and keeps the most recently used ones open.
+
+    Args:
+        studies (dict or list, optional): {study_id: (xdf_path, data_path)},
+            or records returned by `openxdf.catalog.Catalog.query`.
+        max_open (int, optional): Defaults to 16. Studies kept open.
+    """
+
+    def __init__(self, studies=None, max_open=16):
+        self.max_open = max_open
+        self._paths = {}
+        self._open = OrderedDict()
+        self._lock = Lock()
+        if isinstance(studies, dict):
+            for study_id, (xdf_path, data_path) in studies.items():
+                self.add(study_id, xdf_path, data_path)
+        else:
+            for record in studies or []:
+                self.add(record["id"], record["path"], record["data_path"])
+
+    def __repr__(self):
+        return f"<StudyPool [{len(self._open)}/{len(self._paths)} open]>"
+
+    @property
+    def ids(self) -> list:
+        return sorted(self._paths)
+
+    def add(self, study_id, xdf_path, data_path):
+        self._paths[study_id] = (xdf_path, data_path)
+
+    def get(self, study_id) -> _Study:
+        with self._lock:
+            if study_id in self._open:
+                self._open.move_to_end(study_id)
+                return self._open[study_id]
+        if study_id not in self._paths:
+            raise HTTPError(404, f"Unknown study {study_id}.")
+
+        study = _Study(study_id, *self._paths[study_id])
+        with self._lock:
+            study = self._open.setdefault(study_id, study)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return study
+
+
+def _number(query, name, default=None, kind=float):
+    if name not in query:
+        if default is None:
+            raise HTTPError(400, f"Missing query parameter {name}.")
+        return default
+    try:
+        value = kind(query[name][0])
+    except ValueError:
+        raise HTTPError(400, f"Invalid query parameter {name}.")
+    if not math.isfinite(value):
+        raise HTTPError(400, f"Query parameter {name} must be finite.")
+    return value
+
+
+class TileServer(object):
+    """asyncio HTTP front end for a `StudyPool`.
+
+    Use:
+        >>> server = TileServer(StudyPool({"Example": (xdf_path, data_path)}))
+        >>> asyncio.run(server.serve_forever())
+    """
+
+    def __init__(self, pool, host="127.0.0.1", port=8000):
+        self.pool = pool
+        self.host = host
+        self.port = port
+
+    def route(self, method, target) -> tuple:
+        """Answers one request
+
+        Returns:
+            tuple: (status, headers, body)
+        """
+        if method != "GET":
+            raise HTTPError(405, "Only GET is supported.")
+        url = urlsplit(target)
+        parts = [unquote(i) for i in url.path.strip("/").split("/")]
+        query = parse_qs(url.query)
+
+        if parts == ["studies"]:
+            return _json(self.pool.ids)
+        if len(parts) < 2 or parts[0] != "studies":
+            raise HTTPError(404, f"No route for {url.path}.")
+
+        study = self.pool.get(parts[1])
+        if len(parts) == 2:
+            return _json(study.summary())
+
+        if len(parts) == 4 and parts[2] == "channels":
+            channel = parts[3]
+            if channel not in study.rates:
+                raise HTTPError(404, f"Unknown channel {channel}.")
+            t0 = _number(query, "t0", 0.0)
+            t1 = min(_number(query, "t1", study.duration), study.duration)
+            px = _number(query, "px", 0, int)
+            if t1 <= t0 or px < 0:
+                raise HTTPError(400, "Require t0 < t1 <= duration and px >= 0.")
+            if (t1 - t0) * study.rates[channel] > MAX_SAMPLES:
+                raise HTTPError(400, f"Tiles are limited to {MAX_SAMPLES} samples.")
+            layout, data = study.tile(channel, t0, t1, px)
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "X-Sample-Rate": repr(study.rates[channel]),
+                "X-Start": repr(t0),
+                "X-Layout": layout,
+            }
+            return 200, headers, data.astype("<f4", copy=False).tobytes()
+
+        scorer = query.get("scorer", [None])[0]
+        if parts[2:] == ["events"]:
+            t0 = _number(query, "t0", float("-inf"))
+            t1 = _number(query, "t1", float("inf"))
+            return _json(study.events(scorer, t0, t1))
+        if parts[2:] == ["staging"]:
+            return _json(study.staging(scorer))
+        raise HTTPError(404, f"No route for {url.path}.")
+
+    async def _respond(self, method, target) -> tuple:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, self.route, method, target)
+        except HTTPError as e:
+            return _json({"error": str(e)}, e.status)
+        except Exception as e:
+            logger.exception("Failed to answer %s %s", method, target)
+            return _json({"error": f"{type(e).__name__}: {e}"}, 500)
+
+    async def handle(self, reader, writer):
+        """Serves requests on one (keep-alive) connection"""
+        try:
+            while True:
+                request = await reader.readline()
+                if not request.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request.decode("latin-1").split()
+                except ValueError:
+                    status, response_headers, body = _json(
+                        {"error": "Bad request"}, 400
+                    )
+                    version = "HTTP/1.0"
+                else:
+                    status, response_headers, body = await self._respond(method, target)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if version == "HTTP/1.0":
+                    keep_alive = headers.get("connection", "").lower() == "keep-alive"
+
+                response_headers.update(
+                    {
+                        "Content-Length": str(len(body)),
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Expose-Headers": "X-Sample-Rate, X-Start, "
+                        "X-Layout",
+                        "Connection": "keep-alive" if keep_alive else "close",
+                    }
+                )
+                head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                head += "".join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+                writer.write(head.encode("latin-1") + b"\r\n" + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Starts listening; returns the `asyncio.Server`"""
+        # Import the filter code now rather than on the first tile request
+        import scipy.signal  # noqa: F401
+
+        return await asyncio.start_server(self.handle, self.host, self.port)
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+
+def _json(value, status=200) -> tuple:
+    body = json.dumps(value, default=str).encode("utf-8")
+    return status, {"Content-Type": "application/json"}, body
+
+
+def serve(studies, host="127.0.0.1", port=8000, max_open=16):
+    """Runs a tile server until interrupted
+
+    Args:
+        studies (dict or list): See `StudyPool`.
+        host (str, optional): Defaults to "127.0.0.1".
+        port (int, optional): Defaults to 8000.
+        max_open (int, optional): Defaults to 16. Studies kept open.
+    """
+    server = TileServer(StudyPool(studies, max_open), host, port)
+    asyncio.run(server.serve_forever())
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve waveform tiles for OpenXDF studies over HTTP"
+    )
+    parser.add_argument(
+        "-c", "--catalog", help="Serve every study in this openxdf catalog"
+    )
+    parser.add_argument(
+        "-s",
+        "--study",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("ID", "XDF", "DATA"),
+        help="Serve a single study (may be repeated)",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("-p", "--port", type=int, default=8000, help="Port")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    studies = {}
+    if args.catalog:
+        from .catalog import Catalog
+
+        for record in Catalog(args.catalog).query():
+            studies[record["id"]] = (record["path"], record["data_path"])
+    for study_id, xdf_path, data_path in args.study:
+        studies[study_id] = (xdf_path, data_path)
+
+    serve(studies, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
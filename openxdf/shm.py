@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.shm
+~~~~~~~~~~~
+
+Shares decoded channels between processes through a single
+`multiprocessing.shared_memory` block. One process decodes and publishes;
+workers attach with a small picklable handle and get read-only NumPy views
+of the same memory, without copying:
+
+   >>> from openxdf import shm
+   >>> store = shm.publish(signal, ["C3-A2", "EKG"])
+   >>> handle = store.handle  # send this to the workers
+   ...
+   >>> # in a worker process
+   >>> with shm.attach(handle) as shared:
+   ...     shared["C3-A2"].mean()
+   >>> store.close()
+
+Every publish/attach adds a reference and every `close` drops one; the block
+is unlinked when the last reference is closed. Arrays taken from a store
+must be released before that store is closed.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows frees the block with its last handle anyway
+    fcntl = None
+
+_ALIGN = 64
+_HEADER = _ALIGN
+
+
+def _lock_path(name):
+    return os.path.join(tempfile.gettempdir(), f"openxdf-{name.lstrip('/')}.lock")
+
+
+@contextmanager
+def _locked(name):
+    if fcntl is None:
+        yield
+        return
+    with open(_lock_path(name), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _tracked_name(block):
+    # the tracker keys POSIX blocks by their leading-slash name
+    return "/" + block.name if os.name == "posix" else block.name
+
+
+def _open(name=None, size=0):
+    """Opens a block without handing its lifetime to the resource tracker
+
+    The tracker would otherwise unlink the block when whichever process
+    created or attached it exits, even while other processes still use it.
+    """
+    create = name is None or size > 0
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    block = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(_tracked_name(block), "shared_memory")
+    return block
+
+
+def _unlink(block):
+    if sys.version_info < (3, 13):
+        # unlink() unregisters from the tracker, so hand the name back first
+        resource_tracker.register(_tracked_name(block), "shared_memory")
+    block.unlink()
+
+
+def _view(block, spec) -> np.ndarray:
+    # np.frombuffer keeps a buffer export alive, so closing the block while
+    # views exist raises BufferError instead of leaving them dangling
+    dtype = np.dtype(spec["dtype"])
+    count = int(np.prod(spec["shape"], dtype=np.int64))
+    view = np.frombuffer(block.buf, dtype=dtype, count=count, offset=spec["offset"])
+    return view.reshape(spec["shape"])
+
+
+def _references(block) -> np.ndarray:
+    return _view(block, {"dtype": "<i8", "shape": [1], "offset": 0})
+
+
+class SharedStore(object):
+    """Read-only mapping of array names to views of a shared memory block.
+
+    Description:
+        Created by `share`, `publish` or `attach`; not meant to be
+        instantiated directly.
+
+    Attributes:
+        handle (dict): Picklable description of the block, passed to `attach`:
+            {"name": _, "arrays": {key: {"offset": _, "shape": _, "dtype": _}}}
+    """
+
+    def __init__(self, block, handle):
+        self._block = block
+        self._views = {}
+        self.handle = handle
+
+    def __repr__(self):
+        return f"<SharedStore [{self.handle['name']}]>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getitem__(self, key):
+        if self._block is None:
+            raise ValueError("Shared store is closed.")
+        if key not in self._views:
+            view = _view(self._block, self.handle["arrays"][key])
+            view.flags.writeable = False
+            self._views[key] = view
+        return self._views[key]
+
+    def __contains__(self, key):
+        return key in self.handle["arrays"]
+
+    def __iter__(self):
+        return iter(self.handle["arrays"])
+
+    def __len__(self):
+        return len(self.handle["arrays"])
+
+    def keys(self):
+        return self.handle["arrays"].keys()
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    @property
+    def closed(self) -> bool:
+        return self._block is None
+
+    @property
+    def references(self) -> int:
+        """Number of open stores (in any process) on this block"""
+        with _locked(self.handle["name"]):
+            return int(_references(self._block)[0])
+
+    def close(self):
+        """Drops this store's reference, unlinking the block after the last one
+
+        Raises:
+            BufferError: Arrays taken from this store are still alive. The
+                store can no longer hand out arrays; release them and call
+                `close` again to drop the reference.
+        """
+        if self._block is None:
+            return
+        self._views = {}
+        try:
+            self._block.close()
+        except BufferError:
+            raise BufferError(
+                "Release all arrays taken from the store before closing it."
+            ) from None
+        # our own mapping is gone, so drop the reference through a fresh one
+        name = self.handle["name"]
+        block = _open(name)
+        with _locked(name):
+            references = _references(block)
+            references[0] -= 1
+            remaining = int(references[0])
+            del references
+            block.close()
+            if remaining <= 0:
+                _unlink(block)
+        if remaining <= 0 and fcntl is not None:
+            try:
+                os.remove(_lock_path(name))
+            except FileNotFoundError:
+                pass
+        self._block = None
+
+
+def share(arrays: dict, name=None) -> SharedStore:
+    """Copies arrays into a new shared memory block
+
+    Args:
+        arrays (dict): {key: np.ndarray}
+        name (str, optional): Defaults to None (random name). Block name.
+
+    Returns:
+        SharedStore: The publishing store, holding the first reference.
+    """
+    specs = {}
+    offset = _HEADER
+    for key, array in arrays.items():
+        array = np.asarray(array)
+        specs[key] = {
+            "offset": offset,
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+        }
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+
+    block = _open(name, size=max(offset, 1))
+    for key, array in arrays.items():
+        target = _view(block, specs[key])
+        target[...] = array
+        del target
+    _references(block)[0] = 1
+
+    return SharedStore(block, {"name": block.name, "arrays": specs})
+
+
+def publish(signal, channels: list, name=None, dtype=np.float64) -> SharedStore:
+    """Decodes channels once with `Signal.read_file` and shares them
+
+    Args:
+        signal (Signal): Signal to decode.
+        channels (list): List of channels to decode.
+        name (str, optional): Defaults to None (random name). Block name.
+        dtype (np.dtype, optional): Defaults to np.float64. Stored dtype.
+
+    Returns:
+        SharedStore: The publishing store; `store.handle` attaches workers.
+    """
+    decoded = signal.read_file(channels)
+    return share({k: v.astype(dtype, copy=False) for k, v in decoded.items()}, name)
+
+
+def attach(handle: dict) -> SharedStore:
+    """Attaches to a published block without copying
+
+    Args:
+        handle (dict): `SharedStore.handle` of the publishing store.
+
+    Raises:
+        FileNotFoundError: The block has already been released.
+
+    Returns:
+        SharedStore: A store holding its own reference; close it when done.
+    """
+    block = _open(handle["name"])
+    with _locked(handle["name"]):
+        references = _references(block)
+        if references[0] <= 0:
+            del references
+            block.close()
+            raise FileNotFoundError(f"Shared store {handle['name']} was released.")
+        references[0] += 1
+        del references
+    return SharedStore(block, handle)
@@ -7,16 +7,98 @@ openxdf.signal
 This module allows users to read the raw signal data associated with PSG files
 """
 
+import os
+import time
+import asyncio
+import warnings
+from datetime import datetime
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from .exceptions import XDFSourceError
+from .constants import STAGE_CODES
+from .instrument import timer, count
+from .cache import get_cache, file_key
+from .archive import ArchiveReader, is_archive
 from .helpers import (
-    _bytestring_to_num,
     timeit,
-    read_channel_from_file,
+    read_frames,
+    decode_frames,
+    is_true,
+    resample_ratio,
+    resample_taps,
+    merge_ranges,
+    parse_time,
     butter_bandpass,
     butter_bandpass_filter,
+    filter_overlap,
+    sos_poles,
 )
 
+# Filter warm-up read before each run of epochs when none can be derived
+MAX_SETTLE = 300.0
+
+
+def _decode_scratch(channel) -> int:
+    """Temporary bytes per frame `decode_frames` needs for one source
+
+    A contiguous copy of the source's bytes and, for packed 24-bit samples,
+    the widened 4-byte words and an int64 sign-extension term.
+    """
+    scratch = channel["ChannelWidth"]
+    if channel["SampleWidth"] == 3:
+        scratch += channel["ChannelWidth"] // 3 * (4 + 8)
+    return scratch
+
+
+def _frame_layout(sources, frame_length, endian) -> dict:
+    """Byte layout of one interleaved frame
+
+    Args:
+        sources (list): Normalized sources, as from `OpenXDF.sources`.
+        frame_length (int): Frame length in seconds.
+        endian (str): "little" or "big".
+
+    Returns:
+        dict: {"FrameLength": _, "Endian": _, "FrameWidth": _,
+               "Channels": {"SourceName": {...}, ...}}
+    """
+    channels = {}
+    total_width = 0
+    for source in sources:
+        channel = {}
+        channel["SourceName"] = source["SourceName"]
+        sample_width = source["SampleWidth"]
+        sample_freq = source["SampleFrequency"]
+
+        if sample_freq == 0:
+            raise XDFSourceError("Source sample frequency has 0 value.")
+        if sample_width == 0:
+            raise XDFSourceError("Source sample width has 0 value.")
+
+        channel["SampleWidth"] = sample_width
+        channel["SampleFrequency"] = sample_freq
+        channel["ChannelWidth"] = sample_width * sample_freq * frame_length
+        channel["Signed"] = source["Signed"]
+        channel["DigitalMin"] = source.get("DigitalMin")
+        channel["DigitalMax"] = source.get("DigitalMax")
+        channel["StartLocation"] = total_width
+        channels[channel["SourceName"]] = channel
+        total_width += channel["ChannelWidth"]
+
+    return {
+        "FrameLength": frame_length,
+        "Endian": endian,
+        "FrameWidth": total_width,
+        "Channels": channels,
+    }
+
+
+def _ratio(numerator, denominator) -> np.ndarray:
+    """numerator / denominator, NaN where the denominator is 0"""
+    output = np.full(np.shape(numerator), np.nan)
+    return np.divide(numerator, denominator, out=output, where=denominator > 0)
+
 
 class Signal(object):
     """Core Signal object.
@@ -51,7 +133,11 @@ class Signal(object):
 
     def __init__(self, xdf, filepath):
         self._xdf = xdf
-        self._fpath = filepath
+        if type(filepath) is str:
+            filepath = [filepath]
+        self._fpath = filepath[0]
+        self._paths = list(filepath)
+        self._archives = {}
 
     def __repr__(self):
         return f"<Signal [{self._xdf.id}]>"
@@ -70,41 +156,101 @@ class Signal(object):
              ]}
         """
 
+        header = self._xdf.header
+        frame_info = _frame_layout(
+            self._xdf.sources, header["FrameLength"], header["Endian"]
+        )
+        frame_info["EpochLength"] = header["EpochLength"]
+        frame_info["Num_Epochs"] = max([i["EpochNumber"] for i in self._xdf.epochs])
+
+        return frame_info
+
+    @cached_property
+    def _segments(self) -> list:
+        """Placement of every recording segment on the study timeline
+
+        Frame 0 of the timeline is `OpenXDF.start_time`. Data files beyond the
+        first are looked up next to the first signal file unless their paths
+        were passed to the constructor explicitly. A session without an end
+        time runs until the next session of the same data file starts.
+
+        Computed once from the data file sizes; `follow` refreshes it to pick
+        up frames appended to a recording that is still being written.
+
+        Returns:
+            list: [{"path": _, "layout": {...}, "file_frame": _,
+                    "num_frames": _, "global_frame": _}, ...]
+        """
+        data_files = self._xdf._data_files
+        if len(self._paths) == len(data_files):
+            paths = dict(zip([i["xdf:File"] for i in data_files], self._paths))
+        elif len(self._paths) == 1:
+            folder = os.path.dirname(self._fpath)
+            paths = {
+                i["xdf:File"]: os.path.join(folder, i["xdf:File"]) for i in data_files
+            }
+            paths[data_files[0]["xdf:File"]] = self._fpath
+        else:
+            raise ValueError("Pass one signal file path per XDF data file.")
+
+        origin = self._xdf.start_time
         frame_length = self._xdf.header["FrameLength"]
+        file_frames = {}
+        segments = []
+        sessions = self._xdf.segments
+        for index, segment in enumerate(sessions):
+            if segment["FrameLength"] != frame_length:
+                raise XDFSourceError("Segments must share a frame length.")
 
-        frame_info = {}
-        frame_info["FrameLength"] = frame_length
-        frame_info["EpochLength"] = self._xdf.header["EpochLength"]
-        frame_info["Endian"] = self._xdf.header["Endian"]
-        frame_info["Num_Epochs"] = max([i["EpochNumber"] for i in self._xdf.epochs])
+            path = paths[segment["File"]]
+            layout = _frame_layout(
+                segment["Sources"], segment["FrameLength"], segment["Endian"]
+            )
+            file_frame = file_frames.get(path, 0)
+            num_frames = self._file_frames(path, layout) - file_frame
+            end_time = segment["EndTime"]
+            later = [i for i in sessions[index + 1 :] if i["File"] == segment["File"]]
+            if end_time is None and later:
+                end_time = later[0]["StartTime"]
+            if end_time is not None:
+                duration = (end_time - segment["StartTime"]).total_seconds()
+                num_frames = min(num_frames, int(round(duration / frame_length)))
 
-        channels = {}
-        total_width = 0
-        for source in self._xdf.sources:
-            channel = {}
-            channel["SourceName"] = source["SourceName"]
-            sample_width = source["SampleWidth"]
-            sample_freq = source["SampleFrequency"]
-
-            if sample_freq == 0:
-                raise XDFSourceError("Source sample frequency has 0 value.")
-            if sample_width == 0:
-                raise XDFSourceError("Source sample width has 0 value.")
-
-            channel["SampleWidth"] = sample_width
-            channel["SampleFrequency"] = sample_freq
-            channel["ChannelWidth"] = sample_width * sample_freq * frame_length
-            channel["Signed"] = source["Signed"]
-            channel["StartLocation"] = total_width
-            channels[channel["SourceName"]] = channel
-            total_width += channel["ChannelWidth"]
-
-        frame_info["FrameWidth"] = sum(
-            [channels[i]["ChannelWidth"] for i in channels.keys()]
-        )
-        frame_info["Channels"] = channels
+            offset = (segment["StartTime"] - origin).total_seconds()
+            if offset < 0:
+                raise XDFSourceError("Segment starts before the study start time.")
 
-        return frame_info
+            segments.append(
+                {
+                    "path": path,
+                    "layout": layout,
+                    "file_frame": file_frame,
+                    "num_frames": max(num_frames, 0),
+                    "global_frame": int(round(offset / frame_length)),
+                }
+            )
+            file_frames[path] = file_frame + max(num_frames, 0)
+
+        ordered = sorted(segments, key=lambda i: i["global_frame"])
+        for previous, segment in zip(ordered, ordered[1:]):
+            end = previous["global_frame"] + previous["num_frames"]
+            if segment["global_frame"] < end:
+                raise XDFSourceError("Segments overlap on the study timeline.")
+
+        return segments
+
+    def _archive(self, path):
+        """ArchiveReader for compressed archives (see `openxdf.archive`), else None"""
+        if path not in self._archives:
+            self._archives[path] = ArchiveReader(path) if is_archive(path) else None
+        return self._archives[path]
+
+    def _file_frames(self, path, layout) -> int:
+        """Number of complete frames stored in one data file"""
+        archive = self._archive(path)
+        if archive is not None:
+            return archive.num_frames
+        return os.path.getsize(path) // layout["FrameWidth"]
 
     @property
     def _source_information(self):
@@ -153,83 +299,975 @@ class Signal(object):
         """
         return list(self._xdf.montages.keys())
 
-    def read_file(self, channels: list):
-        """Read interlaced channels from binary signal file
+    @property
+    def _num_frames(self) -> int:
+        """Number of complete frames on the study timeline"""
+        return max(i["global_frame"] + i["num_frames"] for i in self._segments)
 
-        Args:
-            channels (list): List of channels to read.
-        
-        Returns:
-            dict: Dictionary of np.arrays, one per channel.
-        """
+    def _check_channels(self, channels) -> list:
         if type(channels) is str:
             channels = [channels]
-        if type(channels) is list:
-            pass
+        channels = list(channels)
         if not all([i in self.list_channels for i in channels]):
             raise ValueError("All channels must be listed in 'list_channels'.")
-        
-        channel_binary = {}
+        return channels
+
+    def _leads(self, channel) -> list:
+        """Names of the (one or two) sources a montage channel is built from"""
+        montage = self._xdf.montages[channel][0]
+        return [i for i in [montage["lead_1"], montage["lead_2"]] if i is not None]
+
+    def _decode_segment(
+        self, segment, names, file_frame, num_frames, cached=True
+    ) -> dict:
+        """Reads and decodes sources from a run of frames in one segment file
+
+        `cached=False` bypasses `openxdf.cache` for this read.
+        """
+        layout = segment["layout"]
+        tags = {"study": self._xdf.id}
+        names = [i for i in names if i in layout["Channels"]]
+
+        output = {}
+        cache = get_cache() if cached else None
+        if cache is not None:
+            identity = file_key(segment["path"])
+            keys = {i: (identity, "source", i, file_frame, num_frames) for i in names}
+            for name in names:
+                cached = cache.get(keys[name])
+                if cached is not None:
+                    output[name] = cached
+            names = [i for i in names if i not in output]
+            if not names:
+                return output
+
+        archive = self._archive(segment["path"])
+        if archive is not None:
+            decoded = archive.read(names, file_frame, num_frames)
+            for name in names:
+                output[name] = decoded[name]
+                if cache is not None:
+                    cache.put(keys[name], output[name])
+            count("signal.frames_decoded", num_frames * len(names), **tags)
+            return output
+
+        with timer("signal.read", **tags):
+            frames = read_frames(
+                segment["path"], layout["FrameWidth"], file_frame, num_frames
+            )
+        count("signal.bytes_read", frames.size, **tags)
+
+        with timer("signal.decode", **tags):
+            for name in names:
+                channel = layout["Channels"][name]
+                output[name] = decode_frames(
+                    frames,
+                    channel["StartLocation"],
+                    channel["ChannelWidth"],
+                    channel["SampleWidth"],
+                    layout["Endian"],
+                    is_true(channel["Signed"]),
+                )
+                if cache is not None:
+                    cache.put(keys[name], output[name])
+        count("signal.frames_decoded", len(frames) * len(names), **tags)
+        return output
+
+    def _samples_per_frame(self, name) -> int:
+        widths = set(
+            segment["layout"]["Channels"][name]["ChannelWidth"]
+            // segment["layout"]["Channels"][name]["SampleWidth"]
+            for segment in self._segments
+            if name in segment["layout"]["Channels"]
+        )
+        if len(widths) != 1:
+            raise XDFSourceError(f"Source {name} has inconsistent sample rates.")
+        return widths.pop()
+
+    def _segment_jobs(self, start_frame, num_frames) -> list:
+        """Splits a timeline frame range into per-segment reads"""
+        stop = start_frame + num_frames
+        jobs = []
+        for segment in self._segments:
+            first = max(start_frame, segment["global_frame"])
+            last = min(stop, segment["global_frame"] + segment["num_frames"])
+            if last > first:
+                jobs.append((segment, first, last))
+        return jobs
+
+    def _coverage(self, start_frame=0, num_frames=None) -> np.ndarray:
+        """Boolean mask of the timeline frames that hold recorded data"""
+        if num_frames is None:
+            num_frames = self._num_frames - start_frame
+        covered = np.zeros(max(num_frames, 0), dtype=bool)
+        for _, first, last in self._segment_jobs(start_frame, num_frames):
+            covered[first - start_frame : last - start_frame] = True
+        return covered
+
+    def _read_sources(self, names, start_frame=0, num_frames=None, cached=True):
+        """Reads and decodes raw sources over a contiguous range of frames
+
+        Frames are addressed on the study timeline. When the range spans
+        several segment files they are read in parallel; frames that fall in
+        gaps between segments are zero.
+
+        Args:
+            names (list): Source names.
+            start_frame (int, optional): Defaults to 0. First frame to read.
+            num_frames (int, optional): Defaults to None (to end of recording).
+            cached (bool, optional): Defaults to True. Use `openxdf.cache`.
+
+        Returns:
+            dict: {source: int64 np.array of shape (frames, samples per frame)}
+        """
+        total = self._num_frames
+        if num_frames is None:
+            num_frames = total - start_frame
+        num_frames = max(0, min(num_frames, total - start_frame))
+        jobs = self._segment_jobs(start_frame, num_frames)
+
+        def _run(job):
+            segment, first, last = job
+            local = segment["file_frame"] + first - segment["global_frame"]
+            return self._decode_segment(segment, names, local, last - first, cached)
+
+        if len(jobs) == 1 and jobs[0][1:] == (start_frame, start_frame + num_frames):
+            decoded = _run(jobs[0])
+            if len(decoded) == len(names):
+                return decoded
+
+        if len(jobs) > 1:
+            workers = min(len(jobs), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_run, jobs))
+        else:
+            results = [_run(job) for job in jobs]
+
+        output = {
+            name: np.zeros((num_frames, self._samples_per_frame(name)), np.int64)
+            for name in names
+        }
+        for (_, first, last), decoded in zip(jobs, results):
+            for name, data in decoded.items():
+                output[name][first - start_frame : last - start_frame] = data
+        return output
+
+    def quality_report(self, channels, chunk_epochs=120, line_freq=60.0) -> dict:
+        """Per-epoch signal-quality metrics for artifact screening
+
+        Metrics are computed on the unfiltered montage signal in vectorized
+        passes over `chunk_epochs` epochs at a time, so memory stays bounded
+        for whole-night recordings. Amplitudes are in digital units. Frames in
+        gaps between recording segments are left out of every metric and
+        reported as `missing` instead.
+
+        Args:
+            channels (list): List of channels to screen.
+            chunk_epochs (int, optional): Defaults to 120. Epochs per pass.
+            line_freq (float, optional): Defaults to 60.0. Mains frequency (Hz).
+
+        Returns:
+            dict: One dict of np.arrays (one value per epoch) per channel:
+            {"C3-A2": {"flatline": _, "clipped": _, "rms": _, "ptp": _,
+                       "line_noise": _, "missing": _},
+             ...}
+
+            flatline: fraction of consecutive samples that do not change.
+            clipped: fraction of samples where a source sits at its
+                `DigitalMin`/`DigitalMax`.
+            rms: root-mean-square of the mean-removed signal.
+            ptp: peak-to-peak amplitude.
+            line_noise: fraction of (non-DC) power within 1 Hz of `line_freq`;
+                NaN when `line_freq` is above the Nyquist frequency.
+            missing: fraction of samples that were not recorded. The other
+                metrics are NaN for epochs with nothing recorded.
+        """
+        channels = self._check_channels(channels)
         frame_info = self._frame_information
-        sources = self._source_information
-        frame_width = frame_info["FrameWidth"]
+        epoch_length = frame_info["EpochLength"]
+        frame_length = frame_info["FrameLength"]
+        if epoch_length % frame_length:
+            raise XDFSourceError("Epoch length is not a whole number of frames.")
 
-        for channel in channels:
-            lead1_name = self._xdf.montages[channel][0]["lead_1"]
-            lead2_name = self._xdf.montages[channel][0]["lead_2"]
-            
-            if lead1_name is not None and lead1_name not in channel_binary.keys():
-                channel_binary[lead1_name] = read_channel_from_file(
-                    self._fpath,
-                    start_location=sources[lead1_name]["Start"],
-                    channel_width=sources[lead1_name]["Width"],
-                    frame_width=frame_width,
+        frames_per_epoch = epoch_length // frame_length
+        num_epochs = self._num_frames // frames_per_epoch
+        sources = sorted(set(i for c in channels for i in self._leads(c)))
+        metrics = ["flatline", "clipped", "rms", "ptp", "line_noise", "missing"]
+        report = {c: {m: np.empty(num_epochs) for m in metrics} for c in channels}
+
+        for first in range(0, num_epochs, chunk_epochs):
+            n = min(chunk_epochs, num_epochs - first)
+            raw = self._read_sources(
+                sources, first * frames_per_epoch, n * frames_per_epoch
+            )
+            covered = self._coverage(first * frames_per_epoch, n * frames_per_epoch)
+            covered = covered.reshape(n, frames_per_epoch)
+
+            for channel in channels:
+                leads = self._leads(channel)
+                info = frame_info["Channels"][leads[0]]
+                fs = info["SampleFrequency"]
+                epochs = [raw[lead].reshape(n, -1) for lead in leads]
+
+                clipped = np.zeros(epochs[0].shape, dtype=bool)
+                for lead, data in zip(leads, epochs):
+                    limits = frame_info["Channels"][lead]
+                    if limits["DigitalMin"] is not None:
+                        clipped |= data <= limits["DigitalMin"]
+                    if limits["DigitalMax"] is not None:
+                        clipped |= data >= limits["DigitalMax"]
+
+                derived = epochs[0] if len(epochs) == 1 else epochs[0] - epochs[1]
+                derived = derived.astype(np.float64)
+
+                # Samples in recording gaps are left out of every metric
+                valid = np.repeat(covered, derived.shape[1] // frames_per_epoch, 1)
+                recorded = valid.sum(axis=1)
+                pairs = valid[:, 1:] & valid[:, :-1]
+                steady = (np.diff(derived, axis=1) == 0) & pairs
+                mean = _ratio(np.where(valid, derived, 0).sum(axis=1), recorded)
+                centered = np.where(valid, derived - mean[:, None], 0)
+                highest = np.where(valid, derived, -np.inf).max(axis=1)
+                lowest = np.where(valid, derived, np.inf).min(axis=1)
+                variance = _ratio(np.square(centered).sum(axis=1), recorded)
+
+                out = report[channel]
+                rows = slice(first, first + n)
+                out["missing"][rows] = 1 - recorded / valid.shape[1]
+                out["clipped"][rows] = _ratio((clipped & valid).sum(axis=1), recorded)
+                out["flatline"][rows] = _ratio(steady.sum(axis=1), pairs.sum(axis=1))
+                out["rms"][rows] = np.sqrt(variance)
+                out["ptp"][rows] = np.where(recorded > 0, highest - lowest, np.nan)
+
+                if line_freq >= fs / 2:
+                    out["line_noise"][rows] = np.nan
+                    continue
+                power = np.abs(np.fft.rfft(centered, axis=1)) ** 2
+                freqs = np.fft.rfftfreq(centered.shape[1], 1 / fs)
+                band = np.abs(freqs - line_freq) <= 1.0
+                total = power[:, 1:].sum(axis=1)
+                line = power[:, band].sum(axis=1)
+                out["line_noise"][rows] = np.divide(
+                    line, total, out=np.zeros_like(line), where=total > 0
+                )
+                out["line_noise"][rows][recorded == 0] = np.nan
+
+        return report
+
+    def read_matrix(self, channels, fs, epochs=False, filtered=True, dtype=np.float64):
+        """Read channels resampled to a common rate into one contiguous array
+
+        Channels are derived, band-pass filtered (continuously over the whole
+        recording) and resampled in groups that share a source rate, using a
+        cached polyphase anti-aliasing filter. Each group is written straight
+        into the output array.
+
+        Args:
+            channels (list): List of channels to read.
+            fs (float): Target sampling frequency (Hz).
+            epochs (bool, optional): Defaults to False. Return an
+                (epochs x channels x samples) array instead of
+                (channels x samples). Trailing partial epochs are dropped.
+            filtered (bool, optional): Defaults to True. Apply the montage
+                band-pass filters.
+            dtype (np.dtype, optional): Defaults to np.float64.
+
+        Returns:
+            np.ndarray: Channel rows in the order given by `channels`.
+        """
+        from scipy.signal import sosfilt, resample_poly
+
+        channels = self._check_channels(channels)
+        frame_info = self._frame_information
+        frame_length = frame_info["FrameLength"]
+        num_frames = self._num_frames
+        tags = {"study": self._xdf.id}
+
+        if epochs:
+            epoch_length = frame_info["EpochLength"]
+            if epoch_length % frame_length or (epoch_length * fs) % 1:
+                raise ValueError("Epochs must hold a whole number of frames/samples.")
+            num_epochs = num_frames // (epoch_length // frame_length)
+            num_frames = num_epochs * (epoch_length // frame_length)
+            output = np.empty(
+                (num_epochs, len(channels), int(epoch_length * fs)), dtype=dtype
+            )
+        num_samples = int(round(num_frames * frame_length * fs))
+        if not epochs:
+            output = np.empty((len(channels), num_samples), dtype=dtype)
+
+        sources = sorted(set(i for c in channels for i in self._leads(c)))
+        raw = self._read_sources(sources, 0, num_frames)
+
+        groups = {}
+        for i, channel in enumerate(channels):
+            lead = self._leads(channel)[0]
+            rate = frame_info["Channels"][lead]["SampleFrequency"]
+            groups.setdefault(rate, []).append(i)
+
+        for rate, indices in groups.items():
+            with timer("signal.derive", **tags):
+                block = np.empty((len(indices), num_frames * rate * frame_length))
+                for row, i in enumerate(indices):
+                    leads = [raw[lead].ravel() for lead in self._leads(channels[i])]
+                    if len(leads) == 1:
+                        block[row] = leads[0]
+                    else:
+                        np.subtract(leads[0], leads[1], out=block[row])
+
+            if filtered:
+                with timer("signal.filter", **tags):
+                    specs = {}
+                    for row, i in enumerate(indices):
+                        spec = self._xdf.montages[channels[i]][0]["filter"]
+                        specs.setdefault(tuple(map(float, spec)), []).append(row)
+                    for (low, high), rows in specs.items():
+                        sos = butter_bandpass(low, high, rate, output="sos")
+                        block[rows] = sosfilt(sos, block[rows], axis=1)
+
+            up, down = resample_ratio(rate, fs)
+            if (up, down) != (1, 1):
+                with timer("signal.resample", **tags):
+                    taps = resample_taps(up, down)
+                    block = resample_poly(block, up, down, axis=1, window=taps)
+
+            for row, i in enumerate(indices):
+                if epochs:
+                    output[:, i, :] = block[row, :num_samples].reshape(num_epochs, -1)
+                else:
+                    output[i] = block[row, :num_samples]
+
+        return output
+
+    def _event_offsets(self, events) -> np.ndarray:
+        """Converts events to seconds elapsed since `start_time`
+
+        Events may be dicts with a "Time" key (as in `OpenXDF.events`), XDF
+        timestamp strings, datetimes, or numbers of seconds.
+        """
+        start_time = self._xdf.start_time
+        offsets = []
+        for event in events:
+            if isinstance(event, dict):
+                event = event["Time"]
+            if isinstance(event, str):
+                event = parse_time(event)
+            if isinstance(event, datetime):
+                event = (event - start_time).total_seconds()
+            offsets.append(float(event))
+        return np.asarray(offsets, dtype=np.float64)
+
+    def event_windows(self, channels, events, pre, post, filtered=True, settle=None):
+        """Extract fixed windows around event onsets for a batch of events
+
+        Only the frames that cover the requested windows are read (adjacent
+        ranges are merged into single sequential reads), and all windows are
+        gathered with one fancy-indexing pass per source.
+
+        Args:
+            channels (list): List of channels to read. All channels must share a
+                sampling frequency.
+            events (list): Event dicts from `OpenXDF.events` (anything with a
+                "Time" key), XDF timestamps, datetimes, or seconds since
+                `start_time`.
+            pre (float): Seconds before each onset.
+            post (float): Seconds after each onset.
+            filtered (bool, optional): Defaults to True. Apply the montage
+                band-pass filters.
+            settle (float, optional): Defaults to None (long enough for the
+                filter start-up transient to decay, as in `read_epochs`).
+                Seconds of extra signal read before each window so the filter
+                has settled by the window start. Ignored when `filtered` is
+                False.
+
+        Returns:
+            np.ndarray: (events x channels x samples) array. Samples outside
+            the recording are NaN.
+        """
+        from scipy.signal import sosfilt
+
+        channels = self._check_channels(channels)
+        frame_info = self._frame_information
+        rates = set(
+            frame_info["Channels"][self._leads(c)[0]]["SampleFrequency"]
+            for c in channels
+        )
+        if len(rates) != 1:
+            raise ValueError("All channels must share a sampling frequency.")
+        fs = rates.pop()
+
+        samples_per_frame = fs * frame_info["FrameLength"]
+        total_samples = self._num_frames * samples_per_frame
+        margin = 0
+        if filtered:
+            margin = int(np.ceil(self._warm_up(channels, settle) * fs))
+        length = int(round(pre * fs)) + int(round(post * fs))
+        onsets = np.round(self._event_offsets(events) * fs).astype(np.int64)
+        starts = onsets - int(round(pre * fs)) - margin
+
+        # Global sample index of every (window, sample) pair
+        index = starts[:, None] + np.arange(length + margin)
+        inside = (index >= 0) & (index < total_samples)
+        index = np.clip(index, 0, max(total_samples - 1, 0))
+
+        # Frame ranges that cover the windows, merged into sequential runs
+        first = index[:, 0] // samples_per_frame
+        last = index[:, -1] // samples_per_frame + 1
+        run_starts, run_stops = merge_ranges(first, last, gap=1)
+        run_sizes = run_stops - run_starts
+        run_offsets = np.concatenate([[0], np.cumsum(run_sizes)[:-1]])
+
+        # Map global sample indices onto the compact buffer of read runs
+        run = np.searchsorted(run_starts, first, side="right") - 1
+        shift = (run_offsets[run] - run_starts[run]) * samples_per_frame
+        compact = index + shift[:, None]
+
+        sources = sorted(set(i for c in channels for i in self._leads(c)))
+        buffers = {name: [] for name in sources}
+        for start, size in zip(run_starts, run_sizes):
+            raw = self._read_sources(sources, int(start), int(size))
+            for name in sources:
+                buffers[name].append(raw[name].ravel())
+        buffers = {
+            k: np.concatenate(v) if v else np.empty(0, np.int64)
+            for k, v in buffers.items()
+        }
+
+        output = np.empty((len(onsets), len(channels), length))
+        for i, channel in enumerate(channels):
+            leads = self._leads(channel)
+            with timer("signal.derive", channel=channel, study=self._xdf.id):
+                data = buffers[leads[0]][compact].astype(np.float64)
+                if len(leads) == 2:
+                    data -= buffers[leads[1]][compact]
+                data[~inside] = 0
+
+            if filtered and len(data):
+                with timer("signal.filter", channel=channel, study=self._xdf.id):
+                    low, high = map(float, self._xdf.montages[channel][0]["filter"])
+                    sos = butter_bandpass(low, high, fs, output="sos")
+                    data = sosfilt(sos, data, axis=1)
+
+            data[~inside] = np.nan
+            output[:, i, :] = data[:, margin:]
+
+        return output
+
+    def _frame_range(self, start, stop) -> tuple:
+        """(first frame, number of frames) of a read between two offsets"""
+        frame_length = self._xdf.header["FrameLength"]
+        total = self._num_frames
+        first = 0 if start is None else min(total, max(0, int(start // frame_length)))
+        last = total if stop is None else int(np.ceil(stop / frame_length))
+        return first, max(0, min(last, total) - first)
+
+    def plan(
+        self,
+        channels,
+        dtype=np.float64,
+        units="bytes",
+        start=None,
+        stop=None,
+        max_memory=None,
+        workers=1,
+    ) -> dict:
+        """Estimates the memory a `read_file` call needs, without reading
+
+        Sizes come from the frame layout and the data file sizes. The peak
+        counts the raw frame bytes, the int64 decoded sources, the output
+        arrays, the filter's working copies (two channels when the filter is
+        split over workers, one per thread in chunked reads) and the
+        coverage masks that mark gaps. Decoded sources are held twice when a
+        read spans several segments. Neither the cache nor the one-off import
+        of `scipy.signal` by the first read is counted.
+
+        Args:
+            channels (list): Channels to read.
+            dtype (np.dtype, optional): Defaults to np.float64 (what
+                `read_file` returns). Output sample type.
+            units (str, optional): Defaults to "bytes". "bytes", "KiB", "MiB"
+                or "GiB".
+            start (float, optional): As in `read_file`.
+            stop (float, optional): As in `read_file`.
+            max_memory (int, optional): Defaults to None. Budget in bytes for
+                the chunked strategy.
+            workers (int, optional): As in `read_file`.
+
+        Returns:
+            dict: {"frames": _, "output": output arrays, "peak": peak of a
+                   single pass, "chunk_frames": frames per chunk that keep
+                   the peak under `max_memory` (all frames if a single
+                   pass fits, 0 if even the output does not),
+                   "chunked_peak": peak when reading in such chunks,
+                   "units": units}
+        """
+        scale = {"bytes": 1, "KiB": 2**10, "MiB": 2**20, "GiB": 2**30}[units]
+        channels = self._check_channels(channels)
+        first, num_frames = self._frame_range(start, stop)
+        sources = sorted(set(i for c in channels for i in self._leads(c)))
+        jobs = self._segment_jobs(first, num_frames)
+
+        # Bytes per frame; decoding adds the temporaries of one source
+        raw = max([segment["layout"]["FrameWidth"] for segment, _, _ in jobs] or [0])
+        raw += max(
+            [
+                _decode_scratch(segment["layout"]["Channels"][i])
+                for segment, _, _ in jobs
+                for i in sources
+                if i in segment["layout"]["Channels"]
+            ]
+            or [0]
+        )
+        decoded = 8 * sum(self._samples_per_frame(i) for i in sources)
+        widths = [self._samples_per_frame(self._leads(c)[0]) for c in channels]
+        output = np.dtype(dtype).itemsize * sum(widths)
+        # The coverage mask, plus the int64 copies used to find recorded runs
+        coverage = 17
+        # sosfilt filters a copy of each recorded run; split filtering also
+        # stitches the blocks into another
+        longest = 0
+        run_start = run_stop = None
+        for _, job_first, job_last in jobs:
+            if job_first != run_stop:
+                run_start = job_first
+            run_stop = job_last
+            longest = max(longest, run_stop - run_start)
+        scratch = 8 * max(widths) * (1 if workers == 1 else 2)
+        if len(jobs) > 1:
+            # Segments decode on up to one thread per CPU, then are copied
+            # into one zero-filled array
+            threads = min(len(jobs), os.cpu_count() or 1)
+            sizes = sorted(last - first for _, first, last in jobs)[-threads:]
+            decode_phase = num_frames * decoded + max(
+                sum(sizes) * raw, num_frames * decoded
+            )
+        else:
+            decode_phase = num_frames * (raw + decoded)
+        cross_phase = num_frames * (decoded + output + coverage) + longest * scratch
+        peak = max(decode_phase, cross_phase)
+
+        # Chunks hold a float64 copy of every channel before it is copied out,
+        # and filter one channel per worker thread at a time
+        threads = 1
+        if workers != 1:
+            threads = min(workers or os.cpu_count() or 1, len(widths))
+        chunk_scratch = 8 * sum(sorted(widths)[-threads:])
+        chunk_cost = coverage + max(
+            raw + 2 * decoded, decoded + 8 * sum(widths) + chunk_scratch
+        )
+        if max_memory is None or peak <= max_memory:
+            chunk_frames = num_frames
+            chunked_peak = peak
+        else:
+            # Leave room for per-chunk Python objects and filter state
+            budget = max_memory - num_frames * output - 2**18
+            chunk_frames = int(min(num_frames, max(0, budget // chunk_cost)))
+            chunked_peak = num_frames * output + chunk_frames * chunk_cost
+
+        return {
+            "frames": num_frames,
+            "output": num_frames * output / scale,
+            "peak": peak / scale,
+            "chunk_frames": chunk_frames,
+            "chunked_peak": chunked_peak / scale,
+            "units": units,
+        }
+
+    def _read_chunked(
+        self, channels, first, num_frames, chunk_frames, workers=1
+    ) -> dict:
+        """`read_file` in chunks of frames, carrying filter state across them"""
+        state = self._follow_state(channels, None)
+        state["frame"] = first
+        state["cached"] = False
+        output = {
+            c: np.empty((num_frames, self._samples_per_frame(self._leads(c)[0])))
+            for c in channels
+        }
+        while state["frame"] < first + num_frames:
+            remaining = first + num_frames - state["frame"]
+            offset, chunk = self._follow_step(
+                state, min(chunk_frames, remaining), workers
+            )
+            for channel, data in chunk.items():
+                output[channel][offset - first : offset - first + len(data)] = data
+            # Release this chunk before the next one is decoded
+            chunk = data = None
+        return output
+
+    def read_file(
+        self, channels: list, start=None, stop=None, workers=1, max_memory=None
+    ):
+        """Read interlaced channels from binary signal file
+
+        Recordings split over several data files or sessions are stitched onto
+        one timeline starting at `OpenXDF.start_time`. Each contiguous run of
+        recorded frames is filtered separately, and frames in gaps between
+        segments are NaN. Montage filters run as second-order sections; see
+        `helpers.butter_bandpass_filter` for how that differs from the (b, a)
+        filtering of earlier releases.
+
+        Args:
+            channels (list): List of channels to read.
+            start (float, optional): Defaults to None (start of recording).
+                Seconds since `start_time`; rounded down to a whole frame.
+            stop (float, optional): Defaults to None (end of recording).
+                Seconds since `start_time`; rounded up to a whole frame.
+            workers (int, optional): Defaults to 1. Threads each channel's
+                filter is split over in time (None for one per CPU); see
+                `helpers.parallel_sosfilt`. Matches serial filtering to about
+                1e-9 of the signal level, and pays off on long, high-rate
+                recordings. Chunked reads (see `max_memory`) carry filter
+                state from chunk to chunk, so they filter each channel
+                serially and spread the channels over the threads instead.
+            max_memory (int, optional): Defaults to None (no limit). Bytes
+                the read may use; when a single pass would need more (see
+                `plan`), frames are decoded and filtered in chunks, with the
+                filter state carried over, giving the same result. Raises
+                MemoryError if even the output does not fit. Such reads
+                bypass `openxdf.cache`, whose memory is outside the budget.
+
+        Returns:
+            dict: Dictionary of np.arrays (frames x samples per frame), one per
+            channel. Read-only when `openxdf.cache` is enabled and
+            `max_memory` is not set.
+        """
+        channels = self._check_channels(channels)
+        frame_length = self._xdf.header["FrameLength"]
+        first, num_frames = self._frame_range(start, stop)
+
+        cross = {}
+        use_cache = max_memory is None
+        cache = get_cache() if use_cache else None
+        if cache is not None:
+            identity = tuple(file_key(i["path"]) for i in self._segments)
+            keys = {}
+            for channel in channels:
+                bp_filter = tuple(self._xdf.montages[channel][0]["filter"])
+                leads = tuple(self._leads(channel))
+                keys[channel] = (identity, "channel", leads, bp_filter, "float64")
+                keys[channel] += (first, num_frames)
+                cached = cache.get(keys[channel])
+                if cached is not None:
+                    cross[channel] = cached
+            if len(cross) == len(channels):
+                return cross
+
+        missing = [i for i in channels if i not in cross]
+        if max_memory is not None:
+            plan = self.plan(
+                missing, start=start, stop=stop, max_memory=max_memory, workers=workers
+            )
+            if plan["chunk_frames"] == 0 and num_frames > 0:
+                raise MemoryError(
+                    f"The output of {missing} alone is {plan['output']:.0f} bytes."
                 )
-            
-            if lead2_name is not None and lead2_name not in channel_binary.keys():
-                channel_binary[lead2_name] = read_channel_from_file(
-                    self._fpath,
-                    start_location=sources[lead2_name]["Start"],
-                    channel_width=sources[lead2_name]["Width"],
-                    frame_width=frame_width,
+            if plan["chunk_frames"] < num_frames:
+                chunked = self._read_chunked(
+                    missing, first, num_frames, plan["chunk_frames"], workers
                 )
+                return {channel: chunked[channel] for channel in channels}
 
-        # Convert to numeric
-        as_numeric = {}
-        for channel in channel_binary.keys():
-            epochs_conversion = []
-            
-            sample_width = frame_info["Channels"][channel]["SampleWidth"]
-            byteorder = frame_info["Endian"]
-            signed = frame_info["Channels"][channel]["Signed"]
-            
-            for epoch in channel_binary[channel]:
-                epochs_num = _bytestring_to_num(epoch, sample_width, byteorder, signed)
-                epochs_conversion.append(epochs_num)
-            
-            as_numeric[channel] = np.vstack(epochs_conversion)
+        sources = sorted(set(i for c in missing for i in self._leads(c)))
+        as_numeric = self._read_sources(sources, first, num_frames, use_cache)
+
+        covered = self._coverage(first, num_frames)
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], covered, [0]])))
+        runs = list(zip(edges[::2], edges[1::2]))
+        tags = {"study": self._xdf.id}
 
         # Cross and filter channels
-        cross = {}
-        for channel in channels:
-            lead1_name = self._xdf.montages[channel][0]["lead_1"]
-            lead2_name = self._xdf.montages[channel][0]["lead_2"]
+        for channel in missing:
+            leads = self._leads(channel)
             bp_filter = self._xdf.montages[channel][0]["filter"]
             filter_low, filter_high = list(map(float, bp_filter))
+            sample_freq = self._samples_per_frame(leads[0]) / frame_length
+
+            with timer("signal.derive", channel=channel, **tags):
+                signal_data = as_numeric[leads[0]].astype(np.float64)
+                if len(leads) == 2:
+                    signal_data -= as_numeric[leads[1]]
 
-            if lead1_name is None:
-                signal_data = as_numeric[lead2_name]
-                sample_freq = frame_info["Channels"][lead2_name]["SampleFrequency"]
-            elif lead2_name is None:
-                signal_data = as_numeric[lead1_name]
-                sample_freq = frame_info["Channels"][lead1_name]["SampleFrequency"]
-            else:
-                signal_data = as_numeric[lead1_name] - as_numeric[lead2_name]
-                sample_freq = frame_info["Channels"][lead1_name]["SampleFrequency"]
-            
-            filtered_data = butter_bandpass_filter(signal_data, filter_low, filter_high, sample_freq)
-            cross[channel] = filtered_data
-        return cross
+            with timer("signal.filter", channel=channel, **tags):
+                flat = signal_data.reshape(-1)
+                samples = signal_data.shape[1]
+                for run_start, run_stop in runs:
+                    span = slice(run_start * samples, run_stop * samples)
+                    flat[span] = butter_bandpass_filter(
+                        flat[span],
+                        filter_low,
+                        filter_high,
+                        sample_freq,
+                        workers=workers,
+                    )
+            signal_data[~covered] = np.nan
+            if cache is not None:
+                cache.put(keys[channel], signal_data)
+            cross[channel] = signal_data
+        return {channel: cross[channel] for channel in channels}
+
+    def _settle(self, channels) -> float:
+        """Seconds for the band-pass filters of `channels` to forget their start
+
+        Derived from the poles of the SOS design `read_file` uses. Infinite
+        when a filter is not stable, i.e. its output depends on the whole
+        recording.
+        """
+        frame_length = self._xdf.header["FrameLength"]
+        settle = 0.0
+        for channel in channels:
+            low, high = map(float, self._xdf.montages[channel][0]["filter"])
+            spf = self._samples_per_frame(self._leads(channel)[0])
+            sample_freq = spf / frame_length
+            sos = butter_bandpass(low, high, sample_freq, output="sos")
+            overlap = filter_overlap(sos_poles(sos))
+            if overlap is None:
+                return np.inf
+            settle = max(settle, overlap / sample_freq)
+        return settle
+
+    def _warm_up(self, channels, settle=None) -> float:
+        """`settle`, or `_settle(channels)` when None, capped at `MAX_SETTLE`
+
+        An infinite warm-up is capped with a warning.
+        """
+        if settle is None:
+            settle = self._settle(channels)
+        if np.isinf(settle):
+            warnings.warn(
+                f"No finite filter warm-up for {channels}; "
+                f"reading {MAX_SETTLE:g} s before each run instead."
+            )
+            settle = MAX_SETTLE
+        return settle
+
+    def read_epochs(self, channels, epochs, settle=None, workers=1) -> dict:
+        """Filtered channels over a set of epochs only
+
+        Epochs are mapped to frame ranges on the study timeline, widened by
+        `settle` seconds of filter warm-up and merged where they touch or
+        overlap, so each run is one large sequential `read_file` call. Runs
+        spanning segment boundaries are filtered exactly like `read_file`
+        does.
+
+        Args:
+            channels (list): List of channels to read.
+            epochs (list): 1-indexed epoch numbers.
+            settle (float, optional): Defaults to None (long enough for the
+                filter start-up transient to decay; see
+                `helpers.filter_overlap`). Seconds read before each run; an
+                infinite warm-up is capped at `MAX_SETTLE` with a warning.
+            workers (int, optional): Defaults to 1. See `read_file`.
+
+        Returns:
+            dict: {channel: np.array (epochs x samples per epoch)}, in the
+            order of `epochs`; NaN where nothing was recorded.
+        """
+        channels = self._check_channels(channels)
+        header = self._xdf.header
+        frame_length = header["FrameLength"]
+        epoch_frames = header["EpochLength"] // frame_length
+        settle = self._warm_up(channels, settle)
+        margin = int(np.ceil(settle / frame_length))
+
+        epochs = np.asarray(epochs, dtype=np.int64).reshape(-1)
+        starts = (epochs - 1) * epoch_frames
+        output = {}
+        for channel in channels:
+            spf = self._samples_per_frame(self._leads(channel)[0])
+            output[channel] = np.full((len(epochs), epoch_frames * spf), np.nan)
+
+        run_starts, run_stops = merge_ranges(
+            np.maximum(starts - margin, 0), starts + epoch_frames
+        )
+        for run_start, run_stop in zip(run_starts, run_stops):
+            data = self.read_file(
+                channels,
+                start=int(run_start) * frame_length,
+                stop=int(run_stop) * frame_length,
+                workers=workers,
+            )
+            rows = np.flatnonzero((starts >= run_start) & (starts < run_stop))
+            for channel in channels:
+                for row in rows:
+                    first = starts[row] - run_start
+                    block = data[channel][first : first + epoch_frames]
+                    output[channel][row, : block.size] = block.ravel()
+        return output
+
+    def read_stage(self, channels, stages, scorer=None, settle=None, workers=1):
+        """Filtered channels over the epochs a scorer staged as `stages`
+
+        Only the frames of matching epochs (plus filter warm-up) are read;
+        see `read_epochs`.
+
+            >>> data, epochs = signal.read_stage(["Chin"], ["R"])
+            >>> data["Chin"].shape
+            (212, 6000)
+
+        Args:
+            channels (list): List of channels to read.
+            stages (list): Stage labels ("W", "N1", "N2", "N3", "R") or
+                `openxdf.constants.STAGE_CODES` integers.
+            scorer (str, optional): Defaults to None (first scorer). Scorer
+                first name.
+            settle (float, optional): See `read_epochs`.
+            workers (int, optional): Defaults to 1. See `read_file`.
+
+        Returns:
+            tuple: ({channel: np.array (epochs x samples per epoch)},
+                    1-indexed epoch numbers of the rows)
+        """
+        from .dataset import stage_labels
+
+        codes = set()
+        for stage in stages:
+            if isinstance(stage, str):
+                if stage.upper() not in STAGE_CODES:
+                    raise ValueError(f"Unknown stage: {stage}")
+                stage = STAGE_CODES[stage.upper()]
+            codes.add(int(stage))
+
+        header = self._xdf.header
+        epoch_frames = header["EpochLength"] // header["FrameLength"]
+        labels = stage_labels(self._xdf, self._num_frames // epoch_frames, scorer)
+        epochs = np.flatnonzero(np.isin(labels, sorted(codes))) + 1
+        return self.read_epochs(channels, epochs, settle, workers), epochs
+
+    def _follow_state(self, channels, start) -> dict:
+        channels = self._check_channels(channels)
+        frame_length = self._xdf.header["FrameLength"]
+        filters = {}
+        for channel in channels:
+            leads = self._leads(channel)
+            low, high = map(float, self._xdf.montages[channel][0]["filter"])
+            sample_freq = self._samples_per_frame(leads[0]) / frame_length
+            filters[channel] = butter_bandpass(low, high, sample_freq, output="sos")
+        return {
+            "channels": channels,
+            "sources": sorted(set(i for c in channels for i in self._leads(c))),
+            "frame": 0 if start is None else max(0, int(start // frame_length)),
+            "filters": filters,
+            "zi": {},
+            "cached": True,
+        }
+
+    def _follow_step(self, state, max_frames=None, workers=1):
+        """Decodes and filters the whole frames appended since the last step"""
+        from scipy.signal import sosfilt
+
+        self.__dict__.pop("_segments", None)  # pick up newly written frames
+        first = state["frame"]
+        num_frames = self._num_frames - first
+        if max_frames is not None:
+            num_frames = min(num_frames, max_frames)
+        if num_frames <= 0:
+            return None
+
+        raw = self._read_sources(state["sources"], first, num_frames, state["cached"])
+        covered = self._coverage(first, num_frames)
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], covered, [0]])))
+
+        def _filter(channel):
+            leads = self._leads(channel)
+            sos = state["filters"][channel]
+            signal_data = raw[leads[0]].astype(np.float64)
+            if len(leads) == 2:
+                signal_data -= raw[leads[1]]
+
+            flat = signal_data.reshape(-1)
+            samples = signal_data.shape[1]
+            zi = state["zi"].get(channel)
+            for run_start, run_stop in zip(edges[::2], edges[1::2]):
+                # A run that doesn't continue the previous chunk starts cold,
+                # exactly like read_file does after a gap
+                if run_start > 0 or zi is None:
+                    zi = np.zeros((sos.shape[0], 2))
+                span = slice(run_start * samples, run_stop * samples)
+                flat[span], zi = sosfilt(sos, flat[span], zi=zi)
+            state["zi"][channel] = zi if covered[-1] else None
+
+            signal_data[~covered] = np.nan
+            return signal_data
+
+        # Filter state runs through each channel serially, so spread the
+        # channels over the workers instead
+        channels = state["channels"]
+        if workers != 1 and len(channels) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                filtered = list(executor.map(_filter, channels))
+        else:
+            filtered = [_filter(channel) for channel in channels]
+        output = dict(zip(channels, filtered))
+
+        state["frame"] = first + num_frames
+        return first, output
+
+    def follow(
+        self, channels, poll_interval=1.0, start=None, timeout=None, max_frames=None
+    ):
+        """Follow a recording that is still being written
+
+        Every poll decodes only the whole frames appended since the previous
+        one, and filter state is carried across polls, so concatenating the
+        chunks gives the same result as `read_file` on the finished
+        recording. Partially written frames are left for the next poll.
+
+        Args:
+            channels (list): List of channels to read.
+            poll_interval (float, optional): Defaults to 1.0. Seconds to wait
+                between checks when no new frames are available.
+            start (float, optional): Defaults to None (start of recording).
+                Seconds since `start_time` to start from.
+            timeout (float, optional): Defaults to None (follow forever). Stop
+                after this many seconds without new frames.
+            max_frames (int, optional): Defaults to None. Largest number of
+                frames decoded per chunk, e.g. to bound memory while catching
+                up on a long recording.
+
+        Yields:
+            tuple: (first frame, {channel: np.array (frames x samples per
+            frame)}) for every batch of new frames.
+        """
+        state = self._follow_state(channels, start)
+        idle = 0.0
+        while True:
+            step = self._follow_step(state, max_frames)
+            if step is not None:
+                idle = 0.0
+                yield step
+                continue
+            if timeout is not None and idle >= timeout:
+                return
+            time.sleep(poll_interval)
+            idle += poll_interval
+
+    async def afollow(
+        self, channels, poll_interval=1.0, start=None, timeout=None, max_frames=None
+    ):
+        """Asynchronous version of `follow`
+
+        Decoding runs in the default executor so the event loop stays free.
+
+        Use:
+            >>> async for frame, chunk in signal.afollow(["C3-A2"]):
+            ...     process(chunk["C3-A2"])
+        """
+        loop = asyncio.get_running_loop()
+        state = self._follow_state(channels, start)
+        idle = 0.0
+        while True:
+            step = await loop.run_in_executor(
+                None, self._follow_step, state, max_frames
+            )
+            if step is not None:
+                idle = 0.0
+                yield step
+                continue
+            if timeout is not None and idle >= timeout:
+                return
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
 
     # TODO: EDF functions should take desired channels as an argument, and
     #       should use montage channels, not raw sources.
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.testing
+~~~~~~~~~~~~~~~
+
+Synthetic study generator used by the test and benchmark suites.
+"""
+
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+from .constants import EVENT_SECTIONS, EVENT_ELEMENTS
+
+STAGE_CYCLE = ["W", "N1", "N2", "N2", "N3", "N3", "N2", "R", "R"]
+
+CUSTOM_EVENTS = {"1": "RSWA_T", "2": "RSWA_P"}
+
+
+def format_time(dt: datetime) -> str:
+    """Formats a datetime the way XDF documents store timestamps
+
+    Args:
+        dt (datetime): Timestamp.
+
+    Returns:
+        str: e.g. "2018-01-01T22:00:00.000000000000000"
+    """
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f") + "000000000"
+
+
+def _per_source(value, count):
+    if isinstance(value, (list, tuple)):
+        if len(value) != count:
+            raise ValueError("Per-source settings must have one value per source.")
+        return list(value)
+    return [value] * count
+
+
+def _digital_limits(sample_width, signed):
+    bits = 8 * sample_width
+    if signed:
+        return -(2 ** (bits - 1)), 2 ** (bits - 1) - 1
+    return 0, 2**bits - 1
+
+
+def pack_samples(values, sample_width, endian="little"):
+    """Packs integer samples into a bytestring of fixed-width samples
+
+    Args:
+        values (np.ndarray): Integer samples.
+        sample_width (int): Sample size in bytes (1-4 or 8).
+        endian (str, optional): Defaults to "little".
+
+    Returns:
+        bytes: Packed samples.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if endian == "big":
+        wide = values.astype(">i8").view(np.uint8).reshape(-1, 8)
+        return wide[:, 8 - sample_width :].tobytes()
+    wide = values.astype("<i8").view(np.uint8).reshape(-1, 8)
+    return wide[:, :sample_width].tobytes()
+
+
+def _source_xml(name, sample_width, sample_freq, signed):
+    digital_min, digital_max = _digital_limits(sample_width, signed)
+    fields = [
+        ["SourceName", name],
+        ["Unit", "1e-06"],
+        ["UseGridScale", "false"],
+        ["MinSamplingRate", sample_freq],
+        ["MinSampleWidth", 1],
+        ["Ignore", "false"],
+        ["PhysicalMax", "3199.9"],
+        ["Signed", "true" if signed else "false"],
+        ["SampleWidth", sample_width],
+        ["SampleFrequency", sample_freq],
+        ["DigitalMax", digital_max],
+        ["DigitalMin", digital_min],
+        ["PhysicalMin", "-3200"],
+        ["DigitalToVolts", "0.0976563"],
+    ]
+    body = "".join(f"<xdf:{k}>{v}</xdf:{k}>" for k, v in fields)
+    return f"<xdf:Source>{body}</xdf:Source>"
+
+
+def _channel_xml(label, lead_1, lead_2, low, high):
+    g2 = "<xdf:G2/>" if lead_2 is None else f"<xdf:G2>{escape(lead_2)}</xdf:G2>"
+    return (
+        f"<xdf:Channel><xdf:Label>{escape(label)}</xdf:Label>"
+        f"<xdf:G1>{escape(lead_1)}</xdf:G1>{g2}"
+        f"<xdf:LF>{low}</xdf:LF><xdf:HF>{high}</xdf:HF></xdf:Channel>"
+    )
+
+
+def _montages_xml(names, rates):
+    referential = []
+    for name, rate in zip(names, rates):
+        high = min(35.0, 0.4 * rate)
+        referential.append(_channel_xml(name, name, None, 0.3, high))
+
+    bipolar = []
+    for i in range(0, len(names) - 1):
+        if rates[i] != rates[i + 1]:
+            continue
+        high = min(35.0, 0.4 * rates[i])
+        label = f"{names[i]}-{names[i + 1]}"
+        bipolar.append(_channel_xml(label, names[i], names[i + 1], 0.3, high))
+
+    montages = []
+    for montage_name, channels in [["Referential", referential], ["Bipolar", bipolar]]:
+        if not channels:
+            continue
+        montages.append(
+            f"<xdf:Montage><xdf:Name>{montage_name}</xdf:Name><xdf:Channels>"
+            + "".join(channels)
+            + "</xdf:Channels></xdf:Montage>"
+        )
+    return "<xdf:Montages>" + "".join(montages) + "</xdf:Montages>"
+
+
+def _staging(num_epochs):
+    return [
+        STAGE_CYCLE[(i * len(STAGE_CYCLE)) // max(num_epochs, 1)]
+        for i in range(num_epochs)
+    ]
+
+
+def _scorer_xml(index, num_epochs, epoch_length, start_time, event_density, rng):
+    stages = _staging(num_epochs)
+    staging = "".join(
+        f"<xdf:SleepStage><xdf:EpochNumber>{i + 1}</xdf:EpochNumber>"
+        f"<xdf:Stage>{stage}</xdf:Stage></xdf:SleepStage>"
+        for i, stage in enumerate(stages)
+    )
+    duration = num_epochs * epoch_length
+
+    def _times(count):
+        onsets = np.sort(rng.uniform(0, max(duration - 10, 1), count))
+        return [start_time + timedelta(seconds=float(t)) for t in onsets]
+
+    def _count():
+        return int(round(event_density * num_epochs))
+
+    sections = []
+    for section in EVENT_SECTIONS:
+        head, body = f"xdf:{section}", f"xdf:{EVENT_ELEMENTS[section]}"
+        events = []
+        for t in _times(_count()):
+            events.append(
+                f"<{body}><xdf:Time>{format_time(t)}</xdf:Time>"
+                f"<xdf:Manual>false</xdf:Manual>"
+                f"<xdf:Duration>{rng.uniform(3, 30):.2f}</xdf:Duration>"
+                f"<xdf:Class>obstructive</xdf:Class></{body}>"
+            )
+        sections.append(f"<{head}>" + "".join(events) + f"</{head}>")
+
+    custom = []
+    for t in _times(_count()):
+        ce_type = str(rng.integers(1, len(CUSTOM_EVENTS) + 1))
+        custom.append(
+            f"<nti:CustomEvent><xdf:Time>{format_time(t)}</xdf:Time>"
+            f"<xdf:Duration>{rng.uniform(0.5, 10):.2f}</xdf:Duration>"
+            f"<nti:CEType>{ce_type}</nti:CEType></nti:CustomEvent>"
+        )
+    sections.append("<nti:CustomEvents>" + "".join(custom) + "</nti:CustomEvents>")
+
+    configs = "".join(
+        f"<nti:CEConfig><nti:CEType>{k}</nti:CEType><nti:CEName>{v}</nti:CEName>"
+        f"<nti:CEDefaultDur>3</nti:CEDefaultDur><nti:CEMinDur>0</nti:CEMinDur>"
+        f"<nti:CEMaxDur>0</nti:CEMaxDur></nti:CEConfig>"
+        for k, v in CUSTOM_EVENTS.items()
+    )
+
+    return (
+        f"<xdf:Scorer><xdf:FirstName>Scorer{index + 1}</xdf:FirstName>"
+        f"<xdf:LastName>Synthetic</xdf:LastName>"
+        f"<xdf:SleepStages>{staging}</xdf:SleepStages>"
+        + "".join(sections)
+        + f"<nti:CEConfigs>{configs}</nti:CEConfigs></xdf:Scorer>"
+    )
+
+
+def _epochs_xml(num_epochs):
+    return "".join(
+        f"<xdf:Epoch><xdf:EpochNumber>{i + 1}</xdf:EpochNumber>"
+        f"<xdf:BreathCount>{i % 7}</xdf:BreathCount><xdf:Body>5</xdf:Body></xdf:Epoch>"
+        for i in range(num_epochs)
+    )
+
+
+def synthesize(num_samples, sample_freq, sample_width, signed, rng):
+    """Returns a plausible integer waveform for a single source
+
+    Args:
+        num_samples (int): Number of samples.
+        sample_freq (int): Sampling frequency in Hz.
+        sample_width (int): Sample size in bytes.
+        signed (bool): Signed samples?
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        np.ndarray: int64 samples inside the source's digital range.
+    """
+    digital_min, digital_max = _digital_limits(sample_width, signed)
+    mid = (digital_max + digital_min) / 2
+    amplitude = (digital_max - digital_min) / 8
+    t = np.arange(num_samples) / sample_freq
+    freq = rng.uniform(1, max(sample_freq / 8, 1.5))
+    wave = np.sin(2 * np.pi * freq * t + rng.uniform(0, 2 * np.pi))
+    noise = rng.normal(0, 0.1, num_samples)
+    values = np.rint(mid + amplitude * (wave + noise))
+    return np.clip(values, digital_min, digital_max).astype(np.int64)
+
+
+def synthesize_eeg(num_samples, sample_freq, sample_width, signed, rng):
+    """Returns a smooth, EEG-like integer waveform for a single source
+
+    Background activity with a 1/f**2 power spectrum above 0.5 Hz and a 10 Hz
+    alpha rhythm, at about 1/256 of the digital range (25 uV at the usual
+    0.1 uV per bit), plus one bit of amplifier noise.
+
+    Args:
+        num_samples (int): Number of samples.
+        sample_freq (int): Sampling frequency in Hz.
+        sample_width (int): Sample size in bytes.
+        signed (bool): Signed samples?
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        np.ndarray: int64 samples inside the source's digital range.
+    """
+    digital_min, digital_max = _digital_limits(sample_width, signed)
+    mid = (digital_max + digital_min) / 2
+    scale = (digital_max - digital_min) / 256
+    freqs = np.fft.rfftfreq(num_samples, 1 / sample_freq)
+    spectrum = np.fft.rfft(rng.normal(0, 1, num_samples))
+    spectrum /= np.maximum(freqs, 0.5)
+    spectrum[0] = 0
+    background = np.fft.irfft(spectrum, num_samples)
+    background *= scale / max(background.std(), 1e-12)
+    t = np.arange(num_samples) / sample_freq
+    alpha = 0.5 * scale * np.sin(2 * np.pi * 10 * t + rng.uniform(0, 2 * np.pi))
+    values = np.rint(mid + background + alpha + rng.normal(0, 1, num_samples))
+    return np.clip(values, digital_min, digital_max).astype(np.int64)
+
+
+def write_study(
+    directory: str,
+    study_id: str = "Synthetic",
+    duration: int = 300,
+    sources=4,
+    sample_rates=200,
+    sample_widths=2,
+    signed=True,
+    endian: str = "little",
+    frame_length: int = 1,
+    epoch_length: int = 30,
+    scorers: int = 2,
+    event_density: float = 0.1,
+    start_time: datetime = datetime(2018, 1, 1, 22, 0, 0),
+    seed: int = 0,
+    segments: int = 1,
+    gap: int = 0,
+    waveform: str = "sine",
+):
+    """Writes a synthetic XDF header and interleaved raw data file
+
+    Args:
+        directory (str): Output folder.
+        study_id (str, optional): Defaults to "Synthetic". Patient/study ID.
+        duration (int, optional): Defaults to 300. Recording length in seconds.
+        sources (int or list, optional): Defaults to 4. Number of sources or a
+            list of source names.
+        sample_rates (int or list, optional): Defaults to 200. Per-source
+            sampling frequency in Hz.
+        sample_widths (int or list, optional): Defaults to 2. Per-source
+            sample width in bytes (1-4 or 8).
+        signed (bool or list, optional): Defaults to True.
+        endian (str, optional): Defaults to "little".
+        frame_length (int, optional): Defaults to 1. Frame length in seconds.
+        epoch_length (int, optional): Defaults to 30. Epoch length in seconds.
+        scorers (int, optional): Defaults to 2. Number of scorers.
+        event_density (float, optional): Defaults to 0.1. Events per epoch for
+            each event type.
+        start_time (datetime, optional): Recording start time.
+        seed (int, optional): Defaults to 0. Random seed.
+        segments (int, optional): Defaults to 1. Split the recording into this
+            many equal data files.
+        gap (int, optional): Defaults to 0. Seconds between data files.
+        waveform (str, optional): Defaults to "sine". "sine" for a noisy
+            sine per source (see `synthesize`) or "eeg" for smooth, EEG-like
+            signals (see `synthesize_eeg`).
+
+    Returns:
+        tuple: (xdf_path, data_path); data_path is a list of paths when the
+        recording is split into several data files.
+    """
+    rng = np.random.default_rng(seed)
+
+    if isinstance(sources, int):
+        names = [f"S{i + 1}" for i in range(sources)]
+    else:
+        names = list(sources)
+    if len(names) < 2:
+        raise ValueError("Synthetic studies need at least two sources.")
+
+    generate = {"sine": synthesize, "eeg": synthesize_eeg}.get(waveform)
+    if generate is None:
+        raise ValueError(f"Unknown waveform: {waveform}")
+
+    rates = _per_source(sample_rates, len(names))
+    widths = _per_source(sample_widths, len(names))
+    signs = _per_source(signed, len(names))
+    num_frames = duration // frame_length
+    num_epochs = (duration + gap * (segments - 1)) // epoch_length
+    xdf_path = os.path.join(directory, f"{study_id}.xdf")
+
+    # Raw data: one (frames x channel_width) byte block per source, interleaved
+    columns = []
+    for rate, width, sign in zip(rates, widths, signs):
+        samples_per_frame = rate * frame_length
+        values = generate(num_frames * samples_per_frame, rate, width, sign, rng)
+        packed = np.frombuffer(pack_samples(values, width, endian), dtype=np.uint8)
+        columns.append(packed.reshape(num_frames, samples_per_frame * width))
+    frames = np.hstack(columns)
+
+    sources_xml = "".join(
+        _source_xml(n, w, r, s) for n, w, r, s in zip(names, widths, rates, signs)
+    )
+    data_files = []
+    data_paths = []
+    bounds = np.linspace(0, num_frames, segments + 1).astype(int)
+    for k, (first, last) in enumerate(zip(bounds[:-1], bounds[1:])):
+        data_file = f"{study_id}.nkamp"
+        if segments > 1:
+            data_file = f"{study_id}-{k + 1}.nkamp"
+        data_paths.append(os.path.join(directory, data_file))
+        with open(data_paths[-1], "wb") as f:
+            f.write(frames[first:last].tobytes())
+
+        offset = timedelta(seconds=int(first) * frame_length + k * gap)
+        data_files.append(
+            "<xdf:DataFile>"
+            f"<xdf:File>{data_file}</xdf:File>"
+            f"<xdf:FrameLength>{frame_length}</xdf:FrameLength>"
+            f"<xdf:Endian>{endian}</xdf:Endian>"
+            "<xdf:Sessions><xdf:Session>"
+            f"<xdf:StartTime>{format_time(start_time + offset)}</xdf:StartTime>"
+            "</xdf:Session></xdf:Sessions>"
+            f"<xdf:Sources>{sources_xml}</xdf:Sources>"
+            f"{_montages_xml(names, rates)}"
+            "</xdf:DataFile>"
+        )
+    scorers_xml = "".join(
+        _scorer_xml(i, num_epochs, epoch_length, start_time, event_density, rng)
+        for i in range(scorers)
+    )
+
+    xml = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<xdf:OpenXDF xmlns:xdf="http://www.openxdf.org/" '
+        'xmlns:nti="http://www.natus.com/">'
+        f"<xdf:EpochLength>{epoch_length}</xdf:EpochLength>"
+        "<xdf:PatientInformation>"
+        f"<xdf:ID>{escape(study_id)}</xdf:ID>"
+        "<xdf:FirstName>Jane</xdf:FirstName><xdf:LastName>Doe</xdf:LastName>"
+        "<xdf:DOB>1970-01-01</xdf:DOB><xdf:Comments>Synthetic study</xdf:Comments>"
+        "</xdf:PatientInformation>"
+        f"<xdf:DataFiles>{''.join(data_files)}</xdf:DataFiles>"
+        "<xdf:ScoringResults>"
+        f"<xdf:EpochInformation>{_epochs_xml(num_epochs)}</xdf:EpochInformation>"
+        f"<xdf:Scorers>{scorers_xml}</xdf:Scorers>"
+        "</xdf:ScoringResults>"
+        "</xdf:OpenXDF>\n"
+    )
+    with open(xdf_path, "w") as f:
+        f.write(xml)
+
+    if segments > 1:
+        return xdf_path, data_paths
+    return xdf_path, data_paths[0]
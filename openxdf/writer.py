@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+openxdf.writer
+~~~~~~~~~~~~~~
+
+Writes new scorers into XDF documents without re-serializing them.
+
+The source document is streamed through in fixed-size chunks and copied
+byte for byte; new `xdf:Scorer` blocks, built from arrays, are spliced in
+just before `</xdf:Scorers>`. Memory use does not depend on document size.
+
+   >>> scorer = {
+   ...     "first_name": "Auto",
+   ...     "stages": ["W", "W", "N1", "N2", ...],
+   ...     "events": {"Apneas": {"onset": [301.5, 912.0], "duration": [12, 18]}},
+   ...     "custom_events": {"RSWA_P": {"onset": [4410.2], "duration": [0.5]}},
+   ... }
+   >>> xdf.write("/path/to/rescored.xdf", add_scorer=scorer)
+   >>> write_batch([(xdf_path, output_path, scorer), ...])
+
+Event onsets are seconds since the study start time.
+"""
+
+import re
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .parsing import parse_time
+from .constants import EVENT_SECTIONS, EVENT_ELEMENTS, STAGE_LABELS
+
+_MARKERS = re.compile(
+    rb"</xdf:Scorers>|<xdf:Scorers\s*/>|</xdf:ScoringResults>|</xdf:OpenXDF>"
+)
+_START_TIME = re.compile(rb"<xdf:StartTime>([^<]+)</xdf:StartTime>")
+_CE_TYPE = re.compile(rb"<nti:CEType>\s*([0-9]+)\s*</nti:CEType>")
+_OVERLAP = 256
+
+
+def format_times(start_time, onsets) -> list:
+    """Formats onsets (seconds since `start_time`) as XDF timestamps"""
+    offsets = np.round(np.asarray(onsets, dtype=np.float64) * 1e6)
+    times = np.datetime64(start_time, "us") + offsets.astype("timedelta64[us]")
+    return [i + "000000000" for i in np.datetime_as_string(times, unit="us")]
+
+
+def _values(value, n) -> list:
+    if np.ndim(value) == 0:
+        return [value] * n
+    value = list(value)
+    if len(value) != n:
+        raise ValueError("Event fields must have one value per onset.")
+    return value
+
+
+def _number(value) -> str:
+    return format(float(value), "g") if not isinstance(value, str) else value
+
+
+def _events_xml(body, events, start_time) -> str:
+    onsets = np.atleast_1d(np.asarray(events["onset"], dtype=np.float64))
+    durations = _values(events.get("duration", 0), len(onsets))
+    extras = {
+        k: _values(v, len(onsets))
+        for k, v in events.items()
+        if k not in ["onset", "duration"]
+    }
+
+    rows = []
+    for i, time in enumerate(format_times(start_time, onsets)):
+        fields = f"<xdf:Time>{time}</xdf:Time>"
+        fields += f"<xdf:Duration>{_number(durations[i])}</xdf:Duration>"
+        for name, values in extras.items():
+            fields += f"<{name}>{escape(str(values[i]))}</{name}>"
+        rows.append(f"<{body}>{fields}</{body}>")
+    return "".join(rows)
+
+
+def scorer_xml(scorer: dict, start_time=None, first_ce_type=1) -> str:
+    """Builds an `xdf:Scorer` element from arrays
+
+    Args:
+        scorer (dict): {"first_name": _, "last_name": _ (optional),
+            "stages": per-epoch labels ("W", "N2", ...) or
+                `openxdf.constants.STAGE_CODES` integers; -1 is left unscored,
+            "events": {section: {"onset": seconds, "duration": seconds,
+                       other field: values}} with sections as in
+                       `EVENT_SECTIONS` (field names get an "xdf:" prefix
+                       unless they have one),
+            "custom_events": {name: {"onset": _, "duration": _}}}
+        start_time (datetime, optional): Study start; required for events.
+        first_ce_type (int, optional): Defaults to 1. CEType of the first
+            custom event type; must be above every CEType already in the
+            document, since `OpenXDF.custom_event_list` merges scorers by it.
+
+    Returns:
+        str: The element as XML text.
+    """
+    events = scorer.get("events") or {}
+    custom_events = scorer.get("custom_events") or {}
+    unknown = set(events) - set(EVENT_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown event sections: {sorted(unknown)}")
+    if (events or custom_events) and start_time is None:
+        raise ValueError("A start time is needed to write events.")
+
+    stages = []
+    for i, stage in enumerate(scorer.get("stages", [])):
+        if not isinstance(stage, str):
+            stage = STAGE_LABELS.get(int(stage))
+        if stage is None:
+            continue
+        stages.append(
+            f"<xdf:SleepStage><xdf:EpochNumber>{i + 1}</xdf:EpochNumber>"
+            f"<xdf:Stage>{escape(stage)}</xdf:Stage></xdf:SleepStage>"
+        )
+
+    sections = []
+    for head in EVENT_SECTIONS:
+        body = "xdf:" + EVENT_ELEMENTS[head]
+        section = events.get(head)
+        if section is not None:
+            section = {
+                (k if ":" in k or k in ["onset", "duration"] else f"xdf:{k}"): v
+                for k, v in section.items()
+            }
+        rows = _events_xml(body, section, start_time) if section else ""
+        sections.append(f"<xdf:{head}>{rows}</xdf:{head}>")
+
+    custom = []
+    configs = []
+    for ce_type, (name, section) in enumerate(custom_events.items(), first_ce_type):
+        section = dict(section, **{"nti:CEType": ce_type})
+        custom.append(_events_xml("nti:CustomEvent", section, start_time))
+        configs.append(
+            f"<nti:CEConfig><nti:CEType>{ce_type}</nti:CEType>"
+            f"<nti:CEName>{escape(name)}</nti:CEName>"
+            "<nti:CEDefaultDur>0</nti:CEDefaultDur><nti:CEMinDur>0</nti:CEMinDur>"
+            "<nti:CEMaxDur>0</nti:CEMaxDur></nti:CEConfig>"
+        )
+
+    return (
+        "<xdf:Scorer>"
+        f"<xdf:FirstName>{escape(str(scorer['first_name']))}</xdf:FirstName>"
+        f"<xdf:LastName>{escape(str(scorer.get('last_name', '')))}</xdf:LastName>"
+        f"<xdf:SleepStages>{''.join(stages)}</xdf:SleepStages>"
+        + "".join(sections)
+        + f"<nti:CustomEvents>{''.join(custom)}</nti:CustomEvents>"
+        + f"<nti:CEConfigs>{''.join(configs)}</nti:CEConfigs>"
+        + "</xdf:Scorer>"
+    )
+
+
+def _insertion(marker, scorers) -> bytes:
+    if marker == b"</xdf:Scorers>":
+        text = scorers
+    elif marker.startswith(b"<xdf:Scorers"):
+        text = f"<xdf:Scorers>{scorers}</xdf:Scorers>"
+    elif marker == b"</xdf:ScoringResults>":
+        text = f"<xdf:Scorers>{scorers}</xdf:Scorers>"
+    else:
+        text = f"<xdf:ScoringResults><xdf:Scorers>{scorers}</xdf:Scorers>"
+        text += "</xdf:ScoringResults>"
+    return text.encode("utf-8")
+
+
+def add_scorers(src, dst, scorers, start_time=None, chunk_size=2**20) -> str:
+    """Copies an XDF document, appending scorers to `xdf:Scorers`
+
+    Args:
+        src (str): Source XDF path.
+        dst (str): Output path (must differ from `src`).
+        scorers (dict or list): One or more scorers (see `scorer_xml`).
+        start_time (datetime, optional): Defaults to None (the first
+            session start time in the document).
+        chunk_size (int, optional): Defaults to 1 MiB. Bytes read at a time.
+
+    Returns:
+        str: `dst`
+    """
+    if isinstance(scorers, dict):
+        scorers = [scorers]
+    if isinstance(start_time, str):
+        start_time = parse_time(start_time)
+
+    with open(src, "rb") as fi, open(dst, "wb") as fo:
+        tail = b""
+        done = False
+        last_ce_type = 0
+        while True:
+            chunk = fi.read(chunk_size)
+            buffer = tail + chunk
+            if done or not buffer:
+                fo.write(buffer)
+                if not chunk:
+                    break
+                tail = b""
+                continue
+
+            if start_time is None:
+                found = _START_TIME.search(buffer)
+                if found is not None:
+                    start_time = parse_time(found.group(1).decode("ascii").strip())
+
+            marker = _MARKERS.search(buffer)
+            scanned = buffer if marker is None else buffer[: marker.start()]
+            for found in _CE_TYPE.finditer(scanned):
+                last_ce_type = max(last_ce_type, int(found.group(1)))
+
+            if marker is not None:
+                # A replaced self-closing <xdf:Scorers/> is dropped
+                keep = marker.group() if marker.group().startswith(b"</") else b""
+                # New custom event types get codes above every existing one
+                text = ""
+                for scorer in scorers:
+                    text += scorer_xml(scorer, start_time, last_ce_type + 1)
+                    last_ce_type += len(scorer.get("custom_events") or {})
+                fo.write(buffer[: marker.start()])
+                fo.write(_insertion(marker.group(), text))
+                fo.write(keep + buffer[marker.end() :])
+                done = True
+                tail = b""
+            elif not chunk:
+                raise ValueError(f"{src} is not an OpenXDF document.")
+            else:
+                fo.write(buffer[:-_OVERLAP])
+                tail = buffer[-_OVERLAP:]
+    return dst
+
+
+def _add_scorers(job):
+    return add_scorers(*job)
+
+
+def write_batch(jobs, workers=None) -> list:
+    """Adds scorers to many documents in parallel
+
+    Documents are streamed, never parsed, so memory use stays flat.
+
+    Args:
+        jobs (iterable): (src, dst, scorers) or (src, dst, scorers,
+            start_time) tuples.
+        workers (int, optional): Defaults to None (one per CPU). Number of
+            worker processes; 1 writes in this process.
+
+    Returns:
+        list: Output paths, in order.
+    """
+    jobs = [tuple(i) for i in jobs]
+    if workers == 1 or len(jobs) <= 1:
+        return list(map(_add_scorers, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_add_scorers, jobs, chunksize=16))
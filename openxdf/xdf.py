@@ -7,14 +7,19 @@ openxdf.xdf
 This module provides the base class for reading XML data
 """
 
-import xmltodict
+import os
 import json
-from datetime import datetime
 import re
-import pandas as pd
 from math import ceil
+from functools import cached_property
+from typing import TYPE_CHECKING
 
-from .helpers import clean_title
+from .parsing import clean_title, parse_time, as_list
+from .constants import EVENT_SECTIONS, EVENT_ELEMENTS, STAGE_CODES
+from .instrument import timer, timed, count
+
+if TYPE_CHECKING:  # pandas is imported lazily by OpenXDF.dataframe
+    import pandas as pd
 
 
 class OpenXDF(object):
@@ -39,11 +44,15 @@ class OpenXDF(object):
         Returns:
             dict: XDF file as a dict object.
         """
-        with open(fpath) as f:
-            opened_file = f.read()
-            xdf_odict = xmltodict.parse(opened_file)
+        import xmltodict
+
+        with timer("xdf.parse", path=fpath):
+            with open(fpath) as f:
+                opened_file = f.read()
+                xdf_odict = xmltodict.parse(opened_file)
 
-        xdf = json.loads(json.dumps(xdf_odict))
+            xdf = json.loads(json.dumps(xdf_odict))
+        count("xdf.bytes_read", len(opened_file), path=fpath)
 
         if deidentify:
             terms = ["xdf:FirstName", "xdf:LastName", "xdf:DOB", "xdf:Comments"]
@@ -58,25 +67,35 @@ class OpenXDF(object):
         return str(i)
 
     @property
-    def start_time(self):
+    def _data_files(self) -> list:
+        """All `xdf:DataFile` entries as a list"""
         data_file = self._data["xdf:DataFiles"]["xdf:DataFile"]
 
         if type(data_file) is dict:
-            session = data_file["xdf:Sessions"]["xdf:Session"]
+            return [data_file]
         elif type(data_file) is list:
-            session = data_file[0]["xdf:Sessions"]["xdf:Session"]
+            return data_file
         else:
             raise TypeError
 
-        return datetime.strptime(session["xdf:StartTime"][:-9], "%Y-%m-%dT%H:%M:%S.%f")
+    @property
+    def start_time(self):
+        session = self._data_files[0]["xdf:Sessions"]["xdf:Session"]
+        if type(session) is list:
+            session = session[0]
+
+        return parse_time(session["xdf:StartTime"])
 
     @property
     def header(self):
         """Returns general file encoding information.
+
+        For recordings split over several data files, this describes the first
+        file; see `segments` for the others.
         """
 
         header = {}
-        data_file = self._data["xdf:DataFiles"]["xdf:DataFile"]
+        data_file = self._data_files[0]
 
         header["ID"] = re.sub("[.]nkamp", "", data_file["xdf:File"])
         header["EpochLength"] = int(self._data["xdf:EpochLength"])
@@ -86,37 +105,95 @@ class OpenXDF(object):
 
         return header
 
-    @property
-    def sources(self):
-        """Information on raw data sources (e.g. signals)"""
-        sources = self._data["xdf:DataFiles"]["xdf:DataFile"]["xdf:Sources"][
-            "xdf:Source"
-        ]
-
+    @staticmethod
+    def _normalize_sources(sources) -> list:
+        """Copies of `sources` with clean keys and numeric values"""
+        normalized = []
         for source in sources:
+            entry = {}
             for k, v in source.items():
                 new_key = clean_title(k)
-                source[new_key] = source.pop(k)
+                entry[new_key] = v
 
                 if re.match("[-]?[0-9]+[\.e][-]?[0-9]+", str(v)) is not None:
-                    source[new_key] = float(str(v))
+                    entry[new_key] = float(str(v))
                 elif re.match("[-]?[0-9]+", str(v)) is not None:
-                    source[new_key] = int(str(v))
+                    entry[new_key] = int(str(v))
+            normalized.append(entry)
+
+        return normalized
+
+    @cached_property
+    @timed("xdf.normalize.sources")
+    def _sources(self) -> list:
+        """Normalized sources of every data file
+
+        Normalized once and never modified afterwards, so concurrent readers
+        (e.g. the tile server's thread pool) can share one document.
+        """
+        return [
+            self._normalize_sources(as_list(data_file["xdf:Sources"]["xdf:Source"]))
+            for data_file in self._data_files
+        ]
+
+    @property
+    def sources(self):
+        """Information on raw data sources (e.g. signals)"""
+        return [dict(source) for source in self._sources[0]]
+
+    @cached_property
+    @timed("xdf.normalize.segments")
+    def _segments(self) -> list:
+        segments = []
+        for data_file, sources in zip(self._data_files, self._sources):
+            sessions = as_list(data_file["xdf:Sessions"]["xdf:Session"])
+
+            for i, session in enumerate(sessions):
+                end_time = session.get("xdf:EndTime")
+                segments.append(
+                    {
+                        "File": data_file["xdf:File"],
+                        "FrameLength": int(data_file["xdf:FrameLength"]),
+                        "Endian": data_file["xdf:Endian"],
+                        "StartTime": parse_time(session["xdf:StartTime"]),
+                        "EndTime": parse_time(end_time) if end_time else None,
+                        "Session": i,
+                        "Sources": sources,
+                    }
+                )
+
+        return segments
 
-        return sources
+    @property
+    def segments(self):
+        """Layout and timing of every recording segment (data file/session)
+
+        A recording may be split over several `xdf:DataFile` entries, and each
+        data file may hold several back-to-back `xdf:Session` entries.
+
+        Returns:
+            list: [{"File": _, "FrameLength": _, "Endian": _, "StartTime": _,
+                    "EndTime": _, "Session": _, "Sources": [...]},
+                   ...]
+            "Session" is the session's position within its data file and
+            "EndTime" is None when the document does not record one.
+        """
+        return [
+            dict(segment, Sources=[dict(i) for i in segment["Sources"]])
+            for segment in self._segments
+        ]
 
     @property
+    @timed("xdf.normalize.montages")
     def montages(self):
         """Information on montages"""
-        montages = self._data["xdf:DataFiles"]["xdf:DataFile"]["xdf:Montages"][
-            "xdf:Montage"
-        ]
+        montages = self._data_files[0]["xdf:Montages"]["xdf:Montage"]
 
         crosses = {}
 
-        for montage in montages:
+        for montage in as_list(montages):
             channels = montage["xdf:Channels"]["xdf:Channel"]
-            for channel in channels:
+            for channel in as_list(channels):
                 label = channel["xdf:Label"]
                 lead_1 = channel["xdf:G1"]
                 lead_2 = channel["xdf:G2"]
@@ -138,6 +215,7 @@ class OpenXDF(object):
         return crosses
 
     @property
+    @timed("xdf.normalize.epochs")
     def epochs(self):
         """Extracts epoch information
 
@@ -149,8 +227,9 @@ class OpenXDF(object):
             return {}
 
         epochs = self._data["xdf:ScoringResults"]["xdf:EpochInformation"]["xdf:Epoch"]
+        epochs = as_list(epochs)
         for epoch in epochs:
-            for k, v in epoch.items():
+            for k, v in list(epoch.items()):
                 new_key = clean_title(k)
                 epoch[new_key] = epoch.pop(k)
 
@@ -162,6 +241,7 @@ class OpenXDF(object):
         return epochs
 
     @property
+    @timed("xdf.normalize.scoring")
     def scoring(self):
         """Extracts sleep scoring information"""
 
@@ -171,7 +251,7 @@ class OpenXDF(object):
         scoring_info = []
 
         scorers = self._data["xdf:ScoringResults"]["xdf:Scorers"]["xdf:Scorer"]
-        for scorer in scorers:
+        for scorer in as_list(scorers):
             header = {}
             header["first_name"] = scorer["xdf:FirstName"]
             header["last_name"] = scorer["xdf:LastName"]
@@ -183,7 +263,7 @@ class OpenXDF(object):
             ):
                 continue
 
-            for epoch in scorer["xdf:SleepStages"]["xdf:SleepStage"]:
+            for epoch in as_list(scorer["xdf:SleepStages"]["xdf:SleepStage"]):
                 e = {}
                 e["EpochNumber"] = int(epoch["xdf:EpochNumber"])
                 e["Stage"] = epoch["xdf:Stage"]
@@ -194,17 +274,18 @@ class OpenXDF(object):
         return scoring_info
 
     @property
+    @timed("xdf.normalize.custom_event_list")
     def custom_event_list(self):
         """Returns a dict of the custom events defined across scorers"""
 
         custom_events = {}
 
         scorers = self._data["xdf:ScoringResults"]["xdf:Scorers"]["xdf:Scorer"]
-        for scorer in scorers:
+        for scorer in as_list(scorers):
             ce_configs = scorer["nti:CEConfigs"]
             if ce_configs is None:
                 continue
-            for config in ce_configs["nti:CEConfig"]:
+            for config in as_list(ce_configs["nti:CEConfig"]):
                 ce_type = config["nti:CEType"]
                 custom_events[ce_type] = {}
                 custom_events[ce_type]["name"] = config["nti:CEName"]
@@ -215,25 +296,18 @@ class OpenXDF(object):
         return custom_events
 
     @property
+    @timed("xdf.normalize.events")
     def events(self):
         """Returns a dict of all events across all scorers, incl. custom events
         """
 
         events = {}
-        section_headers = [
-            "xdf:Apneas",
-            "xdf:Hypopneas",
-            "xdf:Desaturations",
-            "xdf:Microarousals",
-            "xdf:Snores",
-            "xdf:LegMovements1",
-            "xdf:LegMovements2",
-            "nti:CustomEvents",
-        ]
-        sections = [[i, re.sub("s[0-9]?$", "", i)] for i in section_headers]
+        sections = [
+            [f"xdf:{i}", f"xdf:{EVENT_ELEMENTS[i]}"] for i in EVENT_SECTIONS
+        ] + [["nti:CustomEvents", "nti:CustomEvent"]]
 
         scorers = self._data["xdf:ScoringResults"]["xdf:Scorers"]["xdf:Scorer"]
-        for scorer in scorers:
+        for scorer in as_list(scorers):
             s_name = scorer["xdf:FirstName"]
             events[s_name] = {}
             for head, body in sections:
@@ -244,7 +318,7 @@ class OpenXDF(object):
                 if scorer[head] is None:
                     continue
 
-                for e in scorer[head][body]:
+                for e in as_list(scorer[head][body]):
                     if e is None or type(e) is not dict:
                         continue
 
@@ -255,7 +329,126 @@ class OpenXDF(object):
 
         return events
 
-    def dataframe(self, epochs=True, events=True) -> pd.DataFrame:
+    @timed("xdf.event_matrix")
+    def event_matrix(self, scorer=None) -> dict:
+        """Per-epoch counts and durations of one scorer's events, by type
+
+        Events are binned into epochs by onset with `np.bincount`, and the
+        respiratory, arousal and limb movement indices are events per hour of
+        sleep (epochs the scorer staged N1-N3 or R), counting only events
+        that start in sleep. No DataFrames are built.
+
+        Args:
+            scorer (str, optional): Defaults to None (first scorer). Scorer
+                first name.
+
+        Returns:
+            dict: {"types": event section names then custom event names,
+                   "counts": int (epochs x types) array,
+                   "durations": float (epochs x types) seconds,
+                   "stages": per-epoch `openxdf.constants.STAGE_CODES`,
+                   "sleep_hours": _,
+                   "indices": {"AHI": _, "AI": _, "HI": _, "DI": _,
+                               "ArI": _, "LMI": _}}
+        """
+        import numpy as np
+        from .dataset import stage_labels
+
+        scorers = as_list(self._data["xdf:ScoringResults"]["xdf:Scorers"]["xdf:Scorer"])
+        names = [i["xdf:FirstName"] for i in scorers]
+        if scorer is None:
+            scorer = names[0]
+        if scorer not in names:
+            raise ValueError(f"Unknown scorer: {scorer}")
+
+        # Custom event types as this scorer defines them
+        ce_configs = scorers[names.index(scorer)]["nti:CEConfigs"]
+        ce_names = {}
+        for config in as_list(ce_configs and ce_configs["nti:CEConfig"]):
+            ce_names[config["nti:CEType"]] = config["nti:CEName"]
+        types = EVENT_SECTIONS + list(dict.fromkeys(ce_names.values()))
+
+        epoch_length = self.header["EpochLength"]
+        num_epochs = max([i["EpochNumber"] for i in self.epochs] or [0])
+
+        times, durations, columns = [], [], []
+        for section, events in self.events[scorer].items():
+            for event in events:
+                if section == "CustomEvents":
+                    name = ce_names.get(event.get("CEType"))
+                    if name is None:
+                        continue
+                    columns.append(types.index(name))
+                else:
+                    columns.append(types.index(section))
+                times.append(event["Time"][:-9])
+                durations.append(float(event.get("Duration") or 0))
+
+        onsets = np.array(times, dtype="datetime64[us]")
+        origin = np.datetime64(self.start_time, "us")
+        offsets = (onsets - origin) / np.timedelta64(1, "s")
+        rows = np.floor(offsets / epoch_length).astype(np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        durations = np.array(durations, dtype=np.float64)
+        inside = (rows >= 0) & (rows < num_epochs)
+
+        cells = rows[inside] * len(types) + columns[inside]
+        shape = (num_epochs, len(types))
+        counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        totals = np.bincount(
+            cells, weights=durations[inside], minlength=shape[0] * shape[1]
+        ).reshape(shape)
+
+        stages = stage_labels(self, num_epochs, scorer)
+        sleep = (stages > STAGE_CODES["W"]) & (stages <= STAGE_CODES["R"])
+        sleep_hours = sleep.sum() * epoch_length / 3600
+        in_sleep = counts[sleep].sum(axis=0)
+
+        def _index(*sections):
+            if not sleep_hours:
+                return float("nan")
+            return float(sum(in_sleep[types.index(i)] for i in sections) / sleep_hours)
+
+        return {
+            "types": types,
+            "counts": counts,
+            "durations": totals,
+            "stages": stages,
+            "sleep_hours": float(sleep_hours),
+            "indices": {
+                "AHI": _index("Apneas", "Hypopneas"),
+                "AI": _index("Apneas"),
+                "HI": _index("Hypopneas"),
+                "DI": _index("Desaturations"),
+                "ArI": _index("Microarousals"),
+                "LMI": _index("LegMovements1", "LegMovements2"),
+            },
+        }
+
+    def write(self, path: str, add_scorer=None) -> str:
+        """Writes a copy of the XDF document, optionally with new scorers
+
+        The original file is streamed to `path` unchanged (including patient
+        information; see `openxdf.pretty` to de-identify it) apart from the
+        new `xdf:Scorer` blocks. See `openxdf.writer.scorer_xml` for the
+        scorer format.
+
+        Args:
+            path (str): Output path.
+            add_scorer (dict or list, optional): Defaults to None. Scorer(s)
+                to append.
+
+        Returns:
+            str: `path`
+        """
+        from .writer import add_scorers
+
+        if os.path.abspath(path) == os.path.abspath(self._filepath):
+            raise ValueError("Cannot write over the source document.")
+        return add_scorers(self._filepath, path, add_scorer or [], self.start_time)
+
+    @timed("xdf.dataframe")
+    def dataframe(self, epochs=True, events=True) -> "pd.DataFrame":
         """Returns DataFrame of scoring, epoch, and event information.
 
         Arguments:
@@ -265,13 +458,14 @@ class OpenXDF(object):
         Returns:
             pd.DataFrame: DataFrame of scoring, epochs, and events.
         """
+        import pandas as pd
 
         # Scoring
         scoring_df = pd.DataFrame()
         for scorer in self.scoring:
             _staging_df = pd.DataFrame(scorer["staging"])
             _staging_df["Scorer"] = scorer["header"]["first_name"]
-            scoring_df = scoring_df.append(_staging_df)
+            scoring_df = pd.concat([scoring_df, _staging_df], sort=False)
 
         scoring_df = scoring_df.sort_values(["EpochNumber", "Scorer"])
         scoring_df = scoring_df.reset_index(drop=True)
@@ -297,9 +491,7 @@ class OpenXDF(object):
                 )
 
             if not events_df.empty:
-                events_df["Time"] = events_df["Time"].apply(
-                    lambda t: datetime.strptime(t[:-9], "%Y-%m-%dT%H:%M:%S.%f")
-                )
+                events_df["Time"] = events_df["Time"].apply(parse_time)
                 events_df["ElapsedTime"] = events_df["Time"] - self.start_time
                 events_df["EpochNumber"] = events_df["ElapsedTime"].apply(
                     lambda x: int(ceil(x.seconds / 30))
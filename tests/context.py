@@ -4,3 +4,20 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import openxdf
+
+
+def write_fixture(directory):
+    """Writes the small synthetic study the tests share into `directory`
+
+    Returns:
+        tuple: (xdf_path, data_path) of a 30 minute study named "test".
+    """
+    from openxdf.testing import write_study
+
+    return write_study(
+        directory,
+        study_id="test",
+        duration=1800,
+        sources=["C3", "A2", "Chin", "EKG"],
+        sample_rates=[200, 200, 200, 100],
+    )
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf import archive, instrument
+from openxdf.testing import write_study
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Archive_Test(unittest.TestCase):
+    """Test cases for the openxdf.archive module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, self.data_path = write_study(
+            self.tmpdir,
+            duration=600,
+            sources=["C3", "A2", "Chin", "EKG"],
+            sample_rates=[200, 200, 200, 100],
+            sample_widths=[2, 2, 1, 4],
+            signed=[True, True, False, True],
+        )
+        self.xdf = openxdf.OpenXDF(self.xdf_path)
+        self.signal = openxdf.Signal(self.xdf, self.data_path)
+        self.output = os.path.join(self.tmpdir, "archive")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_chunk_roundtrip(self):
+        for dtype in ["<i2", "<u1", "<i4", "<i8"]:
+            info = np.iinfo(dtype)
+            values = np.array([info.min, info.max, info.min, 0, 1, info.max])
+            for codec in archive.CODECS:
+                data = archive.encode_chunk(values, dtype, codec)
+                decoded = archive.decode_chunk(data, dtype, codec)
+                assert decoded.dtype == np.dtype(dtype)
+                assert (decoded.astype(values.dtype) == values).all()
+
+    def test_read_transparently(self):
+        for codec in archive.CODECS:
+            paths = archive.write(self.signal, self.output, codec=codec)
+            assert archive.is_archive(paths[0])
+            assert os.path.getsize(paths[0]) < os.path.getsize(self.data_path)
+
+            signal = openxdf.Signal(self.xdf, paths[0])
+            sources = ["C3", "A2", "Chin", "EKG"]
+            expected = self.signal._read_sources(sources)
+            decoded = signal._read_sources(sources)
+            for name in sources:
+                assert (decoded[name] == expected[name]).all()
+
+            channels = ["C3-A2", "EKG"]
+            expected = self.signal.read_file(channels, start=95, stop=200)
+            output = signal.read_file(channels, start=95, stop=200)
+            for channel in channels:
+                assert np.array_equal(output[channel], expected[channel])
+
+    def test_range_reads(self):
+        paths = archive.write(self.signal, self.output, chunk_frames=30)
+        signal = openxdf.Signal(self.xdf, paths[0])
+        reader = archive.ArchiveReader(paths[0])
+        assert reader.num_frames == 600
+
+        with instrument.collect() as sink:
+            epoch = signal._read_sources(["EKG"], 45, 30)["EKG"]
+        chunks = reader.index["sources"]["EKG"]["chunks"]
+        assert sink.summary()["counters"]["signal.bytes_read"] == sum(
+            length for _, length in chunks[1:3]
+        )
+        assert (epoch == self.signal._read_sources(["EKG"], 45, 30)["EKG"]).all()
+
+    def test_segments(self):
+        xdf_path, data_paths = write_study(
+            self.tmpdir, study_id="Split", duration=300, segments=2, gap=30
+        )
+        xdf = openxdf.OpenXDF(xdf_path)
+        signal = openxdf.Signal(xdf, data_paths[0])
+        paths = archive.write(signal, self.output)
+        assert len(paths) == 2
+
+        archived = openxdf.Signal(xdf, paths[0])
+        expected = signal.read_file(["S1-S2"])["S1-S2"]
+        output = archived.read_file(["S1-S2"])["S1-S2"]
+        assert np.array_equal(output, expected, equal_nan=True)
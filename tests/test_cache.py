@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf import cache
+from openxdf.testing import write_study
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Cache_Test(unittest.TestCase):
+    """Test cases for the openxdf.cache module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, self.data_path = write_study(self.tmpdir, duration=120)
+        self.xdf = openxdf.OpenXDF(self.xdf_path)
+        self.expected = openxdf.Signal(self.xdf, self.data_path).read_file(
+            ["S1-S2", "S1"]
+        )
+        cache.enable(max_bytes=2**24)
+
+    def tearDown(self):
+        cache.disable()
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_file(self):
+        signal = openxdf.Signal(self.xdf, self.data_path)
+        first = signal.read_file(["S1-S2"])["S1-S2"]
+        assert cache.stats()["misses"] == 3
+        assert not first.flags.writeable
+        assert np.allclose(first, self.expected["S1-S2"])
+
+        # Same channel from another Signal on the same file
+        other = openxdf.Signal(openxdf.OpenXDF(self.xdf_path), self.data_path)
+        assert other.read_file(["S1-S2"])["S1-S2"] is first
+        assert cache.stats()["hits"] == 1
+
+        # New channel reusing an already decoded lead
+        with openxdf.instrument.collect() as sink:
+            single = other.read_file(["S1"])["S1"]
+        assert "signal.read" not in sink.summary()["timings"]
+        assert np.allclose(single, self.expected["S1"])
+        assert cache.stats()["hits"] == 2
+
+    def test_invalidation(self):
+        signal = openxdf.Signal(self.xdf, self.data_path)
+        first = signal.read_file(["S1"])["S1"]
+        status = os.stat(self.data_path)
+        os.utime(self.data_path, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+        assert signal.read_file(["S1"])["S1"] is not first
+
+    def test_eviction(self):
+        cache.enable(max_bytes=120 * 200 * 8 * 2)
+        signal = openxdf.Signal(self.xdf, self.data_path)
+        signal.read_file(["S1", "S2", "S3"])
+        stats = cache.stats()
+        assert stats["bytes"] <= stats["max_bytes"]
+        assert stats["evictions"] > 0
+        assert cache.stats()["entries"] == 2
+
+    def test_oversized(self):
+        cache.enable(max_bytes=1000)
+        signal = openxdf.Signal(self.xdf, self.data_path)
+        output = signal.read_file(["S1-S2"])["S1-S2"]
+        assert cache.stats()["entries"] == 0
+        assert not output.flags.writeable
+
+    def test_budgeted_reads_bypass(self):
+        signal = openxdf.Signal(self.xdf, self.data_path)
+        budget = signal.plan(["S1-S2"])["output"] + 2**19
+        output = signal.read_file(["S1-S2"], max_memory=budget)["S1-S2"]
+        assert signal.plan(["S1-S2"], max_memory=budget)["chunk_frames"] < 120
+        assert cache.stats()["entries"] == 0
+        assert np.allclose(output, self.expected["S1-S2"])
+        signal.read_file(["S1-S2"], max_memory=2**30)
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf, write_fixture
+from openxdf.catalog import Catalog
+from openxdf.testing import write_study
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Catalog_Test(unittest.TestCase):
+    """Test cases for the openxdf.catalog module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmpdir, "archive")
+        os.makedirs(os.path.join(self.archive, "nested"))
+        self.xdf_path, _ = write_fixture(os.path.join(self.archive, "nested"))
+        self.catalog = Catalog(os.path.join(self.tmpdir, "index.sqlite"))
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_scan(self):
+        summary = self.catalog.scan(self.archive, workers=1)
+        assert summary["added"] == 1
+        assert len(self.catalog) == 1
+
+        records = self.catalog.query()
+        xdf = openxdf.OpenXDF(self.xdf_path)
+        assert records[0]["id"] == xdf.id
+        assert records[0]["montages"] == list(xdf.montages.keys())
+
+    def test_incremental_scan(self):
+        self.catalog.scan(self.archive, workers=1)
+        assert self.catalog.scan(self.archive, workers=1)["unchanged"] == 1
+
+        stat = os.stat(self.xdf_path)
+        os.utime(self.xdf_path, (stat.st_atime, stat.st_mtime + 10))
+        assert self.catalog.scan(self.archive, workers=1)["updated"] == 1
+
+        os.remove(self.xdf_path)
+        assert self.catalog.scan(self.archive, workers=1)["removed"] == 1
+        assert len(self.catalog) == 0
+
+    def test_query(self):
+        self.catalog.scan(self.archive, workers=1)
+        record = self.catalog.query()[0]
+        channel = record["montages"][0]
+        rate = record["sources"][0]["SampleFrequency"]
+
+        assert len(self.catalog.query(channels=[channel], sample_rate=rate)) == 1
+        assert self.catalog.query(channels=[channel, "Not-A-Channel"]) == []
+        assert self.catalog.query(id=record["id"])[0]["path"] == self.xdf_path
+        assert self.catalog.query(start_after="9999-01-01") == []
+
+    def test_segments(self):
+        xdf_path, data_paths = write_study(
+            self.archive, study_id="Split", duration=600, segments=3, gap=60
+        )
+        self.catalog.scan(self.archive, workers=1)
+        record = self.catalog.query(id="Split")[0]
+        assert record["data_path"] == data_paths
+        assert [i["data_path"] for i in record["segments"]] == data_paths
+
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), record["data_path"])
+        assert signal._num_frames == 720
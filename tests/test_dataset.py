@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf.dataset import export, EpochDataset
+from openxdf.constants import STAGE_CODES
+from openxdf.testing import write_study
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Dataset_Test(unittest.TestCase):
+    """Test cases for the openxdf.dataset module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.studies = [
+            write_study(self.tmpdir, study_id=f"Study{i}", duration=600, seed=i)
+            for i in range(2)
+        ]
+        self.output = os.path.join(self.tmpdir, "dataset")
+        self.channels = ["S1-S2", "S3"]
+        export(self.studies, self.output, self.channels, fs=100, shard_epochs=15)
+        self.dataset = EpochDataset(self.output)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_export(self):
+        assert len(self.dataset) == 40
+        assert len(self.dataset.manifest["shards"]) == 3
+        assert list(self.dataset.study_ids[[0, 39]]) == ["Study0", "Study1"]
+        assert self.dataset.epoch_numbers[20] == 1
+
+        xdf = openxdf.OpenXDF(self.studies[0][0])
+        stage = xdf.scoring[0]["staging"][4]["Stage"]
+        assert self.dataset.labels[4] == STAGE_CODES[stage]
+
+    def test_batch(self):
+        xdf_path, data_path = self.studies[1]
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        expected = signal.read_matrix(self.channels, fs=100, epochs=True)
+
+        x, y = self.dataset[[39, 20, 31]]
+        assert x.shape == (3, 2, 3000)
+        assert x.dtype == np.float32
+        assert np.allclose(x[1], expected[0], rtol=1e-5)
+        assert np.allclose(x[0], expected[19], rtol=1e-5)
+
+        x, y = self.dataset[5]
+        assert x.shape == (2, 3000)
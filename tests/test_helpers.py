@@ -1,19 +1,25 @@
 # -*- coding: utf-8 -*-
 
-from .context import openxdf
+from .context import openxdf, write_fixture
 import numpy as np
+import shutil
+import tempfile
 import unittest
 
 
 class Helpers_Test(unittest.TestCase):
     """Test cases for the openxdf.helpers module"""
 
-    def __init__(self, methodName="runTest"):
-        super().__init__(methodName)
-        self.xdf_path = "tests/data/test.xdf"
-        self.signal_path = "tests/data/test.nkamp"
-        self.xdf = openxdf.OpenXDF(self.xdf_path)
-        self.signal = openxdf.Signal(self.xdf, self.signal_path)
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.xdf_path, cls.signal_path = write_fixture(cls.tmpdir)
+        cls.xdf = openxdf.OpenXDF(cls.xdf_path)
+        cls.signal = openxdf.Signal(cls.xdf, cls.signal_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
 
     # def test_bytestring_to_num(self):
     #     frame_info = self.signal._frame_information
@@ -42,3 +48,73 @@ class Helpers_Test(unittest.TestCase):
     def test_clean_title(self):
         assert openxdf.helpers.clean_title("xdf:Test") == "Test"
         assert openxdf.helpers.clean_title("nti:Test") == "Test"
+
+    def test_parallel_filter(self):
+        from scipy.signal import butter, lfilter, sosfilt
+
+        x = np.random.default_rng(0).standard_normal((2, 120000)) * 100
+        sos = butter(5, [0.3 / 100, 35 / 100], btype="band", output="sos")
+        expected = sosfilt(sos, x)
+        split = openxdf.helpers.parallel_sosfilt(sos, x, workers=3, block_size=20000)
+        assert np.abs(split - expected).max() < 1e-8 * np.abs(expected).max()
+
+        b, a = butter(4, [10 / 100, 60 / 100], btype="band")
+        expected = lfilter(b, a, x[0])
+        split = openxdf.helpers.parallel_lfilter(b, a, x[0], workers=4)
+        assert np.abs(split - expected).max() < 1e-8 * np.abs(expected).max()
+
+        # Unstable filters are filtered serially
+        assert openxdf.helpers.filter_overlap([0.5, 1.01]) is None
+        b, a = openxdf.helpers.butter_bandpass(0.3, 35, 512)
+        split = openxdf.helpers.parallel_lfilter(b, a, x[0], workers=4)
+        np.testing.assert_array_equal(split, lfilter(b, a, x[0]))
+
+    def test_bandpass_forms(self):
+        x = np.random.default_rng(0).standard_normal(120000) * 100
+        bandpass = openxdf.helpers.butter_bandpass_filter
+        # SOS and (b, a) agree to the round-off of the (b, a) form, which
+        # grows as the low cut-off gets small relative to the sampling rate
+        cases = [(10, 70, 200, 1e-10), (0.3, 35, 100, 1e-7), (0.3, 35, 200, 1e-5)]
+        for *args, rtol in cases:
+            sos = bandpass(x, *args)
+            ba = bandpass(x, *args, output="ba")
+            assert np.abs(ba - sos).max() < rtol * np.abs(sos).max()
+
+        # (b, a) is unstable for the montage filter at high sampling rates
+        sos = bandpass(x, 0.3, 35, 512)
+        ba = bandpass(x, 0.3, 35, 512, output="ba")
+        assert np.isfinite(sos).all() and np.abs(sos).max() < 10 * np.abs(x).max()
+        assert not np.abs(ba).max() < 10 * np.abs(x).max()  # diverges or NaN
+        with self.assertRaises(ValueError):
+            bandpass(x, 0.3, 35, 200, output="zpk")
+
+    def test_decode_samples(self):
+        rng = np.random.default_rng(0)
+        raw = rng.integers(0, 256, size=(5, 48), dtype=np.uint8)
+        for width in [1, 2, 3, 4, 8]:
+            for byteorder in ["little", "big"]:
+                for signed in [True, False]:
+                    decoded = openxdf.helpers.decode_samples(
+                        raw, width, byteorder, signed
+                    )
+                    assert decoded.shape == (5, 48 // width)
+                    expected = [
+                        int.from_bytes(
+                            bytes(row[i : i + width]), byteorder, signed=signed
+                        )
+                        for row in raw
+                        for i in range(0, 48, width)
+                    ]
+                    if width == 8 and not signed:
+                        # uint64 wraps into int64 like a two's-complement view
+                        expected = [i - 2**64 if i >= 2**63 else i for i in expected]
+                    assert decoded.ravel().tolist() == expected
+
+        samples = openxdf.testing.pack_samples([-1, 8388607, -8388608, 5], 3)
+        assert openxdf.helpers._bytestring_to_num(
+            samples, 3, "little", True
+        ).tolist() == [[-1, 8388607, -8388608, 5]]
+        with self.assertRaises(ValueError):
+            openxdf.helpers.decode_samples(raw, 5, "little", True)
+        with self.assertRaises(ValueError):
+            openxdf.helpers.decode_samples(raw, 2, "native", True)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf import instrument
+from openxdf.testing import write_study
+import shutil
+import tempfile
+import unittest
+
+
+class Instrument_Test(unittest.TestCase):
+    """Test cases for the openxdf.instrument module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, self.signal_path = write_study(self.tmpdir, duration=600)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_collect(self):
+        with instrument.collect() as sink:
+            xdf = openxdf.OpenXDF(self.xdf_path)
+            xdf.sources
+            signal = openxdf.Signal(xdf, self.signal_path)
+            signal.read_file(["S1-S2"])
+
+        summary = sink.summary()
+        for stage in [
+            "xdf.parse",
+            "xdf.normalize.sources",
+            "signal.read",
+            "signal.decode",
+            "signal.derive",
+            "signal.filter",
+        ]:
+            assert stage in summary["timings"]
+
+        assert summary["counters"]["signal.frames_decoded"] == 2 * 600
+        assert summary["counters"]["signal.bytes_read"] == 600 * 4 * 200 * 2
+
+    def test_default_sink(self):
+        with instrument.collect() as sink:
+            pass
+        openxdf.OpenXDF(self.xdf_path)
+        assert sink.records == []
+        assert isinstance(instrument.get_sink(), instrument.NullSink)
+
+    def test_logging_sink(self):
+        with self.assertLogs("openxdf", level="DEBUG") as logs:
+            with instrument.use_sink(instrument.LoggingSink()):
+                openxdf.OpenXDF(self.xdf_path)
+        assert any("xdf.parse" in line for line in logs.output)
+
+    def test_callback_sink(self):
+        calls = []
+        instrument.set_sink(instrument.CallbackSink(lambda *args: calls.append(args)))
+        try:
+            openxdf.OpenXDF(self.xdf_path).dataframe()
+        finally:
+            instrument.set_sink(None)
+        assert ("timing", "xdf.dataframe") in [call[:2] for call in calls]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf, write_fixture
+import openxdf.pretty
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Pretty_Test(unittest.TestCase):
+    """Test cases for the openxdf.pretty module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, _ = write_fixture(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_deidentify(self):
+        opath = os.path.join(self.tmpdir, "deidentified.xdf")
+        openxdf.pretty.deidentify(self.xdf_path, opath)
+
+        original = openxdf.OpenXDF(self.xdf_path, deidentify=False)
+        xdf = openxdf.OpenXDF(opath, deidentify=False)
+        patient = xdf._data["xdf:PatientInformation"]
+        for term in openxdf.pretty.PATIENT_FIELDS:
+            assert patient[term] is None
+
+        assert xdf.id == original.id
+        assert xdf.montages == original.montages
+        assert len(xdf.scoring) == len(original.scoring)
+        names = [scorer["header"]["first_name"] for scorer in xdf.scoring]
+        assert names == [f"Scorer{i + 1}" for i in range(len(names))]
+
+    def test_main(self):
+        input_dir = os.path.join(self.tmpdir, "input")
+        output_dir = os.path.join(self.tmpdir, "output")
+        os.makedirs(os.path.join(input_dir, "nested"))
+        shutil.copy(self.xdf_path, os.path.join(input_dir, "nested", "a.xdf"))
+        shutil.copy(self.xdf_path, os.path.join(input_dir, "b.xdf"))
+
+        openxdf.pretty.main(["-i", input_dir, "-o", output_dir, "-j", "1"])
+        assert os.path.exists(os.path.join(output_dir, "nested", "a.xdf"))
+        assert os.path.exists(os.path.join(output_dir, "b.xdf"))
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf import rswa
+from openxdf.testing import write_study
+import numpy as np
+import shutil
+import tempfile
+import unittest
+
+
+class RSWA_Test(unittest.TestCase):
+    """Test cases for the openxdf.rswa module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, self.data_path = write_study(
+            self.tmpdir, duration=1200, sources=["C3", "A2", "Chin", "EKG"]
+        )
+        self.xdf = openxdf.OpenXDF(self.xdf_path)
+        self.signal = openxdf.Signal(self.xdf, self.data_path)
+
+        # Quiet chin everywhere, one tonic REM epoch and one phasic burst
+        self.rem = rswa.rem_epochs(self.xdf, 40)
+        rng = np.random.default_rng(1)
+        chin = rng.normal(0, 20, (1200, 200))
+        tonic, phasic = self.rem[-1], self.rem[3]
+        chin[(tonic - 1) * 30 : tonic * 30] *= 20
+        burst = (phasic - 1) * 30 + 7
+        chin[burst, 50:150] *= 20
+        self._write_chin(chin)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_chin(self, values):
+        frame_info = self.signal._frame_information
+        info = frame_info["Channels"]["Chin"]
+        frames = np.memmap(self.data_path, dtype=np.uint8, mode="r+").reshape(
+            -1, frame_info["FrameWidth"]
+        )
+        stop = info["StartLocation"] + info["ChannelWidth"]
+        samples = np.rint(values).astype("<i2").view(np.uint8).reshape(len(frames), -1)
+        frames[:, info["StartLocation"] : stop] = samples
+        frames.flush()
+
+    def test_rolling_rms(self):
+        data = np.random.default_rng(0).normal(size=(3, 500))
+        envelope = rswa.rolling_rms(data, 20)
+        assert envelope.shape == data.shape
+        expected = np.sqrt(np.mean(data[:, 90:110] ** 2, axis=1))
+        assert np.allclose(envelope[:, 100], expected)
+
+    def test_rolling_rms_gap(self):
+        data = np.random.default_rng(0).normal(size=(2, 500))
+        gappy = data.copy()
+        gappy[0, 200:250] = np.nan
+        envelope = rswa.rolling_rms(gappy, 20)
+        expected = rswa.rolling_rms(data, 20)
+        blank = np.zeros(data.shape, dtype=bool)
+        blank[0, 191:260] = True
+        assert np.isnan(envelope[blank]).all()
+        assert np.allclose(envelope[~blank], expected[~blank])
+
+        # An epoch that starts in the last 15 s of a 30 s recording gap
+        xdf_path, data_path = write_study(
+            self.tmpdir,
+            study_id="Gap",
+            duration=1170,
+            sources=["C3", "A2", "Chin", "EKG"],
+            segments=2,
+            gap=30,
+        )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        data = rswa.read_epochs(signal, "Chin", [21])
+        envelope = rswa.rolling_rms(data, 20)
+        assert np.isnan(data[0, : 15 * 200]).all()
+        assert np.isnan(envelope[0, : 15 * 200 + 10]).all()
+        assert np.isfinite(envelope[0, 15 * 200 + 10 :]).all()
+
+    def test_score(self):
+        result = rswa.score(self.signal, "Chin")
+        assert (result["epochs"] == self.rem).all()
+        assert result["tonic"].shape == (len(self.rem), 10)
+
+        tonic_epochs = result["epochs"][result["tonic_epochs"]]
+        assert list(tonic_epochs) == [self.rem[-1]]
+
+        phasic = result["phasic"] > 0
+        rows, minis = np.nonzero(phasic & ~result["tonic_epochs"][:, None])
+        assert list(result["epochs"][rows]) == [self.rem[3]]
+        assert list(minis) == [2]
+
+        summary = result["summary"]
+        assert summary["rem_epochs"] == len(self.rem)
+        assert np.isclose(summary["tonic_percent"], 100 / len(self.rem))
+
+    def test_cohort(self):
+        results = rswa.cohort([(self.xdf_path, self.data_path)] * 2, workers=1)
+        assert [i["id"] for i in results] == [self.xdf.id] * 2
+        assert results[0]["summary"] == rswa.score(self.signal)["summary"]
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf.serve import StudyPool, TileServer
+from openxdf.testing import write_study
+import asyncio
+import json
+import numpy as np
+import shutil
+import tempfile
+import unittest
+
+
+async def _get(reader, writer, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, body
+
+
+class Serve_Test(unittest.TestCase):
+    """Test cases for the openxdf.serve module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, self.data_path = write_study(self.tmpdir, duration=600)
+        self.pool = StudyPool({"Synthetic": (self.xdf_path, self.data_path)})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _requests(self, targets):
+        async def _run():
+            server = await TileServer(self.pool, port=0).start()
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = [await _get(reader, writer, i) for i in targets]
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+
+        return asyncio.run(_run())
+
+    def test_json_endpoints(self):
+        responses = self._requests(
+            [
+                "/studies",
+                "/studies/Synthetic",
+                "/studies/Synthetic/events?t0=0&t1=300",
+                "/studies/Synthetic/staging?scorer=Scorer2",
+                "/studies/Unknown",
+            ]
+        )
+        statuses = [i[0] for i in responses]
+        assert statuses == [200, 200, 200, 200, 404]
+        assert json.loads(responses[0][2]) == ["Synthetic"]
+
+        summary = json.loads(responses[1][2])
+        assert summary["duration"] == 600
+        assert summary["channels"]["S1-S2"] == 200
+
+        events = json.loads(responses[2][2])
+        assert events and all(0 <= i["onset"] < 300 for i in events)
+        staging = json.loads(responses[3][2])
+        assert staging["scorer"] == "Scorer2" and len(staging["stages"]) == 20
+
+    def test_tiles(self):
+        status, headers, body = self._requests(
+            ["/studies/Synthetic/channels/S1-S2?t0=60&t1=90"]
+        )[0]
+        assert status == 200
+        assert headers["x-layout"] == "samples"
+        tile = np.frombuffer(body, dtype="<f4")
+        assert len(tile) == 30 * 200
+
+        signal = openxdf.Signal(openxdf.OpenXDF(self.xdf_path), self.data_path)
+        settle = signal._settle(["S1-S2"])
+        start = max(0.0, 60 - settle)
+        expected = signal.read_file(["S1-S2"], start=start, stop=90)["S1-S2"].ravel()
+        frame_length = signal._xdf.header["FrameLength"]
+        offset = int(round(start // frame_length * frame_length * 200))
+        assert np.allclose(tile, expected[60 * 200 - offset :], rtol=1e-4, atol=1e-2)
+
+        responses = self._requests(
+            [
+                "/studies/Synthetic/channels/S1-S2?t0=0&t1=600&px=100",
+                "/studies/Synthetic/channels/S1-S2?t0=590&t1=610",
+                "/studies/Synthetic/channels/S1-S2?t0=10&t1=5",
+                "/studies/Synthetic/channels/Nope",
+            ]
+        )
+        status, headers, body = responses[0]
+        envelope = np.frombuffer(body, dtype="<f4").reshape(-1, 2)
+        assert headers["x-layout"] == "minmax" and envelope.shape == (100, 2)
+        assert (envelope[:, 0] <= envelope[:, 1]).all()
+
+        # Tiles stop at the end of the recording
+        tail = np.frombuffer(responses[1][2], dtype="<f4")
+        assert len(tail) == 10 * 200 and not np.isnan(tail).any()
+        assert [i[0] for i in responses[2:]] == [400, 404]
+
+    def test_errors(self):
+        responses = self._requests(
+            [
+                "/studies/Synthetic/channels/S1-S2?t0=nan&t1=10",
+                "/studies/Synthetic/channels/S1-S2?t0=0&t1=inf",
+                "/studies/Synthetic/channels/S1-S2?t0=-1e11&t1=10",
+                "/studies/Synthetic/channels/S1-S2?t0=0&t1=1e11",
+            ]
+        )
+        assert [i[0] for i in responses] == [400, 400, 400, 200]
+        assert len(responses[3][2]) == 600 * 200 * 4
+
+        # Unexpected failures still get a reply on the same connection
+        def _fail(*args):
+            raise RuntimeError("boom")
+
+        self.pool.get("Synthetic").staging = _fail
+        failed, after = self._requests(["/studies/Synthetic/staging", "/studies"])
+        assert failed[0] == 500 and "boom" in json.loads(failed[2])["error"]
+        assert after[0] == 200
+
+        async def _post():
+            server = await TileServer(self.pool, port=0).start()
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /studies HTTP/1.1\r\n\r\n")
+            line = await reader.readline()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return line
+
+        assert asyncio.run(_post()).strip() == b"HTTP/1.1 405 Method Not Allowed"
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf import shm
+from openxdf.testing import write_study
+import multiprocessing
+import numpy as np
+import shutil
+import tempfile
+import unittest
+
+
+def _worker_sum(handle):
+    with shm.attach(handle) as shared:
+        total = float(shared["S1-S2"].sum())
+    return total
+
+
+class Shm_Test(unittest.TestCase):
+    """Test cases for the openxdf.shm module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        xdf_path, data_path = write_study(self.tmpdir, duration=120)
+        self.signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        self.expected = self.signal.read_file(["S1-S2", "S3"])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_publish_attach(self):
+        store = shm.publish(self.signal, ["S1-S2", "S3"], dtype=np.float32)
+        assert sorted(store) == ["S1-S2", "S3"]
+        assert store["S3"].dtype == np.float32
+        assert np.allclose(store["S3"], self.expected["S3"], rtol=1e-5)
+
+        shared = shm.attach(store.handle)
+        assert store.references == 2
+        buffer = np.frombuffer(shared._block.buf, dtype=np.uint8)
+        assert np.shares_memory(shared["S3"], buffer)
+        del buffer
+        # a write through the publisher's mapping shows up in the attached view
+        offset = store.handle["arrays"]["S3"]["offset"]
+        before = float(shared["S3"].flat[0])
+        store._block.buf[offset : offset + 4] = np.float32(before + 1).tobytes()
+        assert shared["S3"].flat[0] == np.float32(before + 1)
+        store._block.buf[offset : offset + 4] = np.float32(before).tobytes()
+        with self.assertRaises(ValueError):
+            shared["S3"][0, 0] = 1.0
+
+        store.close()
+        assert shared.references == 1
+        assert np.allclose(shared["S1-S2"], self.expected["S1-S2"], rtol=1e-5)
+        shared.close()
+        assert shared.closed
+
+        with self.assertRaises(FileNotFoundError):
+            shm.attach(store.handle)
+
+    def test_workers(self):
+        with shm.publish(self.signal, ["S1-S2"]) as store:
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(2) as pool:
+                totals = pool.map(_worker_sum, [store.handle] * 2)
+            assert store.references == 1
+        assert np.allclose(totals, self.expected["S1-S2"].sum())
+
+    def test_close_with_live_views(self):
+        store = shm.share({"x": np.arange(10)})
+        view = store["x"]
+        with self.assertRaises(BufferError):
+            store.close()
+        assert not store.closed
+        with shm.attach(store.handle) as other:
+            assert other.references == 2
+        del view
+        store.close()
+        assert store.closed
@@ -1,19 +1,29 @@
 # -*- coding: utf-8 -*-
 
-from .context import openxdf
+from .context import openxdf, write_fixture
+from openxdf.testing import write_study, format_time
 import unittest
+import shutil
+import tempfile
 import numpy as np
+from datetime import timedelta
+import asyncio
+from unittest import mock
 
 
 class Signal_Test(unittest.TestCase):
     """Test cases for the openxdf.signal module"""
 
-    def __init__(self, methodName="runTest"):
-        super().__init__(methodName)
-        self.xdf_path = "tests/data/test.xdf"
-        self.signal_path = "tests/data/test.nkamp"
-        self.xdf = openxdf.OpenXDF(self.xdf_path)
-        self.signal = openxdf.Signal(self.xdf, self.signal_path)
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.xdf_path, cls.signal_path = write_fixture(cls.tmpdir)
+        cls.xdf = openxdf.OpenXDF(cls.xdf_path)
+        cls.signal = openxdf.Signal(cls.xdf, cls.signal_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
 
     def test_Signal(self):
         assert type(self.signal) == openxdf.Signal
@@ -63,3 +73,401 @@ class Signal_Test(unittest.TestCase):
 
     # def test_to_edf_raw(self):
     #     self.signal.to_edf_raw("tests/data/test.edf")
+
+
+class SyntheticSignal_Test(unittest.TestCase):
+    """Test cases for openxdf.signal against generated studies"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, self.signal_path = write_study(
+            self.tmpdir,
+            duration=600,
+            sources=["C3", "A2", "Chin", "EKG"],
+            sample_rates=[200, 200, 200, 100],
+        )
+        self.xdf = openxdf.OpenXDF(self.xdf_path)
+        self.signal = openxdf.Signal(self.xdf, self.signal_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _overwrite_source(self, source, epoch, value):
+        """Sets every sample of `source` in the 1-indexed `epoch` to `value`"""
+        frame_info = self.signal._frame_information
+        info = frame_info["Channels"][source]
+        samples = info["ChannelWidth"] // info["SampleWidth"]
+        frames = range((epoch - 1) * 30, epoch * 30)
+        with open(self.signal_path, "r+b") as f:
+            for frame in frames:
+                f.seek(frame * frame_info["FrameWidth"] + info["StartLocation"])
+                f.write(np.full(samples, value, dtype="<i2").tobytes())
+
+    def test_quality_report(self):
+        self._overwrite_source("Chin", 2, 0)
+        self._overwrite_source("C3", 3, 32767)
+
+        report = self.signal.quality_report(["Chin", "C3-A2", "EKG"], chunk_epochs=7)
+        assert set(report.keys()) == {"Chin", "C3-A2", "EKG"}
+        assert report["Chin"]["rms"].shape == (20,)
+
+        assert report["Chin"]["flatline"][1] == 1.0
+        assert report["Chin"]["flatline"][0] < 0.5
+        assert report["Chin"]["ptp"][1] == 0
+        assert report["C3-A2"]["clipped"][2] == 1.0
+        assert report["C3-A2"]["clipped"][0] == 0.0
+        assert np.isnan(report["EKG"]["line_noise"]).all()
+        assert (report["Chin"]["line_noise"] >= 0).all()
+
+    def test_quality_report_gap(self):
+        xdf_path, data_paths = write_study(
+            self.tmpdir,
+            study_id="Gap",
+            duration=600,
+            sources=["C3", "A2", "Chin", "EKG"],
+            segments=2,
+            gap=45,
+        )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_paths)
+        report = signal.quality_report(["C3-A2", "Chin"], chunk_epochs=7)
+
+        # Gap from 300 s to 345 s: epoch 11 is empty, epoch 12 half recorded
+        for channel in ["C3-A2", "Chin"]:
+            out = report[channel]
+            assert out["missing"][10] == 1.0 and out["missing"][11] == 0.5
+            assert (out["missing"][:10] == 0).all()
+            assert (out["missing"][12:] == 0).all()
+            assert np.isnan(out["flatline"][10]) and np.isnan(out["rms"][10])
+            assert (out["flatline"][np.arange(21) != 10] < 0.5).all()
+            assert np.isfinite(out["rms"][11]) and out["ptp"][11] > 0
+
+    def test_read_matrix(self):
+        matrix = self.signal.read_matrix(["C3-A2", "EKG"], fs=200, filtered=False)
+        assert matrix.shape == (2, 600 * 200)
+        assert matrix.flags["C_CONTIGUOUS"]
+
+        raw = self.signal._read_sources(["C3", "A2"])
+        assert np.array_equal(matrix[0], (raw["C3"] - raw["A2"]).ravel())
+
+        epochs = self.signal.read_matrix(
+            ["Chin", "EKG"], fs=100, epochs=True, dtype=np.float32
+        )
+        assert epochs.shape == (20, 2, 30 * 100)
+        assert epochs.dtype == np.float32
+
+    def test_event_windows(self):
+        events = self.xdf.events["Scorer1"]["Apneas"]
+        windows = self.signal.event_windows(
+            ["C3-A2", "Chin"], events, pre=10, post=30, filtered=False
+        )
+        assert windows.shape == (len(events), 2, 40 * 200)
+
+        full = self.signal.read_matrix(["C3-A2", "Chin"], fs=200, filtered=False)
+        offsets = self.signal._event_offsets(events)
+        for window, offset in zip(windows, offsets):
+            start = int(round(offset * 200)) - 10 * 200
+            expected = full[:, max(start, 0) : start + 40 * 200]
+            assert np.array_equal(window[:, -expected.shape[1] :], expected)
+
+        # The default warm-up matches a whole-night filtered read
+        filtered = self.signal.event_windows(["C3-A2"], [300.0], pre=10, post=30)
+        expected = self.signal.read_file(["C3-A2"])["C3-A2"].ravel()
+        expected = expected[290 * 200 : 330 * 200]
+        scale = np.abs(expected).max()
+        np.testing.assert_allclose(filtered[0, 0], expected, atol=1e-8 * scale)
+
+        edges = self.signal.event_windows(["C3-A2"], [5.0, 595.0], pre=10, post=10)
+        assert np.isnan(edges[0, 0, : 5 * 200]).all()
+        assert not np.isnan(edges[0, 0, 5 * 200 :]).any()
+        assert np.isnan(edges[1, 0, -5 * 200 :]).all()
+
+        with self.assertRaises(ValueError):
+            self.signal.event_windows(["Chin", "EKG"], [60.0], pre=1, post=1)
+
+    def test_24_bit(self):
+        sources = ["C3", "A2", "Chin", "EKG"]
+        for endian in ["little", "big"]:
+            xdf_path, data_path = write_study(
+                self.tmpdir,
+                study_id=f"HighRes-{endian}",
+                duration=60,
+                sources=sources,
+                sample_widths=[3, 3, 2, 3],
+                signed=[True, True, True, False],
+                endian=endian,
+            )
+            signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+            decoded = signal._read_sources(sources)
+
+            # Re-packing the decoded samples gives back the file's bytes
+            layout = signal._frame_information
+            frames = np.fromfile(data_path, dtype=np.uint8)
+            frames = frames.reshape(-1, layout["FrameWidth"])
+            for name in sources:
+                info = layout["Channels"][name]
+                start = info["StartLocation"]
+                block = frames[:, start : start + info["ChannelWidth"]]
+                packed = openxdf.testing.pack_samples(
+                    decoded[name], info["SampleWidth"], endian
+                )
+                assert packed == block.tobytes()
+            assert decoded["C3"].min() < -(2**15) and decoded["EKG"].min() >= 0
+            assert np.isfinite(signal.read_file(["C3-A2"])["C3-A2"]).all()
+
+    def test_read_stage(self):
+        channels = ["C3-A2", "EKG"]
+        with openxdf.instrument.collect() as sink:
+            data, epochs = self.signal.read_stage(channels, ["N1", "R"])
+        assert epochs.tolist() == [4, 5, 17, 18, 19, 20]
+        assert data["C3-A2"].shape == (6, 30 * 200)
+        assert data["EKG"].shape == (6, 30 * 100)
+
+        # Only the staged epochs and the filter warm-up before them are read
+        frames = sink.summary()["counters"]["signal.frames_decoded"] // 3
+        assert frames < 300
+
+        # Same as slicing a whole-night read once the filter has settled
+        full = self.signal.read_file(channels)
+        for channel in channels:
+            expected = full[channel].reshape(20, -1)[epochs - 1]
+            scale = np.abs(expected).max()
+            np.testing.assert_allclose(data[channel], expected, atol=1e-8 * scale)
+
+        # A high-rate montage needs a finite warm-up, not the whole night
+        xdf_path, data_path = write_study(
+            self.tmpdir,
+            study_id="HighRate",
+            duration=900,
+            sources=["C3", "A2"],
+            sample_rates=512,
+        )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        assert 0 < signal._settle(["C3-A2"]) < 60
+        with openxdf.instrument.collect() as sink:
+            data, epochs = signal.read_stage(["C3-A2"], ["R"])
+        frames = sink.summary()["counters"]["signal.frames_decoded"] // 2
+        assert frames < 900 - (epochs[0] - 1) * 30 + 60
+        assert np.isfinite(data["C3-A2"]).all()
+
+        with mock.patch.object(signal, "_settle", return_value=np.inf):
+            with self.assertWarns(UserWarning):
+                signal.read_stage(["C3-A2"], ["R"])
+
+        data, epochs = self.signal.read_stage(["EKG"], [2], scorer="Scorer2")
+        assert len(epochs) == data["EKG"].shape[0] > 0
+        with self.assertRaises(ValueError):
+            self.signal.read_stage(channels, ["REM sleep"])
+
+    def test_parallel_filter(self):
+        # 0.3-35 Hz at 512 Hz, where a (b, a) band-pass is unstable
+        xdf_path, data_path = write_study(
+            self.tmpdir,
+            study_id="HighRate",
+            duration=600,
+            sources=["C3", "A2"],
+            sample_rates=512,
+        )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        expected = signal.read_file(["C3-A2"])["C3-A2"]
+        assert np.isfinite(expected).all()
+
+        from scipy.signal import sosfilt
+
+        with mock.patch("scipy.signal.sosfilt", wraps=sosfilt) as calls:
+            parallel = signal.read_file(["C3-A2"], workers=4)["C3-A2"]
+        # Several blocks, each filtered with a warm-up from the block before
+        assert calls.call_count >= 3
+        assert sum(len(i.args[1]) for i in calls.call_args_list) > expected.size
+        scale = np.abs(expected).max()
+        np.testing.assert_allclose(parallel, expected, atol=1e-8 * scale)
+
+    def test_plan(self):
+        channels = ["C3-A2", "EKG"]
+        plan = self.signal.plan(channels, start=60, stop=360)
+        assert plan["frames"] == 300
+        assert plan["output"] == 300 * (200 + 100) * 8
+        assert plan["peak"] > plan["output"]
+        assert plan["chunk_frames"] == 300
+        assert self.signal.plan(channels, units="KiB")["output"] == 600 * 300 * 8 / 1024
+
+        budget = plan["output"] + (plan["peak"] - plan["output"]) // 4
+        chunked = self.signal.plan(channels, start=60, stop=360, max_memory=budget)
+        assert 0 < chunked["chunk_frames"] < 300
+        assert chunked["chunked_peak"] <= budget
+
+        # Chunked reads carry the filter state over and give the same result
+        expected = self.signal.read_file(channels, start=60, stop=360)
+        output = self.signal.read_file(channels, start=60, stop=360, max_memory=budget)
+        for channel in channels:
+            np.testing.assert_array_equal(output[channel], expected[channel])
+        with self.assertRaises(MemoryError):
+            self.signal.read_file(channels, max_memory=plan["output"])
+
+    def test_plan_measured(self):
+        import scipy.signal  # noqa: F401 - keep the one-off import out of the peaks
+        import tracemalloc
+
+        xdf_path, data_path = write_study(
+            self.tmpdir, study_id="Plan", duration=1200, sources=8, sample_rates=256
+        )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        channels = ["S1", "S2", "S3", "S4", "S5-S6"]
+        signal.read_file(channels, stop=10)
+
+        def _peak(**kw):
+            tracemalloc.start()
+            try:
+                signal.read_file(channels, **kw)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        # A single pass peaks within 5% of the estimate
+        for workers in [1, 2]:
+            plan = signal.plan(channels, workers=workers)
+            assert abs(_peak(workers=workers) / plan["peak"] - 1) < 0.05
+
+        # Budgeted reads stay under the budget
+        for fraction in [0.5, 0.8]:
+            for workers in [1, 2]:
+                budget = int(plan["peak"] * fraction)
+                chunked = signal.plan(channels, max_memory=budget, workers=workers)
+                assert 0 < chunked["chunk_frames"] < 1200
+                assert _peak(max_memory=budget, workers=workers) <= budget
+
+    def test_segments(self):
+        xdf_path, data_paths = write_study(
+            self.tmpdir,
+            study_id="Split",
+            duration=600,
+            sources=["C3", "A2", "Chin", "EKG"],
+            sample_rates=[200, 200, 200, 100],
+            segments=3,
+            gap=60,
+        )
+        xdf = openxdf.OpenXDF(xdf_path)
+        assert len(xdf.segments) == 3
+        assert xdf.segments[1]["StartTime"] == xdf.start_time + timedelta(seconds=260)
+
+        signal = openxdf.Signal(xdf, data_paths[0])
+        assert signal._num_frames == 720
+        output = signal.read_file(["C3-A2", "EKG"])
+        assert output["EKG"].shape == (720, 100)
+        gaps = np.isnan(output["C3-A2"][:, 0])
+        assert gaps[200:260].all() and gaps[460:520].all()
+        assert not gaps[:200].any() and not gaps[520:].any()
+        # Epoch reads across a segment boundary keep read_file's gaps
+        epochs = signal.read_epochs(["C3-A2"], [7, 9])["C3-A2"]
+        expected = output["C3-A2"].reshape(24, -1)[[6, 8]]
+        np.testing.assert_array_equal(np.isnan(epochs), np.isnan(expected))
+
+        budget = signal.plan(["C3-A2"])["output"] + 2**20
+        chunked = signal.read_file(["C3-A2"], max_memory=budget)["C3-A2"]
+        np.testing.assert_array_equal(chunked, output["C3-A2"])
+        threaded = signal.read_file(["C3-A2", "EKG"], max_memory=budget, workers=2)
+        for channel in ["C3-A2", "EKG"]:
+            np.testing.assert_array_equal(threaded[channel], output[channel])
+        parallel = signal.read_file(["C3-A2"], workers=3)["C3-A2"]
+        scale = np.nanmax(np.abs(output["C3-A2"]))
+        np.testing.assert_allclose(parallel, output["C3-A2"], atol=1e-8 * scale)
+
+        # The same samples as an unsplit recording of the same seed
+        expected = self.signal._read_sources(["C3"])["C3"]
+        split = signal._read_sources(["C3"], 250, 300)["C3"]
+        assert (split[:10] == 0).all() and (split[210:270] == 0).all()
+        assert (split[10:210] == expected[200:400]).all()
+        assert (split[270:] == expected[400:430]).all()
+
+        window = signal.read_file(["EKG"], start=500, stop=530)["EKG"]
+        assert window.shape == (30, 100)
+        assert np.isnan(window[:20]).all() and not np.isnan(window[20:]).any()
+
+    def test_overlapping_segments(self):
+        xdf_path, data_paths = write_study(
+            self.tmpdir, study_id="Overlap", duration=600, segments=2
+        )
+        start = openxdf.OpenXDF(xdf_path).start_time
+        with open(xdf_path) as f:
+            text = f.read()
+        second = format_time(start + timedelta(seconds=300))
+        earlier = format_time(start + timedelta(seconds=240))
+        with open(xdf_path, "w") as f:
+            f.write(
+                text.replace(
+                    f"<xdf:StartTime>{second}</xdf:StartTime>",
+                    f"<xdf:StartTime>{earlier}</xdf:StartTime>",
+                )
+            )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_paths)
+        with self.assertRaises(openxdf.exceptions.XDFSourceError):
+            signal._segments
+
+    def test_sessions(self):
+        xdf_path, data_path = write_study(
+            self.tmpdir, study_id="Sessions", duration=600
+        )
+        xdf = openxdf.OpenXDF(xdf_path)
+        second = format_time(xdf.start_time + timedelta(seconds=360))
+        with open(xdf_path) as f:
+            text = f.read()
+        with open(xdf_path, "w") as f:
+            f.write(
+                text.replace(
+                    "</xdf:Session></xdf:Sessions>",
+                    "</xdf:Session><xdf:Session>"
+                    f"<xdf:StartTime>{second}</xdf:StartTime>"
+                    "</xdf:Session></xdf:Sessions>",
+                )
+            )
+
+        # Neither session records an end time, so the first one stops where
+        # the second one starts instead of taking every frame of the file
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        segments = [
+            (i["file_frame"], i["num_frames"], i["global_frame"])
+            for i in signal._segments
+        ]
+        assert segments == [(0, 360, 0), (360, 240, 360)]
+        expected = openxdf.Signal(xdf, data_path)._read_sources(["S1"])["S1"]
+        assert (signal._read_sources(["S1"])["S1"] == expected).all()
+
+        # The timeline is computed once per Signal
+        assert signal._segments is signal._segments
+
+    def test_follow(self):
+        expected = self.signal.read_file(["C3-A2", "EKG"])
+        with open(self.signal_path, "rb") as f:
+            data = f.read()
+        frame_width = self.signal._frame_information["FrameWidth"]
+
+        # Start with 100.5 frames on disk, then append the rest
+        with open(self.signal_path, "wb") as f:
+            f.write(data[: 100 * frame_width + frame_width // 2])
+
+        follow = self.signal.follow(["C3-A2", "EKG"], poll_interval=0.01, timeout=0.05)
+        first, chunk = next(follow)
+        assert first == 0 and chunk["EKG"].shape == (100, 100)
+
+        with open(self.signal_path, "ab") as f:
+            f.write(data[100 * frame_width + frame_width // 2 :])
+        first, rest = next(follow)
+        assert first == 100 and rest["EKG"].shape == (500, 100)
+        assert list(follow) == []
+
+        for channel in ["C3-A2", "EKG"]:
+            joined = np.concatenate([chunk[channel], rest[channel]])
+            assert np.allclose(joined, expected[channel])
+
+    def test_afollow(self):
+        async def _collect():
+            chunks = []
+            async for _, chunk in self.signal.afollow(
+                ["EKG"], poll_interval=0.01, timeout=0.02, max_frames=250
+            ):
+                chunks.append(chunk["EKG"])
+            return chunks
+
+        chunks = asyncio.run(_collect())
+        assert [len(i) for i in chunks] == [250, 250, 100]
+        expected = self.signal.read_file(["EKG"])["EKG"]
+        assert np.allclose(np.concatenate(chunks), expected)
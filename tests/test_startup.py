@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf, write_fixture
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _loaded_modules(script):
+    """Runs `script` in a fresh interpreter and returns its top-level modules"""
+    code = script + "\nimport sys\nprint(' '.join(sorted(sys.modules)))"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    return set(i.split(".")[0] for i in output.decode().split())
+
+
+class Startup_Test(unittest.TestCase):
+    """Guards against heavy imports creeping back into package startup"""
+
+    def test_import(self):
+        modules = _loaded_modules("import openxdf")
+        for heavy in ["numpy", "pandas", "scipy", "xmltodict"]:
+            assert heavy not in modules
+
+    def test_header_only(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            xdf_path, _ = write_fixture(tmpdir)
+            modules = _loaded_modules(
+                "import openxdf\n"
+                f"xdf = openxdf.OpenXDF({xdf_path!r})\n"
+                "xdf.header, xdf.sources, xdf.montages, xdf.scoring"
+            )
+        finally:
+            shutil.rmtree(tmpdir)
+        for heavy in ["numpy", "pandas", "scipy"]:
+            assert heavy not in modules
+
+    def test_console_scripts(self):
+        modules = _loaded_modules("import openxdf.pretty")
+        for heavy in ["numpy", "pandas", "scipy"]:
+            assert heavy not in modules
+
+    def test_lazy_attributes(self):
+        assert openxdf.OpenXDF is openxdf.xdf.OpenXDF
+        assert openxdf.Signal is openxdf.signal.Signal
+        assert "Signal" in dir(openxdf)
+        with self.assertRaises(AttributeError):
+            openxdf.NotAnAttribute
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf.testing import write_study, pack_samples
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Testing_Test(unittest.TestCase):
+    """Test cases for the openxdf.testing module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_pack_samples(self):
+        values = np.array([-2, -1, 0, 1, 300])
+        little = np.frombuffer(pack_samples(values, 2, "little"), dtype="<i2")
+        big = np.frombuffer(pack_samples(values, 2, "big"), dtype=">i2")
+        assert (little == values).all()
+        assert (big == values).all()
+
+    def test_write_study(self):
+        xdf_path, data_path = write_study(
+            self.tmpdir,
+            study_id="Example",
+            duration=120,
+            sources=["C3", "A2", "Chin"],
+            sample_rates=[200, 200, 100],
+            sample_widths=[2, 2, 1],
+            endian="big",
+            scorers=3,
+        )
+        xdf = openxdf.OpenXDF(xdf_path)
+        assert xdf.id == "Example"
+        assert xdf.header["Endian"] == "big"
+        assert [i["SampleFrequency"] for i in xdf.sources] == [200, 200, 100]
+        assert len(xdf.scoring) == 3
+        assert len(xdf.scoring[0]["staging"]) == 4
+        assert "C3-A2" in xdf.montages
+
+        frame_width = 200 * 2 + 200 * 2 + 100 * 1
+        assert os.path.getsize(data_path) == 120 * frame_width
+
+        signal = openxdf.Signal(xdf, data_path)
+        output = signal.read_file(["C3-A2", "Chin"])
+        assert output["C3-A2"].shape == (120, 200)
+        assert output["Chin"].shape == (120, 100)
+
+    def test_eeg_waveform(self):
+        xdf_path, data_path = write_study(
+            self.tmpdir, duration=120, sources=["C3", "A2"], waveform="eeg"
+        )
+        signal = openxdf.Signal(openxdf.OpenXDF(xdf_path), data_path)
+        c3 = signal._read_sources(["C3"])["C3"].ravel()
+        # About 256 counts RMS with small sample-to-sample steps
+        assert 200 < c3.std() < 320
+        assert np.abs(np.diff(c3)).mean() < 0.25 * c3.std()
+        with self.assertRaises(ValueError):
+            write_study(self.tmpdir, waveform="square")
+
+    def test_single_elements(self):
+        # One bipolar channel, one montage per kind and one event per section
+        xdf_path, data_path = write_study(
+            self.tmpdir, duration=600, sources=2, event_density=0.05, scorers=1
+        )
+        xdf = openxdf.OpenXDF(xdf_path)
+        assert len(xdf.sources) == 2
+        assert xdf.montages["S1-S2"][0]["lead_2"] == "S2"
+        events = xdf.events["Scorer1"]
+        assert all(len(events[i]) == 1 for i in ["Apneas", "Snores", "CustomEvents"])
+        assert len(xdf.scoring) == 1 and len(xdf.scoring[0]["staging"]) == 20
+
+        signal = openxdf.Signal(xdf, data_path)
+        assert signal.read_file(["S1-S2"])["S1-S2"].shape == (600, 200)
+
+        # Sources at different rates leave a single (referential) montage
+        xdf_path, _ = write_study(
+            self.tmpdir, study_id="Mixed", sources=2, sample_rates=[200, 100]
+        )
+        assert sorted(openxdf.OpenXDF(xdf_path).montages) == ["S1", "S2"]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from .context import openxdf
+from openxdf.writer import add_scorers, write_batch, scorer_xml
+from openxdf.testing import write_study
+from datetime import timedelta
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Writer_Test(unittest.TestCase):
+    """Test cases for the openxdf.writer module"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, _ = write_study(self.tmpdir, duration=600)
+        self.xdf = openxdf.OpenXDF(self.xdf_path)
+        self.scorer = {
+            "first_name": "Auto",
+            "last_name": "Model",
+            "stages": np.array([0, 0, 1, 2, 2, 3, -1, 4] + [2] * 12),
+            "events": {
+                "Apneas": {
+                    "onset": np.array([30.5, 120.25]),
+                    "duration": np.array([12.0, 15.5]),
+                    "Class": "obstructive",
+                },
+                "Snores": {"onset": [300.0], "duration": [1.0]},
+            },
+            "custom_events": {"RSWA_P": {"onset": [90.0, 95.0], "duration": 0.5}},
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_write(self):
+        output = os.path.join(self.tmpdir, "rescored.xdf")
+        self.xdf.write(output, add_scorer=self.scorer)
+        xdf = openxdf.OpenXDF(output)
+
+        assert [i["header"]["first_name"] for i in xdf.scoring] == [
+            "Scorer1",
+            "Scorer2",
+            "Auto",
+        ]
+        staging = xdf.scoring[2]["staging"]
+        assert len(staging) == 19
+        assert staging[6] == {"EpochNumber": 8, "Stage": "R"}
+
+        events = xdf.events["Auto"]
+        assert len(events["Apneas"]) == 2 and len(events["Snores"]) == 1
+        assert events["Apneas"][1]["Class"] == "obstructive"
+        onset = openxdf.helpers.parse_time(events["Apneas"][1]["Time"])
+        assert onset == xdf.start_time + timedelta(seconds=120.25)
+        assert float(events["Apneas"][1]["Duration"]) == 15.5
+        assert len(events["CustomEvents"]) == 2
+        assert {k: v["name"] for k, v in xdf.custom_event_list.items()} == {
+            "1": "RSWA_T",
+            "2": "RSWA_P",
+            "3": "RSWA_P",
+        }
+        assert {i["CEType"] for i in events["CustomEvents"]} == {"3"}
+
+        # Everything else is copied byte for byte
+        with open(self.xdf_path, "rb") as f:
+            original = f.read()
+        with open(output, "rb") as f:
+            written = f.read()
+        inserted = scorer_xml(self.scorer, self.xdf.start_time, 3).encode()
+        assert written.replace(inserted, b"") == original
+
+    def test_chunk_boundaries(self):
+        expected = os.path.join(self.tmpdir, "expected.xdf")
+        add_scorers(self.xdf_path, expected, self.scorer)
+        with open(expected, "rb") as f:
+            expected = f.read()
+        for chunk_size in [7, 300, 4096]:
+            output = os.path.join(self.tmpdir, f"chunk{chunk_size}.xdf")
+            add_scorers(self.xdf_path, output, [self.scorer], chunk_size=chunk_size)
+            with open(output, "rb") as f:
+                assert f.read() == expected
+
+    def test_no_scorers(self):
+        xdf_path, _ = write_study(self.tmpdir, study_id="Empty", scorers=0)
+        output = os.path.join(self.tmpdir, "single.xdf")
+        openxdf.OpenXDF(xdf_path).write(output, add_scorer=self.scorer)
+        xdf = openxdf.OpenXDF(output)
+        assert [i["header"]["first_name"] for i in xdf.scoring] == ["Auto"]
+
+        # Scorers added together get distinct custom event types
+        second = dict(self.scorer, first_name="Second")
+        output = os.path.join(self.tmpdir, "double.xdf")
+        openxdf.OpenXDF(xdf_path).write(output, add_scorer=[self.scorer, second])
+        xdf = openxdf.OpenXDF(output)
+        assert sorted(xdf.custom_event_list) == ["1", "2"]
+        assert xdf.events["Second"]["CustomEvents"][0]["CEType"] == "2"
+
+    def test_write_batch(self):
+        jobs = [
+            (self.xdf_path, os.path.join(self.tmpdir, f"batch{i}.xdf"), self.scorer)
+            for i in range(3)
+        ]
+        outputs = write_batch(jobs, workers=2)
+        assert outputs == [i[1] for i in jobs]
+        assert all(len(openxdf.OpenXDF(i).scoring) == 3 for i in outputs)
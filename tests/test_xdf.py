@@ -1,18 +1,28 @@
 # -*- coding: utf-8 -*-
 
-from .context import openxdf
+from .context import openxdf, write_fixture
+from openxdf.testing import write_study
+import os
+import shutil
+import tempfile
 import unittest
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 
 class XDF_Test(unittest.TestCase):
     """Test cases for the openxdf.xdf module"""
 
-    def __init__(self, methodName="runTest"):
-        super().__init__(methodName)
-        self.xdf_path = "tests/data/test.xdf"
-        self.xdf = openxdf.OpenXDF(self.xdf_path)
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.xdf_path, _ = write_fixture(cls.tmpdir)
+        cls.xdf = openxdf.OpenXDF(cls.xdf_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
 
     def test_read_data(self):
         assert type(self.xdf) is openxdf.xdf.OpenXDF
@@ -37,6 +47,14 @@ class XDF_Test(unittest.TestCase):
         source = self.xdf.sources
         assert type(source) is list
         assert type(source[0]) is dict
+
+        # Normalized once; callers get copies and the document is untouched
+        raw = self.xdf._data_files[0]["xdf:Sources"]["xdf:Source"][0]
+        assert "xdf:SourceName" in raw
+        source[0]["SourceName"] = "Changed"
+        self.xdf.segments[0]["Sources"][0]["SourceName"] = "Changed"
+        assert self.xdf.sources[0]["SourceName"] != "Changed"
+        assert self.xdf.segments[0]["Sources"][0]["SourceName"] != "Changed"
     
     def test_montages(self):
         montage = self.xdf.montages
@@ -52,3 +70,60 @@ class XDF_Test(unittest.TestCase):
         df = self.xdf.dataframe()
         assert type(df) is pd.DataFrame
         assert not df.empty
+
+
+class EventMatrix_Test(unittest.TestCase):
+    """Test cases for OpenXDF.event_matrix against generated studies"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.xdf_path, _ = write_study(self.tmpdir, duration=1200)
+        self.xdf = openxdf.OpenXDF(self.xdf_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_event_matrix(self):
+        matrix = self.xdf.event_matrix()
+        assert matrix["counts"].shape == (40, len(matrix["types"]))
+        assert matrix["types"][:2] == ["Apneas", "Hypopneas"]
+
+        # Same totals as the parsed events
+        events = self.xdf.events["Scorer1"]
+        for name in ["Apneas", "Snores", "LegMovements2"]:
+            column = matrix["types"].index(name)
+            assert matrix["counts"][:, column].sum() == len(events[name])
+            durations = sum(float(i["Duration"]) for i in events[name])
+            assert np.isclose(matrix["durations"][:, column].sum(), durations)
+        custom = matrix["counts"][:, len(openxdf.constants.EVENT_SECTIONS) :]
+        assert custom.sum() == len(events["CustomEvents"])
+
+    def test_indices(self):
+        scorer = {
+            "first_name": "Auto",
+            "stages": ["W"] * 4 + ["N2"] * 30 + ["R"] * 6,
+            "events": {
+                # The first apnea starts during wake and is left out of AHI;
+                # the last one starts after the final epoch and is dropped
+                "Apneas": {"onset": [10, 200, 1250], "duration": [12, 15, 20]},
+                "Hypopneas": {"onset": [400, 401], "duration": 10},
+            },
+            "custom_events": {"RSWA_T": {"onset": [1110, 1140], "duration": 30}},
+        }
+        output = os.path.join(self.tmpdir, "scored.xdf")
+        self.xdf.write(output, add_scorer=scorer)
+
+        matrix = openxdf.OpenXDF(output).event_matrix(scorer="Auto")
+        counts = matrix["counts"]
+        assert matrix["types"][-1] == "RSWA_T"
+        assert counts[0, 0] == 1 and counts[6, 0] == 1 and counts[13, 1] == 2
+        assert (counts[37:, -1] == [1, 1, 0]).all()
+        assert counts.sum() == 6
+        assert matrix["durations"][13, 1] == 20
+        assert matrix["sleep_hours"] == 36 * 30 / 3600
+        assert np.isclose(matrix["indices"]["AHI"], 3 / 0.3)
+        assert np.isclose(matrix["indices"]["AI"], 1 / 0.3)
+        assert matrix["indices"]["DI"] == 0
+
+        with self.assertRaises(ValueError):
+            self.xdf.event_matrix(scorer="Nobody")